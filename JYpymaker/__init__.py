@@ -23,9 +23,12 @@ from .draft_folder import DraftFolder
 
 from .time_util import SEC, tim, trange
 
+# 字幕讀寫
+from .subtitle_io import SubtitleWriter, write_subtitles, write_srt, iter_srt_file, iter_srt_text
+
 # 簡繁轉換（延遲導入，避免強制依賴 opencc）
 from .converter import (
-    convert_text, convert_srt_file, convert_draft, convert_draft_file,
+    convert_text, convert_many, convert_srt_file, convert_draft, convert_draft_file,
     get_jianying_drafts_path, list_drafts, find_draft_by_name
 )
 
@@ -66,8 +69,16 @@ __all__ = [
     "ScriptFile",
     "DraftFolder",
 
+    # 字幕讀寫
+    "SubtitleWriter",
+    "write_subtitles",
+    "write_srt",
+    "iter_srt_file",
+    "iter_srt_text",
+
     # 簡繁轉換
     "convert_text",
+    "convert_many",
     "convert_srt_file",
     "convert_draft",
     "convert_draft_file",
@@ -0,0 +1,222 @@
+"""
+草稿批次轉換任務 - 多進程轉換，逐個草稿回報結果
+
+流程：
+    1. submit() 送出一組草稿，立即回傳任務（含 job id）
+    2. 每個草稿在進程池中轉換，完成一個就推送一筆結果
+    3. 草稿內容雜湊與上次以相同模式轉換後的結果相同時直接略過
+
+使用方式：
+    job = convert_job_manager.submit(paths, mode="s2tw")
+    for event, data in job.iter_events():
+        print(event, data)
+"""
+
+import json
+import uuid
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 記錄每個草稿在各模式下最後一次轉換後的內容雜湊
+DEFAULT_STATE_FILE = Path(__file__).parent.parent / "cache" / "convert_state.json"
+
+# 最多保留的已完成任務數
+_MAX_JOBS = 50
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _convert_worker(path: str, mode: str, last_hash: Optional[str]) -> Dict[str, Any]:
+    """在子進程中轉換單一草稿（需為模組層級函數才能被 pickle）"""
+    from .converter import convert_draft_file
+
+    name = Path(path).parent.name
+    try:
+        current_hash = _file_hash(path)
+        if current_hash == last_hash:
+            return {"path": path, "name": name, "success": True, "skipped": True, "count": 0, "hash": current_hash}
+
+        count = convert_draft_file(path, mode, verbose=False)
+        return {"path": path, "name": name, "success": True, "skipped": False, "count": count, "hash": _file_hash(path)}
+    except Exception as e:
+        return {"path": path, "name": name, "success": False, "error": str(e)}
+
+
+class ConvertJob:
+    """一次批次轉換任務"""
+
+    def __init__(self, paths: List[str], mode: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.paths = paths
+        self.mode = mode
+        self.results: List[Dict[str, Any]] = []
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._cond = threading.Condition()
+
+    def add_result(self, result: Dict[str, Any]):
+        with self._cond:
+            self.results.append(result)
+            if len(self.results) >= len(self.paths):
+                self.done = True
+                self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": len(self.paths),
+            "finished": len(self.results),
+            "converted": sum(1 for r in self.results if r.get("success") and not r.get("skipped")),
+            "skipped": sum(1 for r in self.results if r.get("skipped")),
+            "failed": sum(1 for r in self.results if not r.get("success")),
+            "duration": round((self.finished_at or time.time()) - self.created_at, 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "mode": self.mode,
+                "done": self.done,
+                "results": [{k: v for k, v in r.items() if k != "hash"} for r in self.results],
+                **self.summary(),
+            }
+
+    def iter_events(self, keepalive: float = 15.0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        依完成順序逐筆產生事件
+
+        Yields:
+            ("result", 單一草稿結果)、("keepalive", {})，最後為 ("done", 摘要)
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                if sent >= len(self.results) and not self.done:
+                    self._cond.wait(keepalive)
+                pending = self.results[sent:]
+                done = self.done
+
+            if not pending and not done:
+                yield "keepalive", {}
+            for result in pending:
+                yield "result", {k: v for k, v in result.items() if k != "hash"}
+            sent += len(pending)
+
+            if done and sent >= len(self.results):
+                yield "done", self.summary()
+                return
+
+
+class ConvertJobManager:
+    """轉換任務管理：進程池 + 內容雜湊略過"""
+
+    def __init__(self, max_workers: Optional[int] = None, state_file: Path = DEFAULT_STATE_FILE):
+        self.max_workers = max_workers
+        self.state_file = Path(state_file)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._jobs: "OrderedDict[str, ConvertJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        tmp_path.replace(self.state_file)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """子進程異常結束後進程池無法再使用（BrokenProcessPool），下次送出時重新建立"""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _submit_path(self, path: str, mode: str, last_hash: Optional[str]) -> Tuple[ProcessPoolExecutor, Future]:
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(_convert_worker, path, mode, last_hash)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(_convert_worker, path, mode, last_hash)
+
+    def _on_done(self, job: ConvertJob, path: str, executor: ProcessPoolExecutor, future: Future):
+        error = future.exception()
+        if error is None:
+            self._on_result(job, future.result())
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._discard_executor(executor)
+        self._on_result(job, {"path": path, "name": Path(path).parent.name, "success": False, "error": str(error)})
+
+    def _on_result(self, job: ConvertJob, result: Dict[str, Any]):
+        if result.get("success"):
+            with self._lock:
+                self._state.setdefault(result["path"], {})[job.mode] = result["hash"]
+                self._save_state()
+        job.add_result(result)
+
+    def submit(self, paths: List[str], mode: str, force: bool = False) -> ConvertJob:
+        """
+        送出批次轉換任務
+
+        Args:
+            paths: draft_content.json 路徑列表
+            mode: 轉換模式
+            force: 忽略內容雜湊，強制重新轉換
+
+        Returns:
+            ConvertJob（結果會陸續寫入）
+        """
+        job = ConvertJob(list(paths), mode)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > _MAX_JOBS:
+                self._jobs.popitem(last=False)
+
+        if not job.paths:
+            job.done = True
+            job.finished_at = time.time()
+            return job
+
+        for path in job.paths:
+            last_hash = None if force else self._state.get(path, {}).get(mode)
+            executor, future = self._submit_path(path, mode, last_hash)
+            future.add_done_callback(lambda f, p=path, e=executor: self._on_done(job, p, e, f))
+        return job
+
+    def get(self, job_id: str) -> Optional[ConvertJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+# 全域任務管理器
+convert_job_manager = ConvertJobManager()
@@ -10,6 +10,7 @@
 
 import os
 import json
+import threading
 from pathlib import Path
 from typing import Literal, Optional, List, Dict, Any
 
@@ -21,6 +22,14 @@ except ImportError:
 ConvertMode = Literal["s2t", "s2tw", "s2twp", "s2hk", "t2s", "tw2s", "hk2s"]
 
 
+# 每種模式只建立一次 OpenCC（載入字典很慢）
+_converters: Dict[str, Any] = {}
+_converters_lock = threading.Lock()
+
+# convert_many 合併文字用的分隔符（私用區字元，不會出現在 OpenCC 字典中）
+_SENTINEL = "\n\ue000\n"
+
+
 def _ensure_opencc():
     """確保 opencc 已安裝"""
     if opencc is None:
@@ -30,6 +39,27 @@ def _ensure_opencc():
         )
 
 
+def get_converter(mode: ConvertMode = "s2tw"):
+    """
+    取得指定模式的 OpenCC 轉換器（快取，執行緒安全）
+
+    Args:
+        mode: 轉換模式
+
+    Returns:
+        opencc.OpenCC 實例
+    """
+    converter = _converters.get(mode)
+    if converter is None:
+        _ensure_opencc()
+        with _converters_lock:
+            converter = _converters.get(mode)
+            if converter is None:
+                converter = opencc.OpenCC(mode)
+                _converters[mode] = converter
+    return converter
+
+
 def get_jianying_drafts_path() -> Path:
     """
     取得剪映草稿目錄路徑
@@ -65,56 +95,35 @@ def get_jianying_drafts_path() -> Path:
     )
 
 
-def list_drafts(drafts_path: Optional[Path] = None, limit: int = 20) -> List[Dict[str, Any]]:
+def list_drafts(
+    drafts_path: Optional[Path] = None,
+    limit: Optional[int] = 20,
+    offset: int = 0,
+    query: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
-    列出所有草稿
+    列出所有草稿（使用草稿目錄索引，見 draft_catalog.py）
 
     Args:
         drafts_path: 草稿目錄路徑（預設自動偵測）
-        limit: 最多顯示幾個草稿
+        limit: 最多顯示幾個草稿（None 表示全部）
+        offset: 略過前幾個草稿（分頁用）
+        query: 搜尋字串（比對草稿名稱與資料夾名稱）
 
     Returns:
-        草稿列表，每個草稿包含 name, path, mtime
+        草稿列表（最新修改的在前），每個草稿包含 name, folder, path, mtime, size, encrypted
     """
-    if drafts_path is None:
-        drafts_path = get_jianying_drafts_path()
+    from .draft_catalog import get_draft_catalog
 
-    drafts = []
-    for folder in drafts_path.iterdir():
-        if not folder.is_dir():
-            continue
-
-        draft_content = folder / 'draft_content.json'
-        draft_meta = folder / 'draft_meta_info.json'
-
-        if not draft_content.exists():
-            continue
-
-        # 讀取草稿名稱
-        name = folder.name
-        if draft_meta.exists():
-            try:
-                with open(draft_meta, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-                    name = meta.get('draft_name', folder.name)
-            except:
-                pass
-
-        drafts.append({
-            'name': name,
-            'folder': folder.name,
-            'path': draft_content,
-            'mtime': draft_content.stat().st_mtime
-        })
-
-    # 按修改時間排序（最新的在前）
-    drafts.sort(key=lambda x: x['mtime'], reverse=True)
-    return drafts[:limit]
+    _, drafts = get_draft_catalog(drafts_path).list(offset=offset, limit=limit, query=query)
+    for draft in drafts:
+        draft['path'] = Path(draft['path'])
+    return drafts
 
 
 def find_draft_by_name(name: str, drafts_path: Optional[Path] = None) -> Path:
     """
-    根據名稱搜尋草稿
+    根據名稱搜尋草稿（搜尋全部草稿，不限最近 100 個）
 
     Args:
         name: 草稿名稱（部分匹配）
@@ -126,24 +135,9 @@ def find_draft_by_name(name: str, drafts_path: Optional[Path] = None) -> Path:
     Raises:
         FileNotFoundError: 找不到匹配的草稿
     """
-    drafts = list_drafts(drafts_path, limit=100)
-
-    # 精確匹配
-    for draft in drafts:
-        if draft['name'] == name or draft['folder'] == name:
-            return draft['path']
-
-    # 部分匹配
-    matches = [d for d in drafts if name.lower() in d['name'].lower()]
-    if len(matches) == 1:
-        return matches[0]['path']
-    elif len(matches) > 1:
-        raise ValueError(
-            f"找到多個匹配的草稿：\n" +
-            "\n".join(f"  - {d['name']}" for d in matches[:5])
-        )
+    from .draft_catalog import get_draft_catalog
 
-    raise FileNotFoundError(f"找不到名為 '{name}' 的草稿")
+    return Path(get_draft_catalog(drafts_path).find(name))
 
 
 def convert_text(text: str, mode: ConvertMode = "s2tw") -> str:
@@ -164,9 +158,36 @@ def convert_text(text: str, mode: ConvertMode = "s2tw") -> str:
     Returns:
         轉換後的文字
     """
-    _ensure_opencc()
-    converter = opencc.OpenCC(mode)
-    return converter.convert(text)
+    return get_converter(mode).convert(text)
+
+
+def convert_many(texts: List[str], mode: ConvertMode = "s2tw") -> List[str]:
+    """
+    批次轉換多個文字字串
+
+    以分隔符合併後只呼叫一次 OpenCC，再切回原本的列表，
+    比逐句呼叫 convert_text 快很多。
+
+    Args:
+        texts: 要轉換的文字列表
+        mode: 轉換模式
+
+    Returns:
+        轉換後的文字列表（順序與 texts 相同）
+    """
+    if not texts:
+        return []
+
+    converter = get_converter(mode)
+
+    # 文字本身含有分隔符時無法安全合併，改逐句轉換
+    if any(_SENTINEL in text for text in texts):
+        return [converter.convert(text) for text in texts]
+
+    converted = converter.convert(_SENTINEL.join(texts)).split(_SENTINEL)
+    if len(converted) != len(texts):
+        return [converter.convert(text) for text in texts]
+    return converted
 
 
 def convert_srt_file(
@@ -185,8 +206,7 @@ def convert_srt_file(
     Returns:
         輸出檔案路徑
     """
-    _ensure_opencc()
-    converter = opencc.OpenCC(mode)
+    converter = get_converter(mode)
 
     if output_path is None:
         output_path = input_path
@@ -218,65 +238,59 @@ def convert_draft(
     Returns:
         轉換的文字數量
     """
-    _ensure_opencc()
-    converter = opencc.OpenCC(mode)
     count = 0
 
-    # 轉換 texts 素材
     texts = script.imported_materials.get("texts", [])
-    for text_mat in texts:
+    templates = script.imported_materials.get("text_templates", [])
+
+    # 收集需要轉換的文字：每個素材只解析一次 JSON，最後一次批次轉換
+    pending = []  # (text_mat, JSON content 或 None（純文字格式）, 原文)
+    queued_ids = set()
+
+    def queue_text(text_mat: Dict[str, Any]):
+        if id(text_mat) in queued_ids:
+            return
+        queued_ids.add(id(text_mat))
+
         content_str = text_mat.get("content", "")
         if not content_str:
-            continue
+            return
 
         try:
             # JSON 格式的 content
             content = json.loads(content_str)
             original = content.get("text", "")
             if original:
-                converted = converter.convert(original)
-                if converted != original:
-                    content["text"] = converted
-                    text_mat["content"] = json.dumps(content, ensure_ascii=False)
-                    count += 1
-                    if verbose:
-                        print(f"  [{count}] {original[:30]}... → {converted[:30]}...")
+                pending.append((text_mat, content, original))
         except (json.JSONDecodeError, TypeError):
             # 純文字格式
-            original = content_str
-            converted = converter.convert(original)
-            if converted != original:
-                text_mat["content"] = converted
-                count += 1
-                if verbose:
-                    print(f"  [{count}] {original[:30]}... → {converted[:30]}...")
-
-    # 轉換 text_templates 中的文字
-    templates = script.imported_materials.get("text_templates", [])
-    for template in templates:
-        resources = template.get("text_info_resources", [])
-        for resource in resources:
-            text_material_id = resource.get("text_material_id")
-            if not text_material_id:
-                continue
-
-            # 找到對應的 text 素材並轉換
-            for text_mat in texts:
-                if text_mat.get("id") != text_material_id:
-                    continue
-
-                content_str = text_mat.get("content", "")
-                try:
-                    content = json.loads(content_str)
-                    original = content.get("text", "")
-                    if original:
-                        converted = converter.convert(original)
-                        if converted != original:
-                            content["text"] = converted
-                            text_mat["content"] = json.dumps(content, ensure_ascii=False)
-                            # 不重複計數，因為上面已經處理過
-                except (json.JSONDecodeError, TypeError):
-                    pass
+            pending.append((text_mat, None, content_str))
+
+    # 轉換 texts 素材
+    for text_mat in texts:
+        queue_text(text_mat)
+
+    # text_templates 引用的文字素材（以 id 索引查找，已處理過的不會重複解析）
+    if templates:
+        text_index = {text_mat.get("id"): text_mat for text_mat in texts}
+        for template in templates:
+            for resource in template.get("text_info_resources", []):
+                text_mat = text_index.get(resource.get("text_material_id"))
+                if text_mat is not None:
+                    queue_text(text_mat)
+
+    converted_list = convert_many([original for _, _, original in pending], mode)
+    for (text_mat, content, original), converted in zip(pending, converted_list):
+        if converted == original:
+            continue
+        if content is not None:
+            content["text"] = converted
+            text_mat["content"] = json.dumps(content, ensure_ascii=False)
+        else:
+            text_mat["content"] = converted
+        count += 1
+        if verbose:
+            print(f"  [{count}] {original[:30]}... → {converted[:30]}...")
 
     return count
 
@@ -0,0 +1,261 @@
+"""
+草稿目錄索引 - 草稿名稱、修改時間、是否加密、大小只讀取一次
+
+索引保存在記憶體並寫入 cache/draft_catalog.json，重新整理時：
+    - 只掃描草稿根目錄一層（os.scandir），每個草稿 stat 一次 draft_content.json
+    - draft_content.json 的修改時間與大小、draft_meta_info.json 的修改時間都沒變時沿用索引
+    - 有安裝 watchdog 時以檔案系統事件標記變更，沒有事件就不重新掃描；
+      否則最多每 min_interval 秒掃描一次
+
+使用方式：
+    catalog = get_draft_catalog()
+    total, drafts = catalog.list(offset=0, limit=50, query="旅遊")
+    path = catalog.find("我的草稿")
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_INDEX_FILE = Path(__file__).parent.parent / "cache" / "draft_catalog.json"
+
+_INDEX_VERSION = 1
+
+
+def _sniff_encrypted(content_path: str) -> bool:
+    """新版剪映的加密草稿不是以 '{' 開頭的 JSON"""
+    try:
+        with open(content_path, "rb") as f:
+            head = f.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")
+    except OSError:
+        return False
+    return not head.startswith(b"{")
+
+
+def _read_draft_name(meta_path: str, default: str) -> str:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("draft_name", default) or default
+    except (OSError, ValueError, AttributeError):
+        return default
+
+
+class DraftCatalog:
+    """單一草稿目錄的索引"""
+
+    def __init__(self, drafts_path: Path, index_file: Optional[Path] = None, min_interval: float = 2.0):
+        """
+        Args:
+            drafts_path: 剪映草稿目錄
+            index_file: 索引檔路徑（None 表示不寫入磁碟）
+            min_interval: 沒有檔案系統監看時，兩次掃描的最短間隔（秒）
+        """
+        self.drafts_path = Path(drafts_path)
+        self.index_file = Path(index_file) if index_file else None
+        self.min_interval = min_interval
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._sorted: List[Dict[str, Any]] = []
+        self._lock = threading.RLock()
+        self._last_scan = 0.0
+        self._dirty = True
+        self._observer = None
+        self._load_index()
+        self._start_watcher()
+
+    def _load_index(self):
+        if not self.index_file:
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != _INDEX_VERSION or data.get("root") != str(self.drafts_path):
+            return
+        self._entries = data.get("drafts", {})
+        self._resort()
+
+    def _save_index(self):
+        if not self.index_file:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": _INDEX_VERSION, "root": str(self.drafts_path), "drafts": self._entries},
+                      f, ensure_ascii=False)
+        tmp_path.replace(self.index_file)
+
+    def _start_watcher(self):
+        """有 watchdog 時監看草稿目錄，收到事件才標記需要重新掃描"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+
+        catalog = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                catalog._dirty = True
+
+        try:
+            observer = Observer()
+            observer.schedule(_Handler(), str(self.drafts_path), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception:
+            return
+        self._observer = observer
+
+    def _resort(self):
+        self._sorted = sorted(self._entries.values(), key=lambda d: d["mtime"], reverse=True)
+
+    def _scan_entry(self, folder: os.DirEntry) -> Optional[Dict[str, Any]]:
+        content_path = os.path.join(folder.path, "draft_content.json")
+        meta_path = os.path.join(folder.path, "draft_meta_info.json")
+        try:
+            content_stat = os.stat(content_path)
+        except OSError:
+            return None
+        try:
+            meta_mtime = os.stat(meta_path).st_mtime
+        except OSError:
+            meta_mtime = None
+
+        cached = self._entries.get(folder.name)
+        if (cached is not None
+                and cached["mtime"] == content_stat.st_mtime
+                and cached["size"] == content_stat.st_size
+                and cached.get("meta_mtime") == meta_mtime):
+            return cached
+
+        encrypted = _sniff_encrypted(content_path)
+        if cached is not None and cached.get("meta_mtime") == meta_mtime:
+            name = cached["name"]
+        else:
+            name = _read_draft_name(meta_path, folder.name) if meta_mtime is not None else folder.name
+
+        return {
+            "name": name,
+            "folder": folder.name,
+            "path": content_path,
+            "mtime": content_stat.st_mtime,
+            "size": content_stat.st_size,
+            "meta_mtime": meta_mtime,
+            "encrypted": encrypted,
+        }
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        增量更新索引
+
+        Args:
+            force: 忽略監看狀態與掃描間隔，立即掃描
+
+        Returns:
+            索引是否有變更
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force:
+                if self._observer is not None and not self._dirty:
+                    return False
+                if self._observer is None and now - self._last_scan < self.min_interval:
+                    return False
+
+            self._dirty = False
+            self._last_scan = now
+
+            entries: Dict[str, Dict[str, Any]] = {}
+            changed = False
+            with os.scandir(self.drafts_path) as it:
+                for folder in it:
+                    if not folder.is_dir():
+                        continue
+                    entry = self._scan_entry(folder)
+                    if entry is None:
+                        continue
+                    if entry is not self._entries.get(folder.name):
+                        changed = True
+                    entries[folder.name] = entry
+
+            if changed or len(entries) != len(self._entries):
+                self._entries = entries
+                self._resort()
+                self._save_index()
+                return True
+            return False
+
+    def list(self, offset: int = 0, limit: Optional[int] = 50,
+             query: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        列出草稿（最新修改的在前）
+
+        Args:
+            offset: 略過前幾筆
+            limit: 最多回傳幾筆（None 表示全部）
+            query: 搜尋字串（比對草稿名稱與資料夾名稱，不分大小寫）
+
+        Returns:
+            (符合條件的總數, 草稿列表)
+        """
+        self.refresh()
+        with self._lock:
+            drafts = self._sorted
+            if query:
+                needle = query.casefold()
+                drafts = [d for d in drafts if needle in d["name"].casefold() or needle in d["folder"].casefold()]
+            end = None if limit is None else offset + limit
+            return len(drafts), [dict(d) for d in drafts[offset:end]]
+
+    def find(self, name: str) -> str:
+        """
+        根據名稱搜尋草稿
+
+        Returns:
+            draft_content.json 的路徑
+
+        Raises:
+            FileNotFoundError: 找不到匹配的草稿
+            ValueError: 部分匹配到多個草稿
+        """
+        self.refresh()
+        with self._lock:
+            for draft in self._sorted:
+                if draft["name"] == name or draft["folder"] == name:
+                    return draft["path"]
+
+        _, matches = self.list(limit=None, query=name)
+        if len(matches) == 1:
+            return matches[0]["path"]
+        elif len(matches) > 1:
+            raise ValueError(
+                f"找到多個匹配的草稿：\n" +
+                "\n".join(f"  - {d['name']}" for d in matches[:5])
+            )
+
+        raise FileNotFoundError(f"找不到名為 '{name}' 的草稿")
+
+
+_catalogs: Dict[str, DraftCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_draft_catalog(drafts_path: Optional[Path] = None) -> DraftCatalog:
+    """取得（或建立）草稿目錄的索引；預設目錄的索引會寫入磁碟"""
+    is_default = drafts_path is None
+    if drafts_path is None:
+        from .converter import get_jianying_drafts_path
+        drafts_path = get_jianying_drafts_path()
+
+    key = str(Path(drafts_path))
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = DraftCatalog(Path(drafts_path), DEFAULT_INDEX_FILE if is_default else None)
+            _catalogs[key] = catalog
+        return catalog
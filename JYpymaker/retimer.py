@@ -0,0 +1,165 @@
+"""
+翻譯後重新計時 - 依譯文閱讀長度切分字幕並重新分配時間
+
+翻譯後的字幕沿用原文片段的起訖時間，但中文譯文的閱讀長度與英文原文差異很大。
+此模組對每條譯文：
+    1. 依字元比例把譯文的每個字對應到原文的說話時間軸（原文的停頓也會出現在譯文中）
+    2. 過長時交給字幕分段引擎（segmenter.segment_words）找出最佳斷點，
+       與原文分段使用同一套成本：標點、停頓、閱讀速度、最短顯示時間
+    3. 切點對齊原文的字邊界；顯示時間仍不足時調整切點，最後向後延長（不與下一條重疊）
+
+每條譯文只往回看一條字幕的長度，為線性時間。
+不依賴任何翻譯服務，可直接用假翻譯測試：
+    cues = segment_transcript(raw_segments)
+    translated = [{**c, "original": c["text"], "text": fake_translate(c["text"])} for c in cues]
+    retimed = retime_translated(translated, max_chars=16)
+"""
+
+import bisect
+from typing import Any, Dict, List, Optional
+
+from .segmenter import segment_words, words_from_segments
+
+
+def _display_length(text: str) -> int:
+    return len(text.strip())
+
+
+class _SourceTimeline:
+    """原文的說話時間軸：依字元比例把譯文位置 (0~1) 對應到原文的時間"""
+
+    def __init__(self, words: List[Dict[str, Any]], start: float, end: float):
+        self.start, self.end = start, end
+        self.words = [w for w in words if str(w.get("word", "")).strip()]
+        # 每個原文字開始前的累計字數
+        self.offsets: List[int] = []
+        cumulative = 0
+        for word in self.words:
+            self.offsets.append(cumulative)
+            cumulative += len(word["word"].strip())
+        self.total = cumulative
+        # 可切的字邊界：(累計字數, 切點時間)，切在兩字之間的停頓中點
+        self.edges = [
+            (self.offsets[i], (self.words[i - 1]["end"] + self.words[i]["start"]) / 2)
+            for i in range(1, len(self.words))
+        ]
+
+    def _clamp(self, time: float) -> float:
+        return min(max(time, self.start), self.end)
+
+    def time_at(self, fraction: float) -> float:
+        """譯文進度 fraction 對應的時間（在原文字的發音區間內線性內插）"""
+        if self.total == 0:
+            return self.start + (self.end - self.start) * fraction
+        position = fraction * self.total
+        i = max(0, bisect.bisect_right(self.offsets, position) - 1)
+        word = self.words[i]
+        length = len(word["word"].strip())
+        ratio = min(max((position - self.offsets[i]) / length, 0.0), 1.0)
+        return self._clamp(word["start"] + (word["end"] - word["start"]) * ratio)
+
+    def snap(self, fraction: float) -> float:
+        """譯文進度 fraction 最接近的原文字邊界時間"""
+        if not self.edges:
+            return self.time_at(fraction)
+        position = fraction * self.total
+        i = bisect.bisect_left(self.edges, (position, float("-inf")))
+        candidates = self.edges[max(0, i - 1):i + 1]
+        return self._clamp(min(candidates, key=lambda edge: abs(edge[0] - position))[1])
+
+
+def _translated_words(text: str, timeline: _SourceTimeline) -> List[Dict[str, Any]]:
+    """
+    把譯文切成字並依原文時間軸給定時間（供 segment_words 使用）
+
+    words_from_segments 在 0~1 的區間內依字數比例分配，即為每個字在譯文中的進度。
+    """
+    words = words_from_segments([{"start": 0.0, "end": 1.0, "text": text}])
+    for word in words:
+        word["fraction"] = word["start"]
+        word["start"] = timeline.time_at(word["start"])
+        word["end"] = timeline.time_at(word["end"])
+    return words
+
+
+def _fit_durations(bounds: List[float], needs: List[float]) -> List[float]:
+    """調整切點，讓每段至少有 needs[i] 秒；總長不足時改為依 needs 比例分配"""
+    start, end = bounds[0], bounds[-1]
+    if sum(needs) >= end - start:
+        total = sum(needs) or 1.0
+        result = [start]
+        for need in needs:
+            result.append(result[-1] + (end - start) * need / total)
+        result[-1] = end
+        return result
+
+    result = list(bounds)
+    for i in range(1, len(result) - 1):
+        result[i] = max(result[i], result[i - 1] + needs[i - 1])
+    for i in range(len(result) - 2, 0, -1):
+        result[i] = min(result[i], result[i + 1] - needs[i])
+    return result
+
+
+def retime_translated(
+    cues: List[Dict[str, Any]],
+    max_chars: int = 16,
+    max_cps: float = 9.0,
+    min_duration: float = 0.8,
+    max_extend: float = 1.5
+) -> List[Dict[str, Any]]:
+    """
+    切分並重新計時翻譯後的字幕
+
+    Args:
+        cues: [{"start", "end", "text": 譯文, "original"?: 原文, "words"?: 原文字級時間戳}, ...]（依時間排序）
+        max_chars: 每條字幕最大字數
+        max_cps: 舒適閱讀速度（每秒字數），用於計算每條字幕需要的顯示時間
+        min_duration: 每條字幕最短顯示時間
+        max_extend: 顯示時間不足時，最多向後延長的秒數
+
+    Returns:
+        新的字幕列表 [{"start", "end", "text", "original"?}, ...]
+    """
+    result: List[Dict[str, Any]] = []
+    for cue in cues:
+        text = cue["text"].strip()
+        if not text:
+            continue
+
+        start, end = cue["start"], cue["end"]
+        if _display_length(text) <= max_chars:
+            pieces, bounds = [text], [start, end]
+        else:
+            timeline = _SourceTimeline(cue.get("words") or [], start, end)
+            words = _translated_words(text, timeline)
+            parts = segment_words(words, max_chars=max_chars, max_cps=max_cps, min_duration=min_duration)
+            pieces = [part["text"] for part in parts]
+            # 斷點位置（下一條第一個字的譯文進度）對齊最接近的原文字邊界
+            bounds = [start]
+            consumed = 0
+            for part in parts[:-1]:
+                consumed += len(part["words"])
+                bounds.append(timeline.snap(words[consumed]["fraction"]))
+            bounds.append(end)
+            needs = [max(_display_length(p) / max_cps, min_duration) for p in pieces]
+            bounds = _fit_durations(bounds, needs)
+
+        for i, piece in enumerate(pieces):
+            new_cue = {"start": bounds[i], "end": bounds[i + 1], "text": piece}
+            if "original" in cue:
+                new_cue["original"] = cue["original"]
+            result.append(new_cue)
+
+    # 顯示時間不足的字幕向後延長，但不超過下一條字幕的開始時間
+    for i, cue in enumerate(result):
+        need = max(_display_length(cue["text"]) / max_cps, min_duration)
+        if cue["end"] - cue["start"] >= need:
+            continue
+        limit: Optional[float] = result[i + 1]["start"] if i + 1 < len(result) else None
+        new_end = min(cue["start"] + need, cue["end"] + max_extend)
+        if limit is not None:
+            new_end = min(new_end, limit)
+        cue["end"] = max(cue["end"], new_end)
+
+    return result
@@ -12,7 +12,8 @@ from . import util
 from . import assets
 from . import exceptions
 from .template_mode import ImportedTrack, EditableTrack, ImportedMediaTrack, ImportedTextTrack, ShrinkMode, ExtendMode, import_track
-from .time_util import Timerange, tim, srt_tstamp
+from .time_util import Timerange, tim
+from .subtitle_io import iter_srt_file
 from .local_materials import VideoMaterial, AudioMaterial
 from .segment import BaseSegment, Speed, ClipSettings, AudioFade
 from .audio_segment import AudioSegment
@@ -311,50 +312,11 @@ class ScriptFile:
         if track_name not in self.tracks:
             self.add_track(TrackType.text, track_name, relative_index=999)  # 在所有文本軌道的最上層
 
-        with open(srt_path, "r", encoding="utf-8-sig") as srt_file:
-            lines = srt_file.readlines()
-
-        def __add_text_segment(text: str, t_range: Timerange) -> None:
-            seg = TextSegment(text, t_range, text_style=text_style, clip_settings=clip_settings)
+        for start, end, text in iter_srt_file(srt_path):
+            seg = TextSegment(text.strip(), Timerange(start + time_offset, end - start),
+                              text_style=text_style, clip_settings=clip_settings)
             self.add_segment(seg, track_name)
 
-        index = 0
-        text: str = ""
-        text_trange: Timerange
-        read_state: Literal["index", "timestamp", "content"] = "index"
-        while index < len(lines):
-            line = lines[index].strip()
-            if read_state == "index":
-                if len(line) == 0:
-                    index += 1
-                    continue
-                if not line.isdigit():
-                    raise ValueError("Expected a number at line %d, got '%s'" % (index+1, line))
-                index += 1
-                read_state = "timestamp"
-            elif read_state == "timestamp":
-                # 讀取時間戳
-                start_str, end_str = line.split(" --> ")
-                start, end = srt_tstamp(start_str), srt_tstamp(end_str)
-                text_trange = Timerange(start + time_offset, end - start)
-
-                index += 1
-                read_state = "content"
-            elif read_state == "content":
-                # 內容結束, 生成片段
-                if len(line) == 0:
-                    __add_text_segment(text.strip(), text_trange)
-
-                    text = ""
-                    read_state = "index"
-                else:
-                    text += line + "\n"
-                index += 1
-
-        # 添加最後一個片段
-        if len(text) > 0:
-            __add_text_segment(text.strip(), text_trange)
-
         return self
 
     def get_imported_track(self, track_type: Literal[TrackType.video, TrackType.audio, TrackType.text],
@@ -0,0 +1,241 @@
+"""
+字幕分段引擎 - 以字級時間戳 + 動態規劃找出最佳斷點
+
+對整份逐字稿的所有字一次處理（每個字只往回看一條字幕的長度，整體為線性時間），
+最小化以下成本的總和：
+    - 閱讀速度：每秒字數超過 max_cps 時的懲罰
+    - 字幕長度：太短的字幕（畫面閃過）與太多字幕的懲罰，超過 max_chars 不允許
+    - 斷點位置：句末標點 > 逗號類標點 > 句中
+    - 停頓長度：停頓越長越適合斷開，超過 max_gap 強制斷開
+    - 原始片段邊界一律斷開（不跨片段合併）；片段內跨過句末標點時加上 sentence_weight，
+      遠高於字幕過短的懲罰，因此不會為了湊長度而把兩句合併成一條
+
+沒有字級時間戳的片段（例如 SenseVoice 或 whisper-cpp）會依字數比例產生近似的字時間，
+再交給同一個引擎處理。
+
+使用方式：
+    from JYpymaker.segmenter import segment_transcript
+    cues = segment_transcript(raw_segments, max_chars=25)
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(rf"\s*[{_CJK}]|\s*[^\s{_CJK}]+")
+_PUNCT_ONLY = re.compile(r"^\s*[^\w\s]+$")
+
+STRONG_PUNCTUATION = set("。！？.!?…")
+WEAK_PUNCTUATION = set("，、；：,;:—")
+
+
+def _word_field(word: Any, name: str, default: Any) -> Any:
+    """同時支援 faster-whisper Word 物件與 dict"""
+    if hasattr(word, name):
+        return getattr(word, name)
+    return word.get(name, default)
+
+
+def _tokenize(text: str) -> List[str]:
+    """將無字級時間的文字切成「字」：中日韓一字一個，其他以空白分隔，標點併入前一個"""
+    tokens: List[str] = []
+    for token in _TOKEN_PATTERN.findall(text):
+        if tokens and _PUNCT_ONLY.match(token):
+            tokens[-1] += token.strip()
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def words_from_segments(segments: List[dict]) -> List[Dict[str, Any]]:
+    """
+    將原始片段攤平成字列表
+
+    有字級時間戳時直接使用；沒有時依字元數比例分配片段時間。
+    每個片段的最後一個字會標記 segment_end，分段時一定在此斷開。
+
+    Args:
+        segments: [{"start", "end", "text", "words"?}, ...]
+
+    Returns:
+        [{"word": str, "start": float, "end": float, "segment_end": bool}, ...]
+    """
+    words: List[Dict[str, Any]] = []
+    for seg in segments:
+        seg_words = seg.get("words") or []
+        if seg_words:
+            items = [
+                {
+                    "word": _word_field(w, "word", ""),
+                    "start": _word_field(w, "start", 0.0),
+                    "end": _word_field(w, "end", 0.0),
+                    "segment_end": False,
+                }
+                for w in seg_words
+            ]
+        else:
+            tokens = _tokenize(seg["text"])
+            total_chars = sum(len(t.strip()) for t in tokens) or 1
+            duration = seg["end"] - seg["start"]
+            current = seg["start"]
+            items = []
+            for token in tokens:
+                token_end = current + duration * len(token.strip()) / total_chars
+                items.append({"word": token, "start": current, "end": token_end, "segment_end": False})
+                current = token_end
+
+        if items:
+            items[-1]["segment_end"] = True
+            words.extend(items)
+    return words
+
+
+def _tail(word: Dict[str, Any]) -> str:
+    return word["word"].rstrip()[-1:] if word["word"].strip() else ""
+
+
+def _boundary_cost(word: Dict[str, Any], gap: float, punct_weight: float, gap_ref: float) -> float:
+    """在 word 之後斷開的成本：標點與停頓越明顯，成本越低"""
+    tail = _tail(word)
+    if tail in STRONG_PUNCTUATION:
+        return 0.0
+    if tail in WEAK_PUNCTUATION:
+        cost = punct_weight * 0.2
+    else:
+        cost = punct_weight
+    # 停頓越長越適合斷開（最多降低 75%）
+    return cost * (1.0 - 0.75 * min(max(gap, 0.0), gap_ref) / gap_ref)
+
+
+def segment_words(
+    words: List[Dict[str, Any]],
+    max_chars: int = 25,
+    max_cps: float = 12.0,
+    max_duration: float = 7.0,
+    min_duration: float = 0.8,
+    max_gap: float = 1.5,
+    cps_weight: float = 1.0,
+    length_weight: float = 3.0,
+    duration_weight: float = 6.0,
+    punct_weight: float = 10.0,
+    gap_ref: float = 0.6,
+    sentence_weight: float = 40.0
+) -> List[Dict[str, Any]]:
+    """
+    以動態規劃切分字幕
+
+    Args:
+        words: words_from_segments() 的輸出
+        max_chars: 每條字幕最大字數（單一字超過時例外）
+        max_cps: 舒適閱讀速度上限（每秒字數）
+        max_duration: 每條字幕最長秒數
+        min_duration: 每條字幕建議最短秒數
+        max_gap: 停頓超過此秒數必定斷開
+        cps_weight: 閱讀速度過快的懲罰權重
+        length_weight: 字幕過短的懲罰權重
+        duration_weight: 顯示時間過短的懲罰權重
+        punct_weight: 在句中（無標點）斷開的懲罰
+        gap_ref: 停頓達到此秒數即視為理想斷點
+        sentence_weight: 同一條字幕跨過片段內句末標點的懲罰
+
+    Returns:
+        [{"start": float, "end": float, "text": str, "words": [...]}, ...]
+    """
+    n = len(words)
+    if n == 0:
+        return []
+
+    # 累計字數（不含字首空白），用於 O(1) 計算任一區間的字數
+    lengths = [len(w["word"]) for w in words]
+    leading = [len(w["word"]) - len(w["word"].lstrip()) for w in words]
+    cumulative = [0] * (n + 1)
+    for i, length in enumerate(lengths):
+        cumulative[i + 1] = cumulative[i] + length
+
+    # 在第 i 個字之後斷開的成本（最後一個字之後不計）
+    boundary = [
+        _boundary_cost(
+            words[i],
+            words[i + 1]["start"] - words[i]["end"] if i + 1 < n else max_gap,
+            punct_weight, gap_ref
+        )
+        for i in range(n)
+    ]
+    boundary[-1] = 0.0
+
+    # 片段內的句末標點：跨過時加上 sentence_weight
+    sentence_end = [_tail(w) in STRONG_PUNCTUATION for w in words]
+
+    INF = float("inf")
+    best = [INF] * (n + 1)
+    back = [0] * (n + 1)
+    best[0] = 0.0
+
+    for end in range(1, n + 1):
+        cue_end_time = words[end - 1]["end"]
+        crossed_sentences = 0
+        for start in range(end - 1, -1, -1):
+            if start < end - 1:
+                # 往前延伸時，若與下一個字之間停頓過長，或跨過原始片段邊界，不能合併
+                if words[start + 1]["start"] - words[start]["end"] > max_gap or words[start].get("segment_end"):
+                    break
+                if sentence_end[start]:
+                    crossed_sentences += 1
+
+            chars = cumulative[end] - cumulative[start] - leading[start]
+            duration = max(cue_end_time - words[start]["start"], 1e-3)
+            single = start == end - 1
+            if not single and (chars > max_chars or duration > max_duration):
+                break
+            if best[start] == INF:
+                continue
+
+            cost = best[start] + boundary[end - 1] + sentence_weight * crossed_sentences
+            cps = chars / duration
+            if cps > max_cps:
+                cost += cps_weight * (cps - max_cps) ** 2
+            cost += length_weight * ((max_chars - min(chars, max_chars)) / max_chars) ** 2
+            if duration < min_duration:
+                cost += duration_weight * (min_duration - duration)
+
+            if cost < best[end]:
+                best[end] = cost
+                back[end] = start
+
+    # 回溯斷點
+    cuts = []
+    end = n
+    while end > 0:
+        start = back[end]
+        cuts.append((start, end))
+        end = start
+    cuts.reverse()
+
+    cues = []
+    for start, end in cuts:
+        cue_words = words[start:end]
+        text = "".join(w["word"] for w in cue_words).strip()
+        if not text:
+            continue
+        cues.append({
+            "start": cue_words[0]["start"],
+            "end": cue_words[-1]["end"],
+            "text": text,
+            "words": [{"word": w["word"], "start": w["start"], "end": w["end"]} for w in cue_words],
+        })
+    return cues
+
+
+def segment_transcript(segments: List[dict], max_chars: int = 25, **options: Any) -> List[Dict[str, Any]]:
+    """
+    便捷函數：原始片段 → 字列表 → 最佳分段
+
+    Args:
+        segments: 原始片段列表（可含 words）
+        max_chars: 每條字幕最大字數
+        **options: 傳給 segment_words 的其他參數
+
+    Returns:
+        切分後的字幕列表（含 words，供翻譯後重新計時使用）
+    """
+    return segment_words(words_from_segments(segments), max_chars=max_chars, **options)
@@ -0,0 +1,216 @@
+"""
+字幕讀寫 - SRT / WebVTT / JSON Lines 共用的讀寫工具
+
+    - format_timestamp / parse_timestamp: 整數微秒與時間碼互轉（不經浮點運算）
+    - SubtitleWriter: 串流寫入器，片段一到就寫入，結束時回傳字幕數
+    - write_subtitles: 一次寫完整個片段序列（可為產生器），回傳字幕數
+    - iter_srt_file / iter_srt_text: 逐條解析 SRT，不先讀成行列表
+
+片段格式與語音辨識輸出相同：{"start": 秒, "end": 秒, "text": str, "words"?: [...]}
+
+使用方式：
+    count = write_subtitles(segments, "output.srt")
+
+    with SubtitleWriter("output.vtt") as writer:
+        for seg in asr_segments:
+            writer.write(seg)
+
+    for start_us, end_us, text in iter_srt_file("input.srt"):
+        ...
+"""
+
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+SubtitleFormat = str  # "srt" | "vtt" | "jsonl"
+
+_SUFFIX_FORMATS = {".srt": "srt", ".vtt": "vtt", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+_US_PER_SECOND = 1_000_000
+
+
+def seconds_to_us(seconds: float) -> int:
+    """秒（浮點）轉為整數微秒"""
+    return int(round(seconds * _US_PER_SECOND))
+
+
+def format_timestamp(us: int, separator: str = ",") -> str:
+    """
+    將整數微秒格式化為 HH:MM:SS,mmm（四捨五入到毫秒）
+
+    Args:
+        us: 微秒數
+        separator: 毫秒分隔符號，SRT 為 ","，WebVTT 為 "."
+    """
+    ms = (max(us, 0) + 500) // 1000
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """解析 HH:MM:SS,mmm 或 HH:MM:SS.mmm（WebVTT 可省略小時），返回微秒數"""
+    timestamp = timestamp.strip()
+    clock, _, fraction = timestamp.replace(".", ",").partition(",")
+    parts = clock.split(":")
+    total = 0
+    for part in parts:
+        total = total * 60 + int(part)
+    ms = int(fraction.ljust(3, "0")[:3]) if fraction else 0
+    return total * _US_PER_SECOND + ms * 1000
+
+
+def format_for_path(path: Union[str, Path], fmt: Optional[SubtitleFormat] = None) -> SubtitleFormat:
+    """依副檔名判斷字幕格式（未知副檔名視為 SRT）"""
+    if fmt:
+        if fmt not in ("srt", "vtt", "jsonl"):
+            raise ValueError(f"不支援的字幕格式: {fmt}")
+        return fmt
+    return _SUFFIX_FORMATS.get(Path(path).suffix.lower(), "srt")
+
+
+class SubtitleWriter:
+    """串流字幕寫入器：每次 write() 立即寫出一條字幕"""
+
+    def __init__(self, output: Union[str, Path, TextIO], fmt: Optional[SubtitleFormat] = None,
+                 include_words: bool = False):
+        """
+        Args:
+            output: 輸出路徑或已開啟的文字檔案物件
+            fmt: 字幕格式（預設依副檔名判斷）
+            include_words: JSON Lines 是否輸出字級時間戳
+        """
+        if isinstance(output, (str, Path)):
+            self.fmt = format_for_path(output, fmt)
+            self._file: TextIO = open(output, "w", encoding="utf-8", newline="\n")
+            self._owns_file = True
+        else:
+            self.fmt = fmt or "srt"
+            self._file = output
+            self._owns_file = False
+        self.include_words = include_words
+        self.count = 0
+
+        if self.fmt == "vtt":
+            self._file.write("WEBVTT\n\n")
+
+    def write(self, segment: Dict[str, Any]) -> int:
+        """寫入一條字幕，返回目前字幕數（空白文字會略過）"""
+        text = segment["text"].strip()
+        if not text:
+            return self.count
+
+        self.count += 1
+        start_us = seconds_to_us(segment["start"])
+        end_us = seconds_to_us(segment["end"])
+
+        if self.fmt == "srt":
+            self._file.write(f"{self.count}\n{format_timestamp(start_us)} --> {format_timestamp(end_us)}\n{text}\n\n")
+        elif self.fmt == "vtt":
+            self._file.write(f"{format_timestamp(start_us, '.')} --> {format_timestamp(end_us, '.')}\n{text}\n\n")
+        else:
+            record = {"index": self.count, "start": start_us / _US_PER_SECOND, "end": end_us / _US_PER_SECOND, "text": text}
+            if self.include_words and segment.get("words"):
+                record["words"] = segment["words"]
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return self.count
+
+    def tee(self, segments: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        邊寫邊轉交：適合接在語音辨識產生器後面，寫入後立刻把片段交給下游
+
+        每條字幕寫入後即 flush，辨識途中檔案內容就是目前為止的字幕。
+        """
+        for segment in segments:
+            self.write(segment)
+            self._file.flush()
+            yield segment
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self) -> int:
+        """關閉檔案，返回字幕數"""
+        if self._owns_file and not self._file.closed:
+            self._file.close()
+        return self.count
+
+    def __enter__(self) -> "SubtitleWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_subtitles(segments: Iterable[Dict[str, Any]], output_path: Union[str, Path],
+                    fmt: Optional[SubtitleFormat] = None, include_words: bool = False) -> int:
+    """
+    寫入字幕檔
+
+    Args:
+        segments: 片段序列（可為產生器，邊產生邊寫入）
+        output_path: 輸出路徑
+        fmt: 字幕格式（預設依副檔名判斷）
+        include_words: JSON Lines 是否輸出字級時間戳
+
+    Returns:
+        寫入的字幕數
+    """
+    with SubtitleWriter(output_path, fmt, include_words=include_words) as writer:
+        for segment in segments:
+            writer.write(segment)
+    return writer.count
+
+
+def write_srt(segments: Iterable[Dict[str, Any]], output_path: Union[str, Path]) -> int:
+    """寫入 SRT 字幕檔，返回字幕數"""
+    return write_subtitles(segments, output_path, fmt="srt")
+
+
+def _iter_srt_lines(lines: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+    text_lines = []
+    start = end = 0
+    state = "index"
+    for line_no, raw_line in enumerate(lines, 1):
+        line = raw_line.strip()
+        if state == "index":
+            if not line:
+                continue
+            if not line.isdigit():
+                raise ValueError("Expected a number at line %d, got '%s'" % (line_no, line))
+            state = "timestamp"
+        elif state == "timestamp":
+            start_str, _, end_str = line.partition("-->")
+            if not end_str:
+                raise ValueError("Expected a timestamp at line %d, got '%s'" % (line_no, line))
+            # 時間碼之後可能帶有位置設定，只取第一個欄位
+            start, end = parse_timestamp(start_str), parse_timestamp(end_str.split()[0])
+            state = "content"
+        elif line:
+            text_lines.append(line)
+        else:
+            yield start, end, "\n".join(text_lines)
+            text_lines = []
+            state = "index"
+
+    if state == "content" and text_lines:
+        yield start, end, "\n".join(text_lines)
+
+
+def iter_srt_file(srt_path: Union[str, Path]) -> Iterator[Tuple[int, int, str]]:
+    """
+    逐條解析 SRT 檔案（邊讀邊解析，不先載入整個檔案）
+
+    Yields:
+        (開始微秒, 結束微秒, 文字)
+    """
+    with open(srt_path, "r", encoding="utf-8-sig") as f:
+        yield from _iter_srt_lines(f)
+
+
+def iter_srt_text(content: str) -> Iterator[Tuple[int, int, str]]:
+    """逐條解析 SRT 字串"""
+    return _iter_srt_lines(io.StringIO(content))
@@ -12,17 +12,26 @@ JYpymaker 語音辨識模組 - 直接輸出繁體字幕
     python -m JYpymaker.transcribe video.mp4 --engine sensevoice  # 使用 SenseVoice
 """
 
+import os
 import sys
+import threading
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Callable, Iterable, Iterator, Optional, List, Tuple, Union
 
+# 逐片段回報進度：on_segment(片段, 進度 0~1)
+SegmentCallback = Callable[[dict, float], None]
 
-def _transcribe_with_sensevoice(media_path: str, device: str = "auto") -> List[dict]:
+
+def _transcribe_with_sensevoice(
+    media_path: str,
+    device: str = "auto",
+    on_segment: Optional[SegmentCallback] = None
+) -> Iterator[dict]:
     """
     使用 sherpa-onnx SenseVoice 進行語音辨識（中文優化，支援中英日韓粵）
 
-    Returns:
-        List[dict]: [{"start": float, "end": float, "text": str}, ...]
+    Yields:
+        每辨識完一個 VAD 片段就產生 {"start": float, "end": float, "text": str}
     """
     try:
         import sherpa_onnx
@@ -93,7 +102,8 @@ def _transcribe_with_sensevoice(media_path: str, device: str = "auto") -> List[d
     os.unlink(wav_path)
 
     # VAD 分段辨識
-    segments = []
+    count = 0
+    total_duration = max(len(samples) / sample_rate, 1e-3)
     window_size = int(0.1 * sample_rate)  # 100ms 窗口
 
     for i in range(0, len(samples), window_size):
@@ -118,50 +128,162 @@ def _transcribe_with_sensevoice(media_path: str, device: str = "auto") -> List[d
 
         text = stream.result.text.strip()
         if text:
-            segments.append({
-                "start": start_time,
-                "end": end_time,
-                "text": text
-            })
+            segment = {"start": start_time, "end": end_time, "text": text}
+            count += 1
+            if on_segment:
+                on_segment(segment, min(end_time / total_duration, 1.0))
+            yield segment
 
-    print(f"[SenseVoice] 辨識完成，共 {len(segments)} 個片段")
-    return segments
+    print(f"[SenseVoice] 辨識完成，共 {count} 個片段")
 
 
-def _transcribe_with_whisper(
+# faster-whisper VAD 參數（同時作為快取鍵的一部分）
+WHISPER_VAD_PARAMETERS = {
+    "min_silence_duration_ms": 500,   # 靜音 0.5 秒就斷句
+    "speech_pad_ms": 200,             # 語音前後 padding
+}
+
+
+def _cached_transcribe(
     media_path: str,
-    model: str = "medium",
-    language: str = "zh",
-    device: str = "auto",
-    initial_prompt: Optional[str] = None
-) -> List[dict]:
+    use_cache: bool,
+    run,
+    on_segment: Optional[SegmentCallback] = None,
+    runtimes: Optional[List[Tuple[str, str]]] = None,
+    used_runtime: Optional[Callable[[], Tuple[str, str]]] = None,
+    **key_params
+) -> Iterator[dict]:
     """
-    使用 faster-whisper 進行語音辨識
+    先查語音辨識快取，未命中才執行 run() 並寫回快取
 
-    Returns:
-        List[dict]: [{"start": float, "end": float, "text": str}, ...]
+    片段逐一產生：未命中時辨識出一個就交出一個，全部辨識完成後才寫入快取
+    （中途取消或失敗不會留下不完整的快取）。
+
+    Args:
+        media_path: 影片或音訊檔案路徑
+        use_cache: 是否使用快取
+        run: 實際執行辨識的函數，回傳原始片段（含 words）的產生器
+        on_segment: 快取命中時，依序以快取片段回報進度
+        runtimes: 可能使用的 (device, compute_type)，依序查快取（None 表示與裝置無關）
+        used_runtime: run() 之後取得實際使用的 (device, compute_type)，作為寫入的快取鍵
+        **key_params: 組成快取鍵的參數（engine, model, language, ...）
+
+    Yields:
+        原始片段
     """
+    if not use_cache:
+        yield from run()
+        return
+
+    from .transcript_cache import transcript_cache
+
+    def make_key(runtime: Optional[Tuple[str, str]]) -> str:
+        if runtime is None:
+            return transcript_cache.make_key(media_path, **key_params)
+        device, compute_type = runtime
+        return transcript_cache.make_key(media_path, device=device, compute_type=compute_type, **key_params)
+
+    for runtime in runtimes or [None]:
+        raw_segments = transcript_cache.get(make_key(runtime))
+        if raw_segments is not None:
+            print(f"[快取] 使用已存在的辨識結果（{len(raw_segments)} 個片段）")
+            total = max((seg["end"] for seg in raw_segments), default=0.0) or 1.0
+            for seg in raw_segments:
+                if on_segment:
+                    on_segment(seg, min(seg["end"] / total, 1.0))
+                yield seg
+            return
+
+    raw_segments = []
+    for seg in run():
+        raw_segments.append(seg)
+        yield seg
+    runtime = used_runtime() if used_runtime else (runtimes[0] if runtimes else None)
+    transcript_cache.put(make_key(runtime), raw_segments)
+
+
+# 已載入的 faster-whisper 模型（多個辨識任務共用，不重複載入）
+_whisper_models: dict = {}
+# (model, device) → 實際使用的 (device, compute_type)
+_whisper_runtimes: dict = {}
+_whisper_models_lock = threading.Lock()
+
+# device 參數 → 依序嘗試的 (device, compute_type)（auto 先試 GPU，失敗改用 CPU）
+WHISPER_RUNTIMES = {
+    "auto": [("cuda", "float16"), ("cpu", "int8")],
+    "cuda": [("cuda", "float16")],
+    "cpu": [("cpu", "int8")],
+}
+
+
+def _whisper_runtime_candidates(device: str) -> List[Tuple[str, str]]:
+    return WHISPER_RUNTIMES.get(device, WHISPER_RUNTIMES["cpu"])
+
+
+def _loaded_whisper_runtime(model: str, device: str) -> Tuple[str, str]:
+    """模型載入後實際使用的 (device, compute_type)"""
+    with _whisper_models_lock:
+        return _whisper_runtimes.get((model, device), _whisper_runtime_candidates(device)[0])
+
+
+def _whisper_cache_runtimes(model: str, device: str) -> List[Tuple[str, str]]:
+    """查快取時要比對的 (device, compute_type)：模型已載入時只比對實際使用的那一組"""
+    with _whisper_models_lock:
+        loaded = _whisper_runtimes.get((model, device))
+    return [loaded] if loaded else _whisper_runtime_candidates(device)
+
+
+def _load_whisper_model(model: str, device: str = "auto"):
+    """載入 faster-whisper 模型，同一 (model, device) 只載入一次"""
     try:
         from faster_whisper import WhisperModel
     except ImportError:
         raise ImportError("請安裝 faster-whisper: pip install faster-whisper")
 
-    media_file = Path(media_path)
+    with _whisper_models_lock:
+        whisper_model = _whisper_models.get((model, device))
+        if whisper_model is not None:
+            return whisper_model
+
+        print(f"[Whisper] 載入模型: {model}")
+
+        candidates = _whisper_runtime_candidates(device)
+        for index, (run_device, compute_type) in enumerate(candidates):
+            try:
+                whisper_model = WhisperModel(model, device=run_device, compute_type=compute_type)
+            except Exception:
+                if index == len(candidates) - 1:
+                    raise
+                print("[Whisper] GPU 不可用，使用 CPU")
+                continue
+            if device == "auto" and run_device == "cuda":
+                print("[Whisper] 使用 GPU 加速")
+            break
 
-    # 初始化模型
-    print(f"[Whisper] 載入模型: {model}")
-
-    if device == "auto":
-        try:
-            whisper_model = WhisperModel(model, device="cuda", compute_type="float16")
-            print("[Whisper] 使用 GPU 加速")
-        except Exception:
-            print("[Whisper] GPU 不可用，使用 CPU")
-            whisper_model = WhisperModel(model, device="cpu", compute_type="int8")
-    elif device == "cuda":
-        whisper_model = WhisperModel(model, device="cuda", compute_type="float16")
-    else:
-        whisper_model = WhisperModel(model, device="cpu", compute_type="int8")
+        _whisper_models[(model, device)] = whisper_model
+        _whisper_runtimes[(model, device)] = (run_device, compute_type)
+        return whisper_model
+
+
+def _transcribe_with_whisper(
+    media_path: str,
+    model: str = "medium",
+    language: str = "zh",
+    device: str = "auto",
+    initial_prompt: Optional[str] = None,
+    on_segment: Optional[SegmentCallback] = None
+) -> Iterator[dict]:
+    """
+    使用 faster-whisper 進行語音辨識
+
+    on_segment 會在 faster-whisper 產生器每吐出一個片段時被呼叫，
+    進度以片段結束時間 / 音訊總長估算。
+
+    Yields:
+        原始片段 {"start": float, "end": float, "text": str, "words": [...]}（辨識與迭代同步進行）
+    """
+    media_file = Path(media_path)
+    whisper_model = _load_whisper_model(model, device)
 
     # 辨識（使用 VAD 過濾 + 更好的分句參數）
     print(f"[Whisper] 辨識中: {media_file.name}")
@@ -171,141 +293,64 @@ def _transcribe_with_whisper(
         initial_prompt=initial_prompt,
         word_timestamps=True,  # 開啟字級時間戳
         vad_filter=True,       # VAD 過濾靜音
-        vad_parameters={
-            "min_silence_duration_ms": 500,   # 靜音 0.5 秒就斷句
-            "speech_pad_ms": 200,             # 語音前後 padding
-        },
+        vad_parameters=WHISPER_VAD_PARAMETERS,
     )
 
     print(f"[Whisper] 偵測語言: {info.language}, 機率: {info.language_probability:.2%}")
 
-    # 收集原始片段
-    raw_segments = []
+    # segments 為產生器，辨識與迭代同步進行
+    total_duration = max(info.duration or 0.0, 1e-3)
+    count = 0
     for segment in segments:
-        raw_segments.append({
+        raw_segment = {
             "start": segment.start,
             "end": segment.end,
             "text": segment.text.strip(),
-            "words": segment.words if segment.words else []
-        })
+            "words": [
+                {"word": w.word, "start": w.start, "end": w.end}
+                for w in (segment.words or [])
+            ]
+        }
+        count += 1
+        if on_segment:
+            on_segment(raw_segment, min(segment.end / total_duration, 1.0))
+        yield raw_segment
 
-    # 智慧分句：根據標點和長度進一步切分
-    srt_segments = _smart_split_segments(raw_segments)
+    print(f"[Whisper] 辨識完成，共 {count} 個原始片段")
 
-    print(f"[Whisper] 辨識完成，共 {len(srt_segments)} 個片段")
-    return srt_segments
 
-
-def _smart_split_segments(segments: List[dict], max_chars: int = 25) -> List[dict]:
+def _smart_split_segments(segments: Iterable[dict], max_chars: int = 25) -> Iterator[List[dict]]:
     """
-    智慧分句：根據標點符號和長度切分過長的字幕
+    智慧分句：以字級時間戳做最佳化分段（見 segmenter.py）
+
+    分段引擎不會跨原始片段合併，因此逐片段分段與整份一起分段的結果相同，
+    原始片段一到就能輸出對應的字幕。
 
     Args:
-        segments: 原始片段列表
+        segments: 原始片段（可為辨識中的產生器）
         max_chars: 每段最大字數（預設 25 字，適合字幕閱讀）
 
-    Returns:
-        切分後的片段列表
+    Yields:
+        每個原始片段切分後的片段列表
     """
-    import re
-
-    result = []
-    # 中文斷句標點
-    split_pattern = re.compile(r'([。！？，、；：\.\!\?\,\;])')
-
-    for seg in segments:
-        text = seg["text"]
-        start = seg["start"]
-        end = seg["end"]
-        words = seg.get("words", [])
-
-        # 如果文字夠短，直接保留
-        if len(text) <= max_chars:
-            result.append({"start": start, "end": end, "text": text})
-            continue
-
-        # 有字級時間戳的話，用更精確的方式分句
-        if words:
-            current_text = ""
-            current_start = None
-            current_end = None
-
-            for word in words:
-                word_text = word.word if hasattr(word, 'word') else word.get('word', '')
-                word_start = word.start if hasattr(word, 'start') else word.get('start', 0)
-                word_end = word.end if hasattr(word, 'end') else word.get('end', 0)
-
-                if current_start is None:
-                    current_start = word_start
-
-                current_text += word_text
-                current_end = word_end
-
-                # 遇到斷句標點或超過長度限制
-                is_punctuation = bool(split_pattern.search(word_text))
-                is_too_long = len(current_text) >= max_chars
-
-                if is_punctuation or is_too_long:
-                    if current_text.strip():
-                        result.append({
-                            "start": current_start,
-                            "end": current_end,
-                            "text": current_text.strip()
-                        })
-                    current_text = ""
-                    current_start = None
-
-            # 處理剩餘文字
-            if current_text.strip():
-                result.append({
-                    "start": current_start or start,
-                    "end": current_end or end,
-                    "text": current_text.strip()
-                })
-        else:
-            # 沒有字級時間戳，用標點切分並估算時間
-            parts = split_pattern.split(text)
-            # 合併標點到前一個片段
-            merged = []
-            for i, part in enumerate(parts):
-                if split_pattern.match(part) and merged:
-                    merged[-1] += part
-                elif part.strip():
-                    merged.append(part)
-
-            if not merged:
-                result.append({"start": start, "end": end, "text": text})
-                continue
+    from .segmenter import segment_transcript
+
+    for segment in segments:
+        yield [
+            {"start": cue["start"], "end": cue["end"], "text": cue["text"]}
+            for cue in segment_transcript([segment], max_chars=max_chars)
+        ]
 
-            # 按比例分配時間
-            total_chars = sum(len(p) for p in merged)
-            duration = end - start
-            current_time = start
-
-            for part in merged:
-                part_duration = (len(part) / total_chars) * duration if total_chars > 0 else 0
-                part_end = current_time + part_duration
-
-                # 如果還是太長，再切分
-                if len(part) > max_chars:
-                    sub_parts = [part[i:i+max_chars] for i in range(0, len(part), max_chars)]
-                    sub_duration = part_duration / len(sub_parts)
-                    for sub in sub_parts:
-                        result.append({
-                            "start": current_time,
-                            "end": current_time + sub_duration,
-                            "text": sub.strip()
-                        })
-                        current_time += sub_duration
-                else:
-                    result.append({
-                        "start": current_time,
-                        "end": part_end,
-                        "text": part.strip()
-                    })
-                    current_time = part_end
-
-    return result
+
+def _traditional_converter() -> Optional[Callable[[List[str]], List[str]]]:
+    """取得繁體轉換函數（OpenCC 無法載入時為 None）"""
+    try:
+        from .converter import convert_many, get_converter
+        get_converter("s2twp")
+    except ImportError:
+        print("[OpenCC] 警告：無法載入 OpenCC，跳過繁體轉換")
+        return None
+    return lambda texts: convert_many(texts, mode="s2twp")
 
 
 def transcribe_to_srt(
@@ -316,23 +361,31 @@ def transcribe_to_srt(
     traditional: bool = True,
     device: str = "auto",
     initial_prompt: Optional[str] = None,
-    engine: str = "whisper"
-) -> str:
+    engine: str = "whisper",
+    max_chars: int = 25,
+    use_cache: bool = True,
+    return_count: bool = False,
+    on_segment: Optional[SegmentCallback] = None
+) -> Union[str, Tuple[str, int]]:
     """
-    語音辨識並輸出 SRT 字幕檔
+    語音辨識並輸出字幕檔（依副檔名輸出 SRT / WebVTT / JSON Lines）
 
     Args:
         media_path: 影片或音訊檔案路徑
-        output_path: 輸出 SRT 路徑（預設為原檔名.srt）
+        output_path: 輸出路徑（.srt / .vtt / .jsonl，預設為原檔名.srt）
         model: Whisper 模型 (tiny, base, small, medium, large-v3)
         language: 語言代碼 (zh, en, ja, etc.)
         traditional: 是否轉換為繁體中文（預設 True）
         device: 裝置 (auto, cuda, cpu)
         initial_prompt: 提示詞，可引導輸出風格
         engine: 辨識引擎 (whisper, paddle)
+        max_chars: 每段字幕最大字數
+        use_cache: 是否使用語音辨識快取（相同音訊與參數不重複辨識）
+        return_count: 是否一併回傳字幕數（省去重新讀檔計算）
+        on_segment: 辨識出每個原始片段時的回調 (片段, 進度 0~1)
 
     Returns:
-        輸出的 SRT 檔案路徑
+        輸出的字幕檔案路徑；return_count=True 時為 (路徑, 字幕數)
     """
     media_file = Path(media_path)
     if not media_file.exists():
@@ -343,58 +396,75 @@ def transcribe_to_srt(
         suffix = "_zh-TW" if traditional else "_zh-CN"
         output_path = str(media_file.with_suffix("")) + suffix + ".srt"
 
-    # 根據引擎選擇辨識方式
+    # 根據引擎選擇辨識方式（皆為產生器，辨識一段就往下游交一段）
     if engine == "sensevoice":
-        # SenseVoice 辨識（中文優化）
-        srt_segments = _transcribe_with_sensevoice(media_path, device=device)
+        # SenseVoice 辨識（中文優化），片段直接作為字幕
+        cue_groups = ([seg] for seg in _cached_transcribe(
+            media_path, use_cache,
+            lambda: _transcribe_with_sensevoice(media_path, device=device, on_segment=on_segment),
+            on_segment=on_segment,
+            engine="sensevoice",
+            model="sense-voice-zh-en-ja-ko-yue-2024-07-17",
+            word_timestamps=False
+        ))
     else:
         # faster-whisper 辨識（預設）
         if initial_prompt is None and language == "zh" and traditional:
             initial_prompt = "以下是繁體中文的語音內容。"
 
-        srt_segments = _transcribe_with_whisper(
-            media_path,
+        raw_segments = _cached_transcribe(
+            media_path, use_cache,
+            lambda: _transcribe_with_whisper(
+                media_path,
+                model=model,
+                language=language,
+                device=device,
+                initial_prompt=initial_prompt,
+                on_segment=on_segment
+            ),
+            on_segment=on_segment,
+            runtimes=_whisper_cache_runtimes(model, device),
+            used_runtime=lambda: _loaded_whisper_runtime(model, device),
+            engine="faster-whisper",
             model=model,
             language=language,
-            device=device,
-            initial_prompt=initial_prompt
+            initial_prompt=initial_prompt,
+            vad_parameters=WHISPER_VAD_PARAMETERS,
+            word_timestamps=True
         )
 
-    # 繁體轉換
-    if traditional and language == "zh":
-        print("[OpenCC] 轉換為繁體中文...")
-        try:
-            from .converter import convert_text
-            for seg in srt_segments:
-                seg["text"] = convert_text(seg["text"], mode="s2twp")
-        except ImportError:
-            print("[OpenCC] 警告：無法載入 OpenCC，跳過繁體轉換")
+        # 智慧分句：根據標點和長度進一步切分
+        cue_groups = _smart_split_segments(raw_segments, max_chars=max_chars)
 
-    # 寫入 SRT
-    _write_srt(srt_segments, output_path)
-    print(f"[SRT] 已儲存: {output_path}")
-
-    return output_path
+    # 繁體轉換（每個原始片段的字幕一起轉換）
+    convert = _traditional_converter() if traditional and language == "zh" else None
 
+    def iter_cues() -> Iterator[dict]:
+        for cues in cue_groups:
+            if convert and cues:
+                for cue, text in zip(cues, convert([cue["text"] for cue in cues])):
+                    cue["text"] = text
+            yield from cues
 
-def _format_srt_time(seconds: float) -> str:
-    """格式化 SRT 時間碼"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
+    # 邊辨識邊寫入：先寫到 .part，完成後才取代輸出檔（失敗或取消時不留下不完整的字幕）
+    from .subtitle_io import SubtitleWriter, format_for_path
+    part_path = f"{output_path}.part"
+    try:
+        with SubtitleWriter(part_path, fmt=format_for_path(output_path)) as writer:
+            for _ in writer.tee(iter_cues()):
+                pass
+        os.replace(part_path, output_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+        raise
+    count = writer.count
+    print(f"[SRT] 已儲存: {output_path}（{count} 條字幕）")
+
+    if return_count:
+        return output_path, count
 
-def _write_srt(segments: List[dict], output_path: str):
-    """寫入 SRT 檔案"""
-    with open(output_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(segments, 1):
-            start_time = _format_srt_time(seg["start"])
-            end_time = _format_srt_time(seg["end"])
-            f.write(f"{i}\n")
-            f.write(f"{start_time} --> {end_time}\n")
-            f.write(f"{seg['text']}\n\n")
+    return output_path
 
 
 def transcribe_to_draft(
@@ -404,7 +474,9 @@ def transcribe_to_draft(
     language: str = "zh",
     traditional: bool = True,
     device: str = "auto",
-    engine: str = "whisper"
+    engine: str = "whisper",
+    use_cache: bool = True,
+    on_segment: Optional[SegmentCallback] = None
 ) -> str:
     """
     一條龍：影片 → 語音辨識 → 繁體字幕 → 剪映草稿
@@ -417,6 +489,8 @@ def transcribe_to_draft(
         traditional: 是否轉換為繁體
         device: 運算裝置
         engine: 辨識引擎 (whisper, paddle)
+        use_cache: 是否使用語音辨識快取
+        on_segment: 辨識出每個原始片段時的回調 (片段, 進度 0~1)
 
     Returns:
         草稿資料夾路徑
@@ -445,7 +519,9 @@ def transcribe_to_draft(
         language=language,
         traditional=traditional,
         device=device,
-        engine=engine
+        engine=engine,
+        use_cache=use_cache,
+        on_segment=on_segment
     )
 
     # 2. 建立草稿資料夾
@@ -586,7 +662,7 @@ def main():
     )
 
     parser.add_argument("input", help="影片或音訊檔案")
-    parser.add_argument("-o", "--output", help="輸出 SRT 檔案路徑")
+    parser.add_argument("-o", "--output", help="輸出字幕檔案路徑（.srt / .vtt / .jsonl）")
     parser.add_argument("-m", "--model", default="medium",
                         help="Whisper 模型 (tiny/base/small/medium/large-v3)")
     parser.add_argument("-l", "--language", default="zh",
@@ -599,6 +675,10 @@ def main():
                         choices=["auto", "cuda", "cpu"],
                         help="運算裝置")
     parser.add_argument("-p", "--prompt", help="提示詞")
+    parser.add_argument("--max-chars", type=int, default=25,
+                        help="每段字幕最大字數")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不使用語音辨識快取，強制重新辨識")
 
     args = parser.parse_args()
 
@@ -613,7 +693,9 @@ def main():
             language=args.language,
             traditional=traditional,
             device=args.device,
-            initial_prompt=args.prompt
+            initial_prompt=args.prompt,
+            max_chars=args.max_chars,
+            use_cache=not args.no_cache
         )
         print(f"\n完成！字幕檔案: {output}")
     except Exception as e:
@@ -0,0 +1,416 @@
+"""
+語音辨識任務佇列 - 限制同時辨識數量，逐片段推送進度
+
+流程：
+    1. submit() 送出辨識任務，進入佇列並立即回傳任務（含 job id）
+    2. 固定數量的 worker 依優先權（同優先權先進先出）取出任務，
+       faster-whisper 每吐出一個片段就推送一筆 segment 事件（含進度與預估剩餘時間）
+    3. 完成時推送 done 事件（含 SRT 與草稿路徑），失敗或取消時推送 error 事件
+    4. 任務狀態寫入 cache/transcribe_jobs.json，重新啟動後未完成的任務會重新排入佇列
+
+同時辨識數量預設為 1，可用環境變數 JYPYMAKER_ASR_WORKERS 調整。
+
+使用方式：
+    job = transcribe_job_manager.submit({"path": "video.mp4", "output_mode": "srt"}, priority=1)
+    for event, data in job.iter_events():
+        print(event, data)
+    transcribe_job_manager.cancel(job.id)
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_STATE_FILE = Path(__file__).parent.parent / "cache" / "transcribe_jobs.json"
+
+# 最多保留的已結束任務數
+_MAX_FINISHED_JOBS = 100
+
+_FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """任務被取消（由 on_segment 回調拋出以中斷辨識）"""
+
+
+class TranscribeJob:
+    """一次語音辨識任務"""
+
+    def __init__(self, params: Dict[str, Any], priority: int = 0):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.priority = priority
+        self.status = "queued"  # queued, running, completed, failed, cancelled
+        self.cancel_requested = False
+        self.progress = 0.0
+        self.segment_count = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in _FINISHED_STATUSES
+
+    def eta(self) -> Optional[float]:
+        """依目前進度推估剩餘秒數"""
+        if self.started_at is None or self.progress <= 0 or self.done:
+            return None
+        elapsed = time.time() - self.started_at
+        return round(elapsed / self.progress * (1 - self.progress), 1)
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        with self._cond:
+            self._events.append((event, data))
+            self._cond.notify_all()
+
+    def mark_running(self) -> bool:
+        """
+        排隊中 → 執行中（與 request_cancel 互斥，已取消的任務不會再開始）
+
+        Returns:
+            是否開始執行
+        """
+        with self._cond:
+            if self.cancel_requested or self.status != "queued":
+                return False
+            self.status = "running"
+            self.started_at = time.time()
+            self._emit("status", {"status": self.status})
+        return True
+
+    def request_cancel(self) -> bool:
+        """
+        要求取消：排隊中的任務直接標記取消；執行中的任務會在下一個片段時中斷
+
+        Returns:
+            是否已直接標記為取消（排隊中的任務）
+        """
+        with self._cond:
+            if self.done:
+                return False
+            self.cancel_requested = True
+            if self.status == "queued":
+                self.fail("任務已取消", status="cancelled")
+                return True
+        return False
+
+    def add_segment(self, segment: Dict[str, Any], progress: float):
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.segment_count += 1
+        self.progress = max(self.progress, progress)
+        self._emit("segment", {
+            "index": self.segment_count,
+            "start": round(segment["start"], 3),
+            "end": round(segment["end"], 3),
+            "text": segment["text"],
+            "progress": round(self.progress, 4),
+            "eta": self.eta(),
+        })
+
+    def complete(self, result: Dict[str, Any]):
+        with self._cond:
+            if self.done:
+                return
+            self.result = result
+            self.progress = 1.0
+            self.finished_at = time.time()
+            self.status = "completed"
+            self._emit("done", self.to_dict())
+
+    def fail(self, error: str, status: str = "failed"):
+        with self._cond:
+            if self.done:
+                return
+            self.error = error
+            self.finished_at = time.time()
+            self.status = status
+            self._emit("error", self.to_dict())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任務結束，返回是否已結束"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "path": self.params.get("path"),
+            "output_mode": self.params.get("output_mode", "srt"),
+            "priority": self.priority,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "eta": self.eta(),
+            "segments": self.segment_count,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait": round((self.started_at or end) - self.created_at, 1),
+            "duration": round(end - self.started_at, 1) if self.started_at else None,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """持久化用的資料（不含事件）"""
+        return {
+            "id": self.id,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "segment_count": self.segment_count,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TranscribeJob":
+        job = cls(state["params"], priority=state.get("priority", 0))
+        job.id = state["id"]
+        job.created_at = state.get("created_at", job.created_at)
+        job.result = state.get("result")
+        job.error = state.get("error")
+        if state.get("status") in _FINISHED_STATUSES:
+            job.status = state["status"]
+            job.progress = state.get("progress", 0.0)
+            job.segment_count = state.get("segment_count", 0)
+            job.started_at = state.get("started_at")
+            job.finished_at = state.get("finished_at")
+        # 其餘（排隊中或執行到一半）重新排隊，從頭辨識
+        return job
+
+    def iter_events(self, keepalive: float = 15.0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        依發生順序逐筆產生事件（中途連線也會先補送已發生的事件）
+
+        Yields:
+            ("status" | "segment" | "keepalive", data)，最後為 ("done" | "error", 任務資訊)
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                if sent >= len(self._events) and not self.done:
+                    self._cond.wait(keepalive)
+                pending = self._events[sent:]
+                done = self.done
+
+            if not pending and not done:
+                yield "keepalive", {}
+            for event in pending:
+                yield event
+            sent += len(pending)
+
+            if done and sent >= len(self._events):
+                return
+
+
+def _srt_path_for(media_path: str, traditional: bool) -> str:
+    return str(Path(media_path).with_suffix("")) + ("_zh-TW" if traditional else "_zh-CN") + ".srt"
+
+
+def run_transcribe_job(job: TranscribeJob, on_start=None):
+    """在目前執行緒執行辨識任務（結果與錯誤都寫回 job）"""
+    params = job.params
+    media_path = params["path"]
+    options = {
+        "model": params.get("model", "medium"),
+        "language": params.get("language", "zh"),
+        "traditional": params.get("traditional", True),
+        "engine": params.get("engine", "whisper"),
+        "on_segment": job.add_segment,
+    }
+
+    # 排隊期間已被取消
+    if not job.mark_running():
+        return
+    try:
+        if on_start:
+            on_start()
+        if params.get("output_mode", "srt") == "draft":
+            from .transcribe import transcribe_to_draft
+            draft_path = transcribe_to_draft(media_path, **options)
+            result = {
+                "draft_path": draft_path,
+                "draft_name": Path(draft_path).name,
+                "srt_path": _srt_path_for(media_path, options["traditional"]),
+            }
+        else:
+            from .transcribe import transcribe_to_srt
+            output, count = transcribe_to_srt(media_path, return_count=True, **options)
+            result = {"output": output, "srt_path": output, "segments": count}
+    except JobCancelled:
+        job.fail("任務已取消", status="cancelled")
+        return
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        job.fail(str(e))
+        return
+
+    job.complete(result)
+
+
+class TranscribeJobManager:
+    """語音辨識任務佇列：固定數量的 worker，優先權 + 先進先出，可取消、可持久化"""
+
+    def __init__(self, max_workers: int = 1, state_file: Path = DEFAULT_STATE_FILE):
+        """
+        Args:
+            max_workers: 同時辨識的任務數（每個 worker 會佔用一份模型記憶體與 CPU/GPU）
+            state_file: 任務狀態檔路徑
+        """
+        self.max_workers = max(1, max_workers)
+        self.state_file = Path(state_file)
+        self._queue: "queue.PriorityQueue[Tuple[int, int, str]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs: "OrderedDict[str, TranscribeJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 序列化與寫檔（共用同一個暫存檔）必須整段互斥
+        self._save_lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                states = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for state in states:
+            try:
+                job = TranscribeJob.from_state(state)
+            except (KeyError, TypeError):
+                continue
+            self._jobs[job.id] = job
+            if not job.done:
+                self._queue.put((-job.priority, next(self._seq), job.id))
+
+    def _save_state(self):
+        with self._save_lock:
+            with self._lock:
+                states = [job.to_state() for job in self._jobs.values()]
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_file.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(states, f, ensure_ascii=False)
+            tmp_path.replace(self.state_file)
+
+    def _prune(self):
+        """只保留最近的已結束任務（呼叫端需持有鎖）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._workers = [t for t in self._workers if t.is_alive()]
+            while len(self._workers) < self.max_workers:
+                t = threading.Thread(target=self._worker, name=f"transcribe-{len(self._workers)}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            job = self.get(job_id)
+            # 已取消或已被清除的任務直接略過
+            if job is None or job.done:
+                continue
+
+            # 單一任務的任何錯誤（包含寫入狀態檔失敗）都不能讓 worker 結束
+            try:
+                run_transcribe_job(job, on_start=self._save_state)
+                with self._lock:
+                    self._prune()
+                self._save_state()
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                job.fail(str(e))
+
+    def start(self):
+        """啟動 worker（有重新載入的未完成任務時立即開始處理）"""
+        self._ensure_workers()
+
+    def submit(self, params: Dict[str, Any], priority: int = 0) -> TranscribeJob:
+        """
+        送出語音辨識任務
+
+        Args:
+            params: {"path", "engine", "model", "language", "traditional", "output_mode"}
+            priority: 優先權，數字越大越先處理；相同優先權先進先出
+
+        Returns:
+            TranscribeJob（進度與結果會陸續寫入）
+        """
+        if not params.get("path"):
+            raise ValueError("請提供檔案路徑")
+        if not Path(params["path"]).exists():
+            raise FileNotFoundError(f"找不到檔案: {params['path']}")
+
+        job = TranscribeJob(params, priority=priority)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save_state()
+
+        self._queue.put((-job.priority, next(self._seq), job.id))
+        self._ensure_workers()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[TranscribeJob]:
+        """
+        取消任務：排隊中的任務直接標記取消；執行中的任務會在下一個片段時中斷
+
+        Returns:
+            任務（找不到時為 None）
+        """
+        job = self.get(job_id)
+        if job is not None and job.request_cancel():
+            self._save_state()
+        return job
+
+    def get(self, job_id: str) -> Optional[TranscribeJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> Dict[str, Any]:
+        """依狀態分組列出任務（含排隊與執行時間）"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+
+        queued = sorted((j for j in jobs if j.status == "queued"), key=lambda j: (-j.priority, j.created_at))
+        return {
+            "workers": self.max_workers,
+            "queued": [j.to_dict() for j in queued],
+            "running": [j.to_dict() for j in jobs if j.status == "running"],
+            "finished": [j.to_dict() for j in reversed(jobs) if j.done],
+        }
+
+
+def _default_workers() -> int:
+    try:
+        return int(os.environ.get("JYPYMAKER_ASR_WORKERS", "1"))
+    except ValueError:
+        return 1
+
+
+# 全域任務管理器
+transcribe_job_manager = TranscribeJobManager(max_workers=_default_workers())
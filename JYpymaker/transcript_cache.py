@@ -0,0 +1,208 @@
+"""
+語音辨識快取模組 - 避免重複執行 ASR
+
+快取鍵由以下內容組成：
+    - 音訊內容雜湊（檔案內容，非路徑）
+    - 引擎、模型、語言
+    - 運算裝置與精度（GPU float16 與 CPU int8 的辨識結果不同，分開保存）
+    - initial_prompt、VAD 參數、是否開啟字級時間戳
+
+快取內容為「原始片段 + 字級時間」，智慧分句與繁簡轉換都在讀取後才執行，
+因此只調整 max_chars 或 OpenCC 模式時不需要重新辨識。
+
+儲存格式（gzip 壓縮 JSON，時間以毫秒整數保存）：
+    {"v": 1, "segments": [[start_ms, end_ms, text, [[word, start_ms, end_ms], ...]], ...]}
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+CACHE_VERSION = 1
+
+# 預設快取目錄（與 models/ 同層）
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "cache" / "transcripts"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _word_field(word: Any, name: str, default: Any) -> Any:
+    """同時支援 faster-whisper Word 物件與 dict"""
+    if hasattr(word, name):
+        return getattr(word, name)
+    return word.get(name, default)
+
+
+def _to_ms(seconds: float) -> int:
+    return int(round((seconds or 0) * 1000))
+
+
+def _pack_segments(segments: List[dict]) -> List[list]:
+    """片段 → 精簡陣列格式"""
+    packed = []
+    for seg in segments:
+        words = [
+            [_word_field(w, "word", ""), _to_ms(_word_field(w, "start", 0)), _to_ms(_word_field(w, "end", 0))]
+            for w in seg.get("words") or []
+        ]
+        packed.append([_to_ms(seg["start"]), _to_ms(seg["end"]), seg["text"], words])
+    return packed
+
+
+def _unpack_segments(packed: List[list]) -> List[dict]:
+    """精簡陣列格式 → 片段"""
+    segments = []
+    for start, end, text, words in packed:
+        segments.append({
+            "start": start / 1000,
+            "end": end / 1000,
+            "text": text,
+            "words": [{"word": w, "start": s / 1000, "end": e / 1000} for w, s, e in words]
+        })
+    return segments
+
+
+class TranscriptCache:
+    """
+    持久化語音辨識快取
+
+    用法：
+        cache = TranscriptCache()
+        key = cache.make_key(video_path, engine="whisper", model="medium", language="en")
+        segments = cache.get(key)
+        if segments is None:
+            segments = run_asr(...)
+            cache.put(key, segments)
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self._lock = threading.Lock()
+        self._fingerprints: Optional[Dict[str, Any]] = None
+
+    @property
+    def _fingerprint_file(self) -> Path:
+        return self.cache_dir / "fingerprints.json"
+
+    def _load_fingerprints(self) -> Dict[str, Any]:
+        if self._fingerprints is None:
+            try:
+                with open(self._fingerprint_file, "r", encoding="utf-8") as f:
+                    self._fingerprints = json.load(f)
+            except (OSError, ValueError):
+                self._fingerprints = {}
+        return self._fingerprints
+
+    def audio_hash(self, media_path: str) -> str:
+        """
+        計算媒體檔案內容雜湊
+
+        以 (路徑, 大小, mtime) 記住上次的結果，檔案未變動時不需重新讀取整個檔案。
+        """
+        media_file = Path(media_path).resolve()
+        stat = media_file.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+
+        with self._lock:
+            fingerprints = self._load_fingerprints()
+            cached = fingerprints.get(str(media_file))
+            if cached and cached["stamp"] == stamp:
+                return cached["hash"]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(media_file, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with self._lock:
+            fingerprints = self._load_fingerprints()
+            fingerprints[str(media_file)] = {"stamp": stamp, "hash": content_hash}
+            self._atomic_write(self._fingerprint_file, json.dumps(fingerprints).encode("utf-8"))
+
+        return content_hash
+
+    def make_key(
+        self,
+        media_path: str,
+        engine: str,
+        model: str,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        vad_parameters: Optional[Dict[str, Any]] = None,
+        word_timestamps: bool = True,
+        device: Optional[str] = None,
+        compute_type: Optional[str] = None,
+        **extra: Any
+    ) -> str:
+        """
+        產生快取鍵
+
+        Args:
+            media_path: 影片或音訊檔案路徑
+            engine: 辨識引擎
+            model: 模型名稱
+            language: 語言代碼
+            initial_prompt: 提示詞
+            vad_parameters: VAD 參數
+            word_timestamps: 是否開啟字級時間戳
+            device: 實際使用的運算裝置（cuda / cpu，不是 auto）
+            compute_type: 實際使用的精度（float16 / int8）
+            **extra: 其他會影響辨識結果的參數（如 task, temperature）
+
+        Returns:
+            快取鍵（十六進位字串）
+        """
+        params = {
+            "v": CACHE_VERSION,
+            "audio": self.audio_hash(media_path),
+            "engine": engine,
+            "model": model,
+            "language": language,
+            "initial_prompt": initial_prompt,
+            "vad_parameters": vad_parameters,
+            "word_timestamps": word_timestamps,
+            "device": device,
+            "compute_type": compute_type,
+            **extra
+        }
+        raw = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """讀取快取，不存在或損毀時回傳 None"""
+        path = self._path_for(key)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("v") != CACHE_VERSION:
+            return None
+        return _unpack_segments(data["segments"])
+
+    def put(self, key: str, segments: List[dict]):
+        """寫入快取（原子寫入，中斷時不會留下半個檔案）"""
+        data = {"v": CACHE_VERSION, "segments": _pack_segments(segments)}
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._atomic_write(self._path_for(key), gzip.compress(raw))
+
+    def _atomic_write(self, path: Path, payload: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+# 全域快取實例
+transcript_cache = TranscriptCache()
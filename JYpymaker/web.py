@@ -14,15 +14,16 @@ import json
 import threading
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify, stream_with_context
 
-from .converter import list_drafts, convert_draft_file
+from .converter import convert_draft_file
+from .draft_catalog import get_draft_catalog
+from .convert_jobs import convert_job_manager
+from .transcribe_jobs import transcribe_job_manager
+from utils.fs_scan import MEDIA_EXTENSIONS, scan_dir, get_media_index, format_size
 
 app = Flask(__name__)
 
-# 全域變數追蹤辨識進度
-transcribe_status = {"running": False, "progress": "", "result": None}
-
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
@@ -1088,8 +1089,14 @@ HTML_TEMPLATE = """
                 <button onclick="selectAll()">全選</button>
                 <button onclick="selectNone()">取消全選</button>
                 <button onclick="loadDrafts()">重新整理</button>
+                <input type="text" id="draftSearch" placeholder="搜尋草稿名稱..." oninput="searchDrafts()" style="width: 200px;">
             </div>
             <div class="draft-list" id="drafts">載入中...</div>
+            <div id="draftPager" style="margin-top: 8px;">
+                <button onclick="pageDrafts(-1)">上一頁</button>
+                <span id="draftPageInfo"></span>
+                <button onclick="pageDrafts(1)">下一頁</button>
+            </div>
         </div>
 
         <div class="section">
@@ -1351,7 +1358,7 @@ function scanFolder() {
 
     listDiv.innerHTML = '<p style="padding:10px;">掃描中...</p>';
 
-    fetch('/api/scan_folder?path=' + encodeURIComponent(folder))
+    fetch('/api/scan_folder?probe=1&path=' + encodeURIComponent(folder))
         .then(r => r.json())
         .then(data => {
             if (data.error) {
@@ -1367,7 +1374,10 @@ function scanFolder() {
             for (var i = 0; i < videoFiles.length; i++) {
                 var f = videoFiles[i];
                 html += '<div class="draft" onclick="selectVideo(' + i + ')" id="vf' + i + '">';
-                html += '<span style="color:#69db7c;">▶</span> ' + f.name + ' <span style="color:#888;">(' + f.size + ')</span>';
+                var meta = f.size;
+                if (f.duration) meta = formatTime(f.duration) + ', ' + meta;
+                if (f.width && f.height) meta += ', ' + f.width + 'x' + f.height;
+                html += '<span style="color:#69db7c;">▶</span> ' + f.name + ' <span style="color:#888;">(' + meta + ')</span>';
                 html += '</div>';
             }
             listDiv.innerHTML = html;
@@ -1436,7 +1446,7 @@ function startTranscribe(outputMode) {
         output_mode: outputMode
     };
 
-    fetch('/api/transcribe', {
+    fetch('/api/transcribe/jobs', {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},
         body: JSON.stringify(data)
@@ -1446,21 +1456,51 @@ function startTranscribe(outputMode) {
         if (data.error) {
             result.className = 'error';
             result.textContent = '錯誤: ' + data.error;
-        } else if (data.draft_path) {
-            result.className = 'success';
-            result.textContent = '✅ 剪映草稿已建立！\\n\\n' +
-                '草稿: ' + data.draft_name + '\\n' +
-                '字幕: ' + data.srt_path + '\\n' +
-                '耗時: ' + data.duration + ' 秒\\n\\n' +
-                '重新開啟剪映即可看到！';
-        } else {
+            resetButtons();
+            return;
+        }
+
+        // 逐片段接收辨識結果
+        var header = outputMode === 'draft' ? '一條龍處理中...' : '語音辨識中...';
+        var lines = [];
+        var source = new EventSource('/api/transcribe/jobs/' + data.job_id + '/events');
+        source.addEventListener('segment', function(e) {
+            var seg = JSON.parse(e.data);
+            lines.push('[' + formatTime(seg.start) + '] ' + seg.text);
+            if (lines.length > 12) lines.shift();
+            var eta = seg.eta === null ? '' : '，預估剩餘 ' + formatTime(seg.eta);
+            result.textContent = header + ' ' + (seg.progress * 100).toFixed(1) + '%' + eta +
+                '（' + seg.index + ' 段）\\n\\n' + lines.join('\\n');
+        });
+        source.addEventListener('done', function(e) {
+            var job = JSON.parse(e.data);
+            var r = job.result;
+            source.close();
             result.className = 'success';
-            result.textContent = '✅ 字幕產生完成！\\n\\n' +
-                '檔案: ' + data.output + '\\n' +
-                '片段: ' + data.segments + ' 段\\n' +
-                '耗時: ' + data.duration + ' 秒';
-        }
-        resetButtons();
+            if (r.draft_path) {
+                result.textContent = '✅ 剪映草稿已建立！\\n\\n' +
+                    '草稿: ' + r.draft_name + '\\n' +
+                    '字幕: ' + r.srt_path + '\\n' +
+                    '耗時: ' + job.duration + ' 秒\\n\\n' +
+                    '重新開啟剪映即可看到！';
+            } else {
+                result.textContent = '✅ 字幕產生完成！\\n\\n' +
+                    '檔案: ' + r.output + '\\n' +
+                    '片段: ' + r.segments + ' 段\\n' +
+                    '耗時: ' + job.duration + ' 秒';
+            }
+            resetButtons();
+        });
+        source.addEventListener('error', function(e) {
+            source.close();
+            result.className = 'error';
+            if (e.data) {
+                result.textContent = '錯誤: ' + JSON.parse(e.data).error;
+            } else {
+                result.textContent += '\\n連線中斷';
+            }
+            resetButtons();
+        });
     })
     .catch(e => {
         result.className = 'error';
@@ -1469,6 +1509,12 @@ function startTranscribe(outputMode) {
     });
 }
 
+function formatTime(seconds) {
+    seconds = Math.round(seconds);
+    var m = Math.floor(seconds / 60), s = seconds % 60;
+    return m + ':' + (s < 10 ? '0' : '') + s;
+}
+
 function resetButtons() {
     document.getElementById('srtBtn').disabled = false;
     document.getElementById('draftBtn').disabled = false;
@@ -1477,12 +1523,21 @@ function resetButtons() {
 }
 
 // ===== 草稿轉換 =====
+var draftsOffset = 0, draftsTotal = 0, draftsPageSize = 50, draftSearchTimer = null;
+
 function loadDrafts() {
     document.getElementById('drafts').innerHTML = '載入中...';
-    fetch('/api/drafts')
+    var query = document.getElementById('draftSearch').value.trim();
+    var url = '/api/drafts?offset=' + draftsOffset + '&limit=' + draftsPageSize + '&q=' + encodeURIComponent(query);
+    fetch(url)
         .then(r => r.json())
         .then(data => {
+            if (data.error) {
+                document.getElementById('drafts').innerHTML = '載入失敗: ' + data.error;
+                return;
+            }
             draftsData = data.drafts || [];
+            draftsTotal = data.total || 0;
             var html = '';
             for (var i = 0; i < draftsData.length; i++) {
                 var d = draftsData[i];
@@ -1494,12 +1549,30 @@ function loadDrafts() {
                 html += '</div>';
             }
             document.getElementById('drafts').innerHTML = html || '沒有找到草稿';
+            var pages = Math.max(1, Math.ceil(draftsTotal / draftsPageSize));
+            document.getElementById('draftPageInfo').textContent =
+                (Math.floor(draftsOffset / draftsPageSize) + 1) + ' / ' + pages + ' 頁（共 ' + draftsTotal + ' 個草稿）';
         })
         .catch(e => {
             document.getElementById('drafts').innerHTML = '載入失敗: ' + e;
         });
 }
 
+function pageDrafts(delta) {
+    var next = draftsOffset + delta * draftsPageSize;
+    if (next < 0 || next >= draftsTotal) return;
+    draftsOffset = next;
+    loadDrafts();
+}
+
+function searchDrafts() {
+    clearTimeout(draftSearchTimer);
+    draftSearchTimer = setTimeout(function() {
+        draftsOffset = 0;
+        loadDrafts();
+    }, 300);
+}
+
 function selectAll() {
     var cbs = document.querySelectorAll('#drafts input[type=checkbox]:not(:disabled)');
     for (var i = 0; i < cbs.length; i++) cbs[i].checked = true;
@@ -1529,9 +1602,9 @@ function convert() {
     var mode = document.getElementById('mode').value;
 
     result.className = 'info';
-    result.textContent = '轉換中... 請稍候';
+    result.textContent = '轉換中... (0/' + paths.length + ')\\n\\n';
 
-    fetch('/api/convert', {
+    fetch('/api/convert/jobs', {
         method: 'POST',
         headers: {'Content-Type': 'application/json'},
         body: JSON.stringify({paths: paths, mode: mode})
@@ -1541,19 +1614,37 @@ function convert() {
         if (data.error) {
             result.className = 'error';
             result.textContent = '錯誤: ' + data.error;
-        } else {
-            var text = '轉換完成！\\n\\n';
-            for (var i = 0; i < data.results.length; i++) {
-                var r = data.results[i];
-                if (r.success) {
-                    text += '[OK] ' + r.name + ': 轉換了 ' + r.count + ' 個文字片段\\n';
-                } else {
-                    text += '[FAIL] ' + r.name + ': ' + r.error + '\\n';
-                }
+            return;
+        }
+
+        // 逐個草稿接收轉換結果
+        var lines = '';
+        var finished = 0;
+        var source = new EventSource('/api/convert/jobs/' + data.job_id + '/events');
+        source.addEventListener('result', function(e) {
+            var r = JSON.parse(e.data);
+            finished++;
+            if (!r.success) {
+                lines += '[FAIL] ' + r.name + ': ' + r.error + '\\n';
+            } else if (r.skipped) {
+                lines += '[SKIP] ' + r.name + ': 內容未變更，略過\\n';
+            } else {
+                lines += '[OK] ' + r.name + ': 轉換了 ' + r.count + ' 個文字片段\\n';
             }
-            result.className = 'success';
-            result.textContent = text;
-        }
+            result.textContent = '轉換中... (' + finished + '/' + data.total + ')\\n\\n' + lines;
+        });
+        source.addEventListener('done', function(e) {
+            var s = JSON.parse(e.data);
+            source.close();
+            result.className = s.failed ? 'error' : 'success';
+            result.textContent = '轉換完成！成功 ' + s.converted + '，略過 ' + s.skipped +
+                '，失敗 ' + s.failed + '（' + s.duration + ' 秒）\\n\\n' + lines;
+        });
+        source.onerror = function() {
+            source.close();
+            result.className = 'error';
+            result.textContent += '\\n連線中斷';
+        };
     })
     .catch(e => {
         result.className = 'error';
@@ -1576,24 +1667,24 @@ def index():
 
 @app.route('/api/drafts')
 def api_drafts():
+    """草稿列表：支援分頁 (offset, limit) 與搜尋 (q)"""
     try:
-        drafts = list_drafts(limit=50)
-        result = []
-        for d in drafts:
-            draft_file = Path(d['path'])
-            is_encrypted = False
-            if draft_file.exists():
-                with open(draft_file, 'r', encoding='utf-8') as f:
-                    first_char = f.read(1)
-                    is_encrypted = (first_char != '{')
-
-            result.append({
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', 50, type=int)), 500)
+        query = request.args.get('q', '').strip() or None
+
+        total, drafts = get_draft_catalog().list(offset=offset, limit=limit, query=query)
+        result = [
+            {
                 'name': d['name'],
-                'path': str(d['path']),
+                'path': d['path'],
                 'mtime_str': datetime.fromtimestamp(d['mtime']).strftime('%Y-%m-%d %H:%M'),
-                'encrypted': is_encrypted
-            })
-        return jsonify({'drafts': result})
+                'size': d['size'],
+                'encrypted': d['encrypted']
+            }
+            for d in drafts
+        ]
+        return jsonify({'drafts': result, 'total': total, 'offset': offset, 'limit': limit})
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -1616,6 +1707,99 @@ def api_convert():
     return jsonify({'results': results})
 
 
+def _sse(event: str, data: dict) -> str:
+    """格式化一筆 Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events):
+    """將 (event, data) 產生器包成 SSE 回應"""
+    def generate():
+        for event, data in events:
+            if event == 'keepalive':
+                yield ": keepalive\n\n"
+            else:
+                yield _sse(event, data)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/convert/jobs', methods=['POST'])
+def api_convert_job_submit():
+    """送出批次轉換任務（多進程），回傳 job_id"""
+    data = request.json or {}
+    paths = data.get('paths', [])
+    mode = data.get('mode', 's2tw')
+    force = bool(data.get('force', False))
+
+    job = convert_job_manager.submit(paths, mode, force=force)
+    return jsonify({'job_id': job.id, 'total': len(job.paths)})
+
+
+@app.route('/api/convert/jobs/<job_id>')
+def api_convert_job_status(job_id):
+    job = convert_job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'找不到任務: {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/convert/jobs/<job_id>/events')
+def api_convert_job_events(job_id):
+    """以 SSE 逐個草稿推送轉換結果"""
+    job = convert_job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'找不到任務: {job_id}'}), 404
+    return _sse_response(job.iter_events())
+
+
+@app.route('/api/transcribe/jobs', methods=['POST'])
+def api_transcribe_job_submit():
+    """送出語音辨識任務（背景執行），回傳 job_id"""
+    data = request.json or {}
+    try:
+        priority = int(data.pop('priority', 0))
+        job = transcribe_job_manager.submit(data, priority=priority)
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({'error': str(e)})
+    return jsonify({'job_id': job.id, 'status': job.status})
+
+
+@app.route('/api/transcribe/jobs')
+def api_transcribe_job_list():
+    """列出排隊中、執行中、已結束的辨識任務（含排隊與執行時間）"""
+    return jsonify(transcribe_job_manager.list_jobs())
+
+
+@app.route('/api/transcribe/jobs/<job_id>/cancel', methods=['POST'])
+def api_transcribe_job_cancel(job_id):
+    job = transcribe_job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': f'找不到任務: {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/transcribe/jobs/<job_id>')
+def api_transcribe_job_status(job_id):
+    job = transcribe_job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'找不到任務: {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/transcribe/jobs/<job_id>/events')
+def api_transcribe_job_events(job_id):
+    """以 SSE 逐片段推送辨識進度，完成時推送字幕與草稿路徑"""
+    job = transcribe_job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'找不到任務: {job_id}'}), 404
+    return _sse_response(job.iter_events())
+
+
 @app.route('/api/browse')
 def api_browse():
     """瀏覽資料夾結構"""
@@ -1655,9 +1839,8 @@ def api_browse():
             return jsonify({'error': f'不是資料夾: {path}'})
 
         try:
-            for f in sorted(folder_path.iterdir(), key=lambda x: x.name.lower()):
-                if f.is_dir() and not f.name.startswith('.'):
-                    folders.append({'name': f.name, 'path': str(f)})
+            _, entries = scan_dir(folder_path, include_files=False, include_dirs=True)
+            folders.extend({'name': e['name'], 'path': e['path']} for e in entries)
         except PermissionError:
             return jsonify({'error': '沒有權限存取此資料夾'})
         except Exception as e:
@@ -1668,6 +1851,7 @@ def api_browse():
 
 @app.route('/api/scan_folder')
 def api_scan_folder():
+    """列出資料夾中的影片/音訊檔案：支援分頁 (offset, limit)，probe=1 時附帶時長與解析度"""
     folder = request.args.get('path', '')
     if not folder:
         return jsonify({'error': '請提供資料夾路徑'})
@@ -1678,103 +1862,42 @@ def api_scan_folder():
     if not folder_path.is_dir():
         return jsonify({'error': f'這不是資料夾: {folder}'})
 
-    # 支援的影片/音訊格式
-    video_exts = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v',
-                  '.mp3', '.wav', '.m4a', '.flac', '.aac', '.ogg', '.wma'}
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', None, type=int)
 
-    files = []
     try:
-        for f in folder_path.iterdir():
-            if f.is_file() and f.suffix.lower() in video_exts:
-                size = f.stat().st_size
-                if size > 1024 * 1024:
-                    size_str = f"{size / (1024*1024):.1f} MB"
-                else:
-                    size_str = f"{size / 1024:.0f} KB"
-                files.append({
-                    'name': f.name,
-                    'path': str(f),
-                    'size': size_str
-                })
-        # 按名稱排序
-        files.sort(key=lambda x: x['name'].lower())
+        total, entries = scan_dir(folder_path, extensions=MEDIA_EXTENSIONS, offset=offset, limit=limit)
+        if request.args.get('probe') == '1':
+            get_media_index().enrich(entries)
     except Exception as e:
         return jsonify({'error': str(e)})
 
-    return jsonify({'files': files})
+    files = []
+    for entry in entries:
+        item = {'name': entry['name'], 'path': entry['path'], 'size': format_size(entry['size'])}
+        if 'duration' in entry:
+            item.update(duration=entry['duration'], width=entry['width'], height=entry['height'])
+        files.append(item)
+
+    return jsonify({'files': files, 'total': total, 'offset': offset})
 
 
 @app.route('/api/transcribe', methods=['POST'])
 def api_transcribe():
-    data = request.json
-    file_path = data.get('path', '')
-    engine = data.get('engine', 'whisper')
-    model = data.get('model', 'medium')
-    language = data.get('language', 'zh')
-    traditional = data.get('traditional', True)
-    output_mode = data.get('output_mode', 'srt')
-
-    if not file_path:
-        return jsonify({'error': '請提供檔案路徑'})
-
-    if not Path(file_path).exists():
-        return jsonify({'error': f'找不到檔案: {file_path}'})
+    """同步版語音辨識（舊介面）：同樣經過任務佇列，等待完成後回傳"""
+    data = request.json or {}
 
     try:
-        import time
-        start_time = time.time()
-
-        if output_mode == 'draft':
-            # 一條龍：影片 → 辨識 → SRT → 剪映草稿
-            from .transcribe import transcribe_to_draft
-            draft_path = transcribe_to_draft(
-                file_path,
-                model=model,
-                language=language,
-                traditional=traditional,
-                engine=engine
-            )
-
-            duration = round(time.time() - start_time, 1)
-            draft_name = Path(draft_path).name
-            srt_path = str(Path(file_path).with_suffix('')) + ('_zh-TW' if traditional else '_zh-CN') + '.srt'
-
-            return jsonify({
-                'success': True,
-                'draft_path': draft_path,
-                'draft_name': draft_name,
-                'srt_path': srt_path,
-                'duration': duration
-            })
-        else:
-            # 只產生 SRT
-            from .transcribe import transcribe_to_srt
-            output = transcribe_to_srt(
-                file_path,
-                model=model,
-                language=language,
-                traditional=traditional,
-                engine=engine
-            )
-
-            duration = round(time.time() - start_time, 1)
-
-            # 計算片段數
-            with open(output, 'r', encoding='utf-8') as f:
-                content = f.read()
-                segments = content.count('\n\n')
-
-            return jsonify({
-                'success': True,
-                'output': output,
-                'segments': segments,
-                'duration': duration
-            })
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
+        job = transcribe_job_manager.submit(data)
+    except (ValueError, FileNotFoundError) as e:
         return jsonify({'error': str(e)})
 
+    job.wait()
+    if job.status != 'completed':
+        return jsonify({'error': job.error})
+
+    return jsonify({'success': True, 'duration': job.to_dict()['duration'], **job.result})
+
 
 def main():
     import webbrowser
@@ -1801,6 +1924,10 @@ def main():
         time.sleep(1)
         webbrowser.open('http://localhost:5000')
 
+    # debug 模式下 reloader 的父進程不處理請求，只在實際服務的進程啟動辨識 worker
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        transcribe_job_manager.start()
+
     threading.Thread(target=open_browser, daemon=True).start()
     app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
 
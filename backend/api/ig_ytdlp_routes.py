@@ -6,7 +6,6 @@ Instagram yt-dlp 備案下載 API 路由
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import asyncio
 
 from services.ig_ytdlp_downloader import ig_ytdlp_service
 
@@ -34,13 +33,16 @@ async def download_reel(request: DownloadRequest):
     這是主要下載方式（saveclip.app）的備案。
     當主要方式失敗時，可以嘗試使用此 API。
     """
-    if ig_ytdlp_service.is_running:
-        raise HTTPException(status_code=400, detail="已有下載任務進行中")
-
-    # 在背景執行下載
-    asyncio.create_task(ig_ytdlp_service.download_reel(request.url))
-
-    return {"success": True, "message": "開始下載（使用 yt-dlp）", "method": "yt-dlp"}
+    # 交給排程器，可與其他下載同時進行
+    job = ig_ytdlp_service.enqueue(request.url)
+
+    return {
+        "success": True,
+        "message": "開始下載（使用 yt-dlp）",
+        "method": "yt-dlp",
+        "task_id": job["id"],
+        "position": job["position"],
+    }
 
 
 @router.get("/status")
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from datetime import datetime
 from pathlib import Path
 import os
 
-from models import Download, Setting, get_db
+from models import Download, Setting, get_db, ACTIVE_STATUSES, bulk_enqueue
 from schemas import UrlInput, DownloadResponse, SettingUpdate, SettingsResponse
 from services.scraper import scraper
+from services.downloader import download_service
+from services.pipeline import parse_steps, pipeline_runner
+from api.streaming import stream_file
+from utils.fs_scan import scan_dir, get_media_index
+from utils.posters import get_poster_cache
+
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mov', '.avi', '.mkv'}
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -17,23 +24,9 @@ router = APIRouter(prefix="/api", tags=["api"])
 
 @router.post("/queue", response_model=List[DownloadResponse])
 def add_to_queue(input: UrlInput, db: Session = Depends(get_db)):
-    """新增網址到下載佇列"""
-    added = []
-    for url in input.urls:
-        # 檢查是否已存在
-        existing = db.query(Download).filter(
-            Download.url == url,
-            Download.status.in_(["pending", "processing"])
-        ).first()
-        if existing:
-            continue
-
-        download = Download(url=url, status="pending")
-        db.add(download)
-        db.commit()
-        db.refresh(download)
-        added.append(download)
-
+    """新增網址到下載佇列（重複或已在佇列中的網址會略過）"""
+    added = bulk_enqueue(db, input.urls)
+    download_service.adjust_queue_depth(len(added))
     return added
 
 
@@ -41,7 +34,7 @@ def add_to_queue(input: UrlInput, db: Session = Depends(get_db)):
 def get_queue(db: Session = Depends(get_db)):
     """取得目前下載佇列"""
     return db.query(Download).filter(
-        Download.status.in_(["pending", "processing"])
+        Download.status.in_(ACTIVE_STATUSES)
     ).order_by(Download.created_at.desc()).all()
 
 
@@ -52,8 +45,11 @@ def remove_from_queue(download_id: str, db: Session = Depends(get_db)):
     if not download:
         raise HTTPException(status_code=404, detail="Download not found")
 
+    was_pending = download.status == "pending"
     db.delete(download)
     db.commit()
+    if was_pending:
+        download_service.adjust_queue_depth(-1)
     return {"message": "Removed successfully"}
 
 
@@ -64,10 +60,17 @@ def retry_download(download_id: str, db: Session = Depends(get_db)):
     if not download:
         raise HTTPException(status_code=404, detail="Download not found")
 
+    was_pending = download.status == "pending"
     download.status = "pending"
     download.error_message = None
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="此網址已在佇列中")
     db.refresh(download)
+    if not was_pending:
+        download_service.adjust_queue_depth(1)
     return download
 
 
@@ -101,7 +104,9 @@ def get_settings(db: Session = Depends(get_db)):
         download_path=settings.get("download_path", "./downloads"),
         headless_mode=settings.get("headless_mode", "false") == "true",
         auto_remove=settings.get("auto_remove", "true") == "true",
-        show_notification=settings.get("show_notification", "true") == "true"
+        show_notification=settings.get("show_notification", "true") == "true",
+        pipeline_youtube=settings.get("pipeline_youtube", ""),
+        pipeline_instagram=settings.get("pipeline_instagram", "")
     )
 
 
@@ -110,6 +115,14 @@ def update_settings(update: SettingUpdate, db: Session = Depends(get_db)):
     """更新設定"""
     updates = update.model_dump(exclude_none=True)
 
+    # 後製步驟先驗證名稱，統一存成 "a,b" 格式
+    for key in ("pipeline_youtube", "pipeline_instagram"):
+        if key in updates:
+            try:
+                updates[key] = ",".join(parse_steps(updates[key]))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
     for key, value in updates.items():
         setting = db.query(Setting).filter(Setting.key == key).first()
         str_value = str(value).lower() if isinstance(value, bool) else value
@@ -132,34 +145,36 @@ def get_download_path(db: Session) -> Path:
 
 
 @router.get("/videos")
-def list_videos(db: Session = Depends(get_db)):
-    """列出所有下載的影片"""
+def list_videos(offset: int = 0, limit: Optional[int] = None, probe: bool = False, db: Session = Depends(get_db)):
+    """列出所有下載的影片（最新的在前），probe=true 時附帶時長與解析度"""
     download_path = get_download_path(db)
 
     if not download_path.exists():
         return []
 
+    _, entries = scan_dir(
+        download_path, extensions=VIDEO_EXTENSIONS,
+        sort="mtime", reverse=True, offset=max(0, offset), limit=limit
+    )
+    if probe:
+        get_media_index().enrich(entries)
+
     videos = []
-    video_extensions = {'.mp4', '.webm', '.mov', '.avi', '.mkv'}
-
-    for file in download_path.iterdir():
-        if file.is_file() and file.suffix.lower() in video_extensions:
-            stat = file.stat()
-            videos.append({
-                "filename": file.name,
-                "size": stat.st_size,
-                "created_at": stat.st_ctime,
-                "modified_at": stat.st_mtime
-            })
-
-    # 按修改時間排序，最新的在前
-    videos.sort(key=lambda x: x["modified_at"], reverse=True)
+    for entry in entries:
+        video = {
+            "filename": entry["name"],
+            "size": entry["size"],
+            "created_at": entry["ctime"],
+            "modified_at": entry["mtime"]
+        }
+        if probe:
+            video.update(duration=entry["duration"], width=entry["width"], height=entry["height"])
+        videos.append(video)
     return videos
 
 
-@router.get("/videos/{filename}")
-def get_video(filename: str, db: Session = Depends(get_db)):
-    """串流影片檔案"""
+def resolve_video_path(db: Session, filename: str) -> Path:
+    """取得下載目錄內的影片路徑（不存在時 404，超出下載目錄時 403）"""
     download_path = get_download_path(db)
     file_path = download_path / filename
 
@@ -172,11 +187,24 @@ def get_video(filename: str, db: Session = Depends(get_db)):
     except ValueError:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return FileResponse(
-        path=file_path,
-        media_type="video/mp4",
-        filename=filename
-    )
+    return file_path
+
+
+@router.get("/videos/{filename}")
+def get_video(filename: str, request: Request, db: Session = Depends(get_db)):
+    """串流影片檔案（支援 Range 拖動與 ETag 快取驗證）"""
+    file_path = resolve_video_path(db, filename)
+    return stream_file(file_path, request, filename=filename)
+
+
+@router.get("/videos/{filename}/poster")
+def get_video_poster(filename: str, request: Request, db: Session = Depends(get_db)):
+    """影片封面縮圖（第一次請求時產生，之後直接使用快取）"""
+    file_path = resolve_video_path(db, filename)
+    poster_path = get_poster_cache().get(file_path)
+    if poster_path is None:
+        raise HTTPException(status_code=404, detail="Poster not available")
+    return stream_file(poster_path, request, media_type="image/jpeg", cache_control="public, max-age=86400")
 
 
 @router.put("/videos/{filename}/rename")
@@ -234,6 +262,14 @@ def delete_video(filename: str, db: Session = Depends(get_db)):
     return {"message": "Deleted successfully"}
 
 
+# ========== Pipeline Endpoints ==========
+
+@router.get("/pipeline/status")
+def get_pipeline_status():
+    """自動後製管線狀態（排隊中、處理中與最近完成的工作）"""
+    return pipeline_runner.get_status()
+
+
 # ========== Scraper Endpoints ==========
 
 @router.get("/scrape/{username}")
@@ -268,23 +304,8 @@ def scrape_and_queue(username: str, max_reels: int = 50, db: Session = Depends(g
         raise HTTPException(status_code=400, detail=result["error"])
 
     urls = result.get("urls", [])
-    added = []
-
-    for url in urls:
-        # 檢查是否已存在
-        existing = db.query(Download).filter(
-            Download.url == url,
-            Download.status.in_(["pending", "processing"])
-        ).first()
-
-        if existing:
-            continue
-
-        download = Download(url=url, status="pending")
-        db.add(download)
-        db.commit()
-        db.refresh(download)
-        added.append(download)
+    added = bulk_enqueue(db, urls)
+    download_service.adjust_queue_depth(len(added))
 
     return {
         "username": username,
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+檔案串流回應 - 支援 Range（206）與 ETag / If-None-Match（304）
+
+<video> 拖動進度時瀏覽器會送出 Range 請求，只回傳需要的位元組，不會從頭重送整個檔案。
+伺服器支援 ASGI zerocopysend 擴充時以 sendfile 送出，否則分段讀取。
+
+使用方式：
+    return stream_file(path, request)
+"""
+
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+CHUNK_SIZE = 256 * 1024
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """以檔案大小與修改時間產生 ETag（檔案內容變更時兩者至少一個會變）"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # 比對時忽略弱 ETag 前綴 W/
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析單一範圍的 Range 標頭
+
+    Args:
+        header: 例如 "bytes=0-1023"、"bytes=1024-"、"bytes=-500"
+        size: 檔案大小
+
+    Returns:
+        (start, end)，end 包含在內；格式不支援（多段範圍等）時返回 None，表示回傳整個檔案
+
+    Raises:
+        ValueError: 範圍超出檔案大小（應回應 416）
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, _, end_text = (part.strip() for part in spec.partition("-"))
+    if not (start_text or end_text) or not all(t.isdigit() for t in (start_text, end_text) if t):
+        return None
+
+    if not start_text:
+        # 最後 N 個位元組
+        length = int(end_text)
+        if length == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(0, size - length), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(Response):
+    """回傳檔案的一段位元組（206 Partial Content）"""
+
+    def __init__(self, path: Union[str, Path], start: int, end: int, headers: Dict[str, str],
+                 media_type: Optional[str] = None):
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.status_code = 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                return
+
+            f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 檔案在傳送途中被截短
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def stream_file(path: Union[str, Path], request: Request, media_type: Optional[str] = None,
+                filename: Optional[str] = None, cache_control: str = "no-cache") -> Response:
+    """
+    回傳檔案，處理 If-None-Match（304）、Range / If-Range（206 / 416）
+
+    Args:
+        path: 檔案路徑（呼叫端需先確認存在且可存取）
+        request: 目前的請求
+        media_type: MIME 類型（None 表示依副檔名判斷）
+        filename: Content-Disposition 使用的檔名（inline）
+        cache_control: Cache-Control 標頭；no-cache 表示每次以 ETag 重新驗證
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    media_type = media_type or mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            return RangeFileResponse(path, start, end, media_type=media_type, headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            })
+
+    # 整個檔案：FileResponse 在伺服器支援時會使用 pathsend / sendfile
+    return FileResponse(
+        path, media_type=media_type, headers=headers, stat_result=stat,
+        filename=filename, content_disposition_type="inline",
+    )
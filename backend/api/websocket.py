@@ -1,34 +1,128 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+import asyncio
+import itertools
 import json
 
+# 每個連線最多累積幾則尚未送出的訊息，超過就中斷該連線（前端重新連線後會重新載入狀態）
+MAX_BACKLOG = 200
+# 單次送出的逾時（秒），超過視為連線卡住
+SEND_TIMEOUT = 10.0
+# 中斷連線時使用的關閉代碼（1013 = Try Again Later）
+BACKLOG_CLOSE_CODE = 1013
+
+# 進度類訊息：同一個任務只需要最新一則，還沒送出的舊進度直接被取代
+COALESCE_TYPES = {"yt_progress", "ig_ytdlp_progress", "pipeline_progress"}
+
+
+def _coalesce_key(message: Dict[str, Any], seq: int) -> Hashable:
+    """進度訊息以 (type, 任務 ID) 合併，其他訊息各自獨立"""
+    msg_type = message.get("type")
+    data = message.get("data") or {}
+    if msg_type == "status_update" and data.get("status") == "processing":
+        return (msg_type, data.get("id"))
+    if msg_type in COALESCE_TYPES:
+        return (msg_type, data.get("task_id") or data.get("id") or data.get("filename"))
+    return seq
+
+
+class _ClientChannel:
+    """單一連線的送出佇列與送出工作"""
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        self.pending: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.task = asyncio.create_task(self._sender())
+
+    def push(self, key: Hashable, payload: str) -> bool:
+        """加入待送訊息；返回 False 表示積壓過多"""
+        if key in self.pending:
+            # 取代尚未送出的舊進度（保留原本的位置，順序不變）
+            self.pending[key] = payload
+            self.manager.stats["coalesced"] += 1
+        else:
+            self.pending[key] = payload
+        self.ready.set()
+        return len(self.pending) <= MAX_BACKLOG
+
+    async def _sender(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.pending:
+                    _, payload = self.pending.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send_text(payload), SEND_TIMEOUT)
+                self.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # 送出失敗或逾時：視為斷線
+            self.manager.disconnect(self.websocket)
+
 
 class ConnectionManager:
-    """WebSocket 連線管理器"""
+    """
+    WebSocket 連線管理器
+
+    broadcast 只把訊息放進每個連線的送出佇列就返回，由各連線自己的送出工作同時送出，
+    慢的連線不會拖慢其他連線或呼叫端；進度訊息會合併為最新一則，積壓過多的連線會被中斷。
+    """
 
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self._channels: Dict[WebSocket, _ClientChannel] = {}
+        self._seq = itertools.count()
+        self._closing = set()
+        self.stats = {"messages": 0, "coalesced": 0, "dropped_clients": 0}
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self._channels)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self._channels[websocket] = _ClientChannel(websocket, self)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        channel = self._channels.pop(websocket, None)
+        if channel is not None:
+            if channel.task is not asyncio.current_task():
+                channel.task.cancel()
 
-    async def broadcast(self, message: dict):
-        """廣播訊息給所有連線"""
-        disconnected = []
-        for connection in self.active_connections:
+    def _drop(self, websocket: WebSocket):
+        """中斷積壓過多的連線（立即停止送出，關閉握手在背景進行）"""
+        self.disconnect(websocket)
+        self.stats["dropped_clients"] += 1
+
+        async def close():
             try:
-                await connection.send_json(message)
+                await websocket.close(code=BACKLOG_CLOSE_CODE)
             except Exception:
-                disconnected.append(connection)
+                pass
+
+        task = asyncio.create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _enqueue(self, channels: List[_ClientChannel], message: dict):
+        payload = json.dumps(message, ensure_ascii=False)
+        key = _coalesce_key(message, next(self._seq))
+        for channel in channels:
+            if not channel.push(key, payload):
+                self._drop(channel.websocket)
+        self.stats["messages"] += 1
+
+    async def broadcast(self, message: dict):
+        """廣播訊息給所有連線（只排入佇列，不等待送出）"""
+        self._enqueue(list(self._channels.values()), message)
 
-        # 清理斷開的連線
-        for conn in disconnected:
-            self.disconnect(conn)
+    async def send_to(self, websocket: WebSocket, message: dict):
+        """送訊息給單一連線（與廣播共用同一個送出佇列，避免同時寫入）"""
+        channel: Optional[_ClientChannel] = self._channels.get(websocket)
+        if channel is not None:
+            self._enqueue([channel], message)
 
     async def send_status_update(self, download_id: str, url: str, status: str,
                                   progress: str = None, progress_percent: int = None,
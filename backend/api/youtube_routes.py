@@ -4,9 +4,10 @@ YouTube 下載 API 路由
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-import asyncio
+from typing import List, Optional
+import json
 
 from services.youtube_downloader import youtube_service
 
@@ -23,6 +24,10 @@ class InfoRequest(BaseModel):
     url: str
 
 
+class BatchInfoRequest(BaseModel):
+    urls: List[str]
+
+
 @router.post("/info")
 async def get_video_info(request: InfoRequest):
     """獲取影片資訊"""
@@ -32,23 +37,33 @@ async def get_video_info(request: InfoRequest):
     return info
 
 
-@router.post("/download")
-async def download_video(request: DownloadRequest, background_tasks: BackgroundTasks):
-    """開始下載影片"""
-    if youtube_service.is_running:
-        raise HTTPException(status_code=400, detail="已有下載任務進行中")
+@router.post("/info/batch")
+async def get_video_info_batch(request: BatchInfoRequest):
+    """
+    批次獲取影片 / 播放清單資訊
 
-    # 在背景執行下載
-    async def do_download():
-        await youtube_service.download_video(
-            url=request.url,
-            format_option=request.format,
-            extract_audio=request.audio_only,
-        )
+    以 NDJSON 串流回傳，每個網址查完就送出一行：
+    {"index": 0, "url": "...", "info": {...}} 或 {"index": 1, "url": "...", "error": "..."}
+    查詢結果會快取，之後下載同一網址時不再重新解析。
+    """
+    async def lines():
+        async for result in youtube_service.iter_video_info(request.urls):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
 
-    asyncio.create_task(do_download())
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-    return {"success": True, "message": "開始下載"}
+
+@router.post("/download")
+async def download_video(request: DownloadRequest, background_tasks: BackgroundTasks):
+    """開始下載影片"""
+    # 交給排程器，可與其他下載同時進行
+    job = youtube_service.enqueue(
+        url=request.url,
+        format_option=request.format,
+        extract_audio=request.audio_only,
+    )
+
+    return {"success": True, "message": "開始下載", "task_id": job["id"], "position": job["position"]}
 
 
 @router.get("/status")
@@ -2,6 +2,11 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
+import sys
+from pathlib import Path
+
+# 專案根目錄（共用 utils 模組）
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from models import init_db
 from api.routes import router
@@ -9,16 +14,26 @@ from api.youtube_routes import router as youtube_router
 from api.ig_ytdlp_routes import router as ig_ytdlp_router
 from api.websocket import manager
 from services.downloader import download_service
+from services.executor import run_blocking, shutdown_executor
+from services.pipeline import pipeline_runner
+from services.scheduler import scheduler
+from services.browser_pool import close_all_browsers
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 啟動時初始化資料庫
     init_db()
+    scheduler.add_source(download_service)
+    scheduler.start()
+    # 下載完成後自動執行設定的後製步驟
+    pipeline_runner.start()
     yield
     # 關閉時清理
-    if download_service.driver:
-        download_service.driver.quit()
+    await scheduler.stop()
+    await pipeline_runner.stop()
+    await run_blocking(close_all_browsers)
+    shutdown_executor()
 
 
 app = FastAPI(
@@ -59,7 +74,7 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             # 可以處理來自前端的訊息
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send_to(websocket, {"type": "pong"})
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
@@ -68,7 +83,7 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.post("/api/download/start")
 async def start_download():
     """開始下載佇列"""
-    status = download_service.get_status()
+    status = await download_service.get_status()
     if status["is_running"]:
         return {"success": False, "message": "Already running", **status}
 
@@ -86,8 +101,8 @@ async def stop_download():
 
 @app.get("/api/download/status")
 async def download_status():
-    """取得下載服務詳細狀態"""
-    return download_service.get_status()
+    """取得下載服務詳細狀態（佇列數量需查詢資料庫，不在事件迴圈中執行）"""
+    return await download_service.get_status()
 
 
 if __name__ == "__main__":
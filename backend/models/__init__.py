@@ -1 +1,4 @@
-from .database import Base, Download, Setting, get_db, init_db, SessionLocal
+from .database import (
+    Base, Download, Setting, get_db, init_db, SessionLocal, ACTIVE_STATUSES,
+    claim_next_download, bulk_enqueue, normalize_url
+)
@@ -1,16 +1,37 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Text
+from sqlalchemy import create_engine, event, insert, text, Column, String, DateTime, Text, Index
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
 import uuid
 
 DATABASE_URL = "sqlite:///./reelpull.db"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# 佇列中（尚未結束）的狀態
+ACTIVE_STATUSES = ("pending", "processing")
+
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 10})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL 模式：讀取不會被下載工作者的寫入擋住（反之亦然）
+    synchronous=NORMAL 在 WAL 下仍可保證一致性，只是斷電時可能遺失最後幾筆交易
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-8000")  # 8 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
 class Download(Base):
     __tablename__ = "downloads"
 
@@ -22,6 +43,16 @@ class Download(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # 領取下一個項目、佇列數量、佇列列表都以 status 過濾並依 created_at 排序
+        Index("ix_downloads_status_created_at", "status", "created_at"),
+        # 同一個網址在佇列中只能有一筆（已完成 / 失敗的不受限制）
+        Index(
+            "ux_downloads_active_url", "url", unique=True,
+            sqlite_where=text("status IN ('pending', 'processing')")
+        ),
+    )
+
 
 class Setting(Base):
     __tablename__ = "settings"
@@ -30,8 +61,171 @@ class Setting(Base):
     value = Column(Text)
 
 
+def claim_next_download(db) -> Optional[Download]:
+    """
+    原子地領取最早的待處理項目（pending → processing）
+
+    單一 UPDATE ... RETURNING 陳述式，SQLite 的寫入互斥保證兩個工作者不會拿到同一筆。
+
+    Returns:
+        脫離 session 的 Download（只有 id、url、status），沒有待處理項目時為 None
+    """
+    row = db.execute(text(
+        "UPDATE downloads SET status = 'processing' "
+        "WHERE id = ("
+        "  SELECT id FROM downloads WHERE status = 'pending' "
+        "  ORDER BY created_at LIMIT 1"
+        ") RETURNING id, url"
+    )).first()
+    db.commit()
+    if row is None:
+        return None
+    return Download(id=row.id, url=row.url, status="processing")
+
+
+# IN 查詢每批的網址數（低於 SQLite 的參數上限）
+_IN_CHUNK_SIZE = 500
+
+
+def normalize_url(url: str) -> str:
+    """
+    正規化網址，讓同一支影片的不同寫法視為同一筆
+
+    去掉前後空白、查詢字串與 # 片段（例如 ?igsh=...），主機名稱轉小寫並去掉 www.，
+    /reels/ 統一為 /reel/，路徑結尾補上 /。
+    """
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[len("www."):]
+    path = parts.path or "/"
+    if path.startswith("/reels/"):
+        path = "/reel/" + path[len("/reels/"):]
+    if not path.endswith("/"):
+        path += "/"
+    return urlunsplit((parts.scheme.lower(), netloc, path, "", ""))
+
+
+def bulk_enqueue(db, urls: Iterable[str]) -> List[Download]:
+    """
+    批次加入下載佇列
+
+    網址先正規化並在記憶體中去重（保留輸入順序），以 IN 查詢一次找出已在佇列中的網址，
+    其餘在同一個交易中以 executemany 寫入。id 與 created_at 在 Python 端產生，
+    返回的物件不需要再從資料庫 refresh。
+
+    Returns:
+        新加入的項目（依輸入順序），已在佇列中的網址會略過
+    """
+    unique_urls = list(dict.fromkeys(normalize_url(url) for url in urls if url and url.strip()))
+    if not unique_urls:
+        return []
+
+    for _ in range(3):
+        active = set()
+        for i in range(0, len(unique_urls), _IN_CHUNK_SIZE):
+            chunk = unique_urls[i:i + _IN_CHUNK_SIZE]
+            active.update(url for (url,) in db.query(Download.url).filter(
+                Download.url.in_(chunk),
+                Download.status.in_(ACTIVE_STATUSES)
+            ))
+
+        # 同一批的 created_at 依序遞增，維持佇列順序
+        now = datetime.utcnow()
+        rows = [
+            {"id": str(uuid.uuid4()), "url": url, "status": "pending",
+             "created_at": now + timedelta(microseconds=i)}
+            for i, url in enumerate(u for u in unique_urls if u not in active)
+        ]
+        if not rows:
+            return []
+
+        try:
+            db.execute(insert(Download), rows)
+            db.commit()
+        except IntegrityError:
+            # 查詢與寫入之間有其他請求加入了相同網址，重新檢查一次
+            db.rollback()
+            continue
+        return [Download(**row) for row in rows]
+
+    raise RuntimeError("加入佇列失敗：網址持續與其他請求衝突")
+
+
+# 佇列中重複的網址不刪除，改標記為失敗並記錄原因
+DUPLICATE_ERROR_MESSAGE = "佇列中已有相同網址，此筆已略過"
+
+
+def _mark_duplicates(conn, rows):
+    """將重複的佇列項目標記為失敗（保留資料列），並列出處理了哪些項目"""
+    if not rows:
+        return
+    conn.execute(
+        text(
+            "UPDATE downloads SET status = 'failed', error_message = :message, completed_at = :now "
+            "WHERE id = :id"
+        ),
+        [{"id": row.id, "message": DUPLICATE_ERROR_MESSAGE, "now": datetime.utcnow()} for row in rows]
+    )
+    print(f"[資料庫] 佇列中有 {len(rows)} 筆重複的網址，已標記為失敗（未刪除）：")
+    for row in rows:
+        print(f"    {row.id}  {row.url}")
+
+
+# 資料庫版本（PRAGMA user_version）：1 = 既有網址已正規化
+# normalize_url 的規則改變時遞增，啟動時會重新正規化一次
+URL_SCHEMA_VERSION = 1
+
+
+def _normalize_existing_urls(conn):
+    """
+    將 normalize_url 加入前存入的網址正規化，佇列重複檢查（IN 查詢）才比對得到
+
+    佇列中正規化後重複的項目只保留最早加入的那筆，其餘先標記為失敗，再更新網址，
+    避免違反唯一索引。
+    """
+    rows = conn.execute(text("SELECT id, url, status FROM downloads ORDER BY rowid")).all()
+    active_urls = set()
+    duplicates, updates = [], []
+    for row in rows:
+        url = normalize_url(row.url)
+        if row.status in ACTIVE_STATUSES:
+            if url in active_urls:
+                duplicates.append(row)
+                continue
+            active_urls.add(url)
+        if url != row.url:
+            updates.append({"id": row.id, "url": url})
+
+    _mark_duplicates(conn, duplicates)
+    if updates:
+        conn.execute(text("UPDATE downloads SET url = :url WHERE id = :id"), updates)
+        print(f"[資料庫] 已正規化 {len(updates)} 筆既有網址")
+
+
+def _migrate_indexes():
+    """為既有資料庫補上索引（create_all 只會在建立資料表時一併建立索引）"""
+    with engine.begin() as conn:
+        if conn.execute(text("PRAGMA user_version")).scalar() < URL_SCHEMA_VERSION:
+            _normalize_existing_urls(conn)
+            conn.execute(text(f"PRAGMA user_version = {URL_SCHEMA_VERSION}"))
+
+        # 唯一索引建立前，佇列中重複的網址只保留最早加入的那筆，其餘標記為失敗
+        duplicates = conn.execute(text(
+            "SELECT id, url FROM downloads WHERE status IN ('pending', 'processing') "
+            "AND rowid NOT IN ("
+            "  SELECT MIN(rowid) FROM downloads "
+            "  WHERE status IN ('pending', 'processing') GROUP BY url"
+            ") ORDER BY rowid"
+        )).all()
+        _mark_duplicates(conn, duplicates)
+    for index in Download.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _migrate_indexes()
 
     # 初始化預設設定
     db = SessionLocal()
@@ -40,7 +234,9 @@ def init_db():
             "download_path": "./downloads",
             "headless_mode": "false",
             "auto_remove": "true",
-            "show_notification": "true"
+            "show_notification": "true",
+            "pipeline_youtube": "",
+            "pipeline_instagram": ""
         }
         for key, value in defaults.items():
             existing = db.query(Setting).filter(Setting.key == key).first()
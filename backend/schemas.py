@@ -39,6 +39,9 @@ class SettingUpdate(BaseModel):
     headless_mode: Optional[bool] = None
     auto_remove: Optional[bool] = None
     show_notification: Optional[bool] = None
+    # 下載完成後自動執行的後製步驟（逗號分隔：translate, face_template, shopee；空字串表示停用）
+    pipeline_youtube: Optional[str] = None
+    pipeline_instagram: Optional[str] = None
 
 
 class SettingsResponse(BaseModel):
@@ -46,6 +49,8 @@ class SettingsResponse(BaseModel):
     headless_mode: bool
     auto_remove: bool
     show_notification: bool
+    pipeline_youtube: str = ""
+    pipeline_instagram: str = ""
 
 
 class StatusUpdate(BaseModel):
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+共用瀏覽器池 - Instagram 爬蟲與 saveclip 下載共用同一組 Chrome
+
+    - 用完歸還、下次直接重用（省下每次數秒的 Chrome 啟動時間）
+    - 借出前健康檢查，瀏覽器已當掉就丟棄重建
+    - 使用 BROWSER_MAX_USES 次後回收重建，避免長時間執行累積記憶體
+    - 閒置超過 BROWSER_IDLE_TIMEOUT 秒自動關閉
+
+另外提供以條件取代固定 sleep 的等待函數（頁面載入完成、元素數量變化、網路閒置）。
+
+使用方式：
+    with browser_session(headless=True) as driver:
+        driver.get(url)
+        wait_for_page_ready(driver)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from webdriver_manager.chrome import ChromeDriverManager
+
+from services.scheduler import SessionPool
+
+MAX_BROWSERS = int(os.environ.get("REELPULL_MAX_BROWSERS", "3"))
+BROWSER_MAX_USES = 50
+BROWSER_IDLE_TIMEOUT = 300.0
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# 網路閒置判斷用的 JS：目前為止載入過的資源數量
+_RESOURCE_COUNT_JS = "return performance.getEntriesByType('resource').length"
+
+
+@lru_cache(maxsize=1)
+def _chromedriver_path() -> str:
+    """ChromeDriverManager().install() 會檢查版本（可能連網），只做一次"""
+    return ChromeDriverManager().install()
+
+
+def create_chrome(headless: bool = True, download_path: Optional[str] = None) -> webdriver.Chrome:
+    """
+    建立 Chrome（爬蟲與下載共用的選項）
+
+    Args:
+        headless: 是否無頭模式
+        download_path: 下載目錄（None 表示使用 Chrome 預設）
+    """
+    options = webdriver.ChromeOptions()
+
+    if headless:
+        options.add_argument("--headless=new")
+
+    options.add_argument("--start-maximized")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"user-agent={USER_AGENT}")
+
+    if download_path:
+        download_path = os.path.abspath(download_path)
+        os.makedirs(download_path, exist_ok=True)
+        options.add_experimental_option("prefs", {
+            "download.default_directory": download_path,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True
+        })
+
+    service = Service(_chromedriver_path())
+    return webdriver.Chrome(service=service, options=options)
+
+
+def is_browser_alive(driver: webdriver.Chrome) -> bool:
+    """健康檢查：瀏覽器程序還在且能執行 JS"""
+    try:
+        return driver.execute_script("return 1") == 1
+    except WebDriverException:
+        return False
+
+
+def _quit(driver: webdriver.Chrome):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+_pools: Dict[Tuple[bool, Optional[str]], SessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(headless: bool = True, download_path: Optional[str] = None) -> SessionPool:
+    """取得（或建立）指定選項的瀏覽器池；相同選項的呼叫端共用瀏覽器"""
+    key = (headless, os.path.abspath(download_path) if download_path else None)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SessionPool(
+                lambda: create_chrome(headless=headless, download_path=download_path),
+                max_size=MAX_BROWSERS,
+                close=_quit,
+                max_uses=BROWSER_MAX_USES,
+                idle_timeout=BROWSER_IDLE_TIMEOUT,
+                health_check=is_browser_alive,
+            )
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def browser_session(headless: bool = True, download_path: Optional[str] = None,
+                    timeout: Optional[float] = 60) -> Iterator[webdriver.Chrome]:
+    """借用瀏覽器；區塊內發生 WebDriverException 時丟棄該瀏覽器"""
+    pool = get_browser_pool(headless, download_path)
+    driver = pool.acquire(timeout=timeout)
+    broken = False
+    try:
+        yield driver
+    except WebDriverException:
+        broken = True
+        raise
+    finally:
+        pool.release(driver, broken=broken)
+
+
+def close_all_browsers():
+    """關閉所有閒置瀏覽器（應用程式結束時呼叫）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def get_pools_status() -> Dict[str, dict]:
+    with _pools_lock:
+        return {
+            f"{'headless' if headless else 'window'}:{path or 'default'}": pool.get_status()
+            for (headless, path), pool in _pools.items()
+        }
+
+
+# ===== 條件等待 =====
+
+def wait_for_page_ready(driver: webdriver.Chrome, timeout: float = 15,
+                        condition: Optional[Callable[[webdriver.Chrome], bool]] = None) -> bool:
+    """
+    等待 document.readyState == "complete"，並可再等待額外條件成立
+
+    Returns:
+        是否在時間內成立（逾時不拋出例外）
+    """
+    def ready(d):
+        if d.execute_script("return document.readyState") != "complete":
+            return False
+        return condition is None or condition(d)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(ready)
+        return True
+    except TimeoutException:
+        return False
+
+
+def count_elements(driver: webdriver.Chrome, css_selector: str) -> int:
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length", css_selector)
+
+
+def wait_for_count_change(driver: webdriver.Chrome, css_selector: str, previous: int,
+                          timeout: float = 5) -> int:
+    """
+    等待符合選擇器的元素數量與 previous 不同（例如捲動後載入更多項目）
+
+    Returns:
+        目前的元素數量（逾時時為最後一次的數量）
+    """
+    def changed(d):
+        count = count_elements(d, css_selector)
+        return count if count != previous else False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.2).until(changed)
+    except TimeoutException:
+        return count_elements(driver, css_selector)
+
+
+def wait_for_network_idle(driver: webdriver.Chrome, quiet: float = 0.5, timeout: float = 5) -> bool:
+    """
+    等待 quiet 秒內沒有新的資源請求（以 Performance API 的資源數量判斷）
+
+    Returns:
+        是否在時間內達到閒置
+    """
+    deadline = time.monotonic() + timeout
+    # 預設只記錄 250 筆資源，滿了之後數量不再增加會被誤判為閒置
+    driver.execute_script("performance.setResourceTimingBufferSize(10000)")
+    last = driver.execute_script(_RESOURCE_COUNT_JS)
+    last_change = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        current = driver.execute_script(_RESOURCE_COUNT_JS)
+        if current != last:
+            last, last_change = current, time.monotonic()
+        elif time.monotonic() - last_change >= quiet:
+            return True
+    return False
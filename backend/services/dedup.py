@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+重複下載偵測 - 以媒體 ID 與內容指紋判斷同一支影片
+
+    - media_id_from_url: 以 yt-dlp 擷取器的網址規則取得 ID（不連網），例如
+      instagram:Cabc123（reel / p / tv 各種寫法）、youtube:dQw4w9WgXcQ（watch / youtu.be / shorts）
+    - DownloadIndex: 媒體 ID → 已下載檔案，以及 內容指紋（大小 + 頭中尾部分雜湊）→ 檔案
+      下載前先查媒體 ID，已有檔案就直接硬連結過去而不再下載；
+      下載後登記指紋，指紋相同且完整比對內容也相同的檔案改為硬連結，不重複佔用空間
+
+使用方式：
+    index = get_download_index()
+    existing = index.find(media_id_from_url(url))
+    if existing:
+        path = index.link_into(existing, download_dir)
+    else:
+        ...下載...
+        path = index.record(path, media_id)
+"""
+
+import os
+import json
+import shutil
+import filecmp
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from yt_dlp.extractor.instagram import InstagramIE
+from yt_dlp.extractor.youtube import YoutubeIE
+
+DEFAULT_INDEX_FILE = Path(__file__).parent.parent.parent / "cache" / "download_index.json"
+
+# 部分雜湊：檔頭、中間、檔尾各讀這麼多位元組
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+# 下載前就能從網址判斷 ID 的擷取器
+_URL_ID_EXTRACTORS = (InstagramIE, YoutubeIE)
+
+
+def media_id_from_url(url: str, variant: Optional[str] = None) -> Optional[str]:
+    """
+    從網址取得媒體 ID（只比對 yt-dlp 擷取器的網址規則，不連網）
+
+    Args:
+        url: 影片網址
+        variant: 同一支影片的不同產物（例如 "audio" 表示只下載音訊），會附加在 ID 後
+
+    Returns:
+        "<擷取器>:<ID>"，無法判斷時為 None
+    """
+    for ie in _URL_ID_EXTRACTORS:
+        if ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                return _with_variant(f"{ie.ie_key().lower()}:{video_id}", variant)
+    return None
+
+
+def media_id_from_info(info: Dict[str, Any], variant: Optional[str] = None) -> Optional[str]:
+    """從 yt-dlp 的 info dict 取得媒體 ID（與 media_id_from_url 格式相同）"""
+    extractor, video_id = info.get("extractor_key"), info.get("id")
+    if not extractor or not video_id:
+        return None
+    return _with_variant(f"{extractor.lower()}:{video_id}", variant)
+
+
+def _with_variant(media_id: str, variant: Optional[str]) -> str:
+    return f"{media_id}#{variant}" if variant else media_id
+
+
+def content_fingerprint(path: Union[str, Path], size: Optional[int] = None) -> str:
+    """
+    內容指紋：檔案大小 + 檔頭 / 中間 / 檔尾各 FINGERPRINT_SAMPLE_SIZE 位元組的雜湊
+
+    只讀最多 192 KB，大檔案也能快速計算；大小也納入比對，部分雜湊相同但長度不同的檔案不會被誤判。
+    """
+    size = os.path.getsize(path) if size is None else size
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size <= FINGERPRINT_SAMPLE_SIZE * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, (size - FINGERPRINT_SAMPLE_SIZE) // 2, size - FINGERPRINT_SAMPLE_SIZE):
+                f.seek(offset)
+                digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+    return f"{size:x}-{digest.hexdigest()}"
+
+
+def _same_file(a: Union[str, Path], b: Union[str, Path]) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _same_content(a: Union[str, Path], b: Union[str, Path]) -> bool:
+    try:
+        return filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+class DownloadIndex:
+    """已下載檔案的索引（執行緒安全）"""
+
+    def __init__(self, index_file: Optional[Path] = DEFAULT_INDEX_FILE):
+        """
+        Args:
+            index_file: 索引檔路徑（None 表示只保存在記憶體）
+        """
+        self.index_file = Path(index_file) if index_file else None
+        # media_id → 檔案路徑
+        self._media: Dict[str, str] = {}
+        # 內容指紋 → 檔案路徑
+        self._contents: Dict[str, str] = {}
+        # 檔案路徑 → {"size", "mtime_ns", "fingerprint"}（檔案沒變就不用重新計算指紋）
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.index_file:
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._media = data.get("media", {})
+            self._contents = data.get("contents", {})
+            self._files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        if not self.index_file:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"media": self._media, "contents": self._contents, "files": self._files},
+                      f, ensure_ascii=False)
+        tmp_path.replace(self.index_file)
+
+    def find(self, media_id: Optional[str]) -> Optional[Path]:
+        """
+        查詢已下載的檔案
+
+        Returns:
+            檔案路徑；沒有記錄或檔案已被刪除時為 None
+        """
+        if not media_id:
+            return None
+        with self._lock:
+            path = self._media.get(media_id)
+        if path and os.path.isfile(path):
+            return Path(path)
+        return None
+
+    def remember(self, media_id: Optional[str], path: Union[str, Path]):
+        """
+        只登記媒體 ID 對應的檔案（檔案可能還在下載中，find 會在檔案出現後才返回它）
+
+        內容指紋之後由 reconcile 補上。
+        """
+        if not media_id:
+            return
+        with self._lock:
+            self._media[media_id] = os.path.abspath(path)
+            self._save()
+
+    def _fingerprint(self, path: str, stat: os.stat_result) -> str:
+        cached = self._files.get(path)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["fingerprint"]
+        return content_fingerprint(path, stat.st_size)
+
+    def record(self, path: Union[str, Path], media_id: Optional[str] = None) -> Path:
+        """
+        登記剛下載完成的檔案
+
+        已有內容相同的檔案時，把新檔案換成指向既有檔案的硬連結（檔名不變）；
+        無法建立硬連結（例如不同磁碟）時保留原檔。
+
+        Args:
+            path: 下載完成的檔案
+            media_id: 媒體 ID（之後同一支影片可以直接找到這個檔案）
+
+        Returns:
+            檔案路徑（即 path）
+        """
+        with self._lock:
+            path = self._record(os.path.abspath(path), media_id)
+            self._save()
+        return Path(path)
+
+    def _record(self, path: str, media_id: Optional[str]) -> str:
+        stat = os.stat(path)
+        fingerprint = self._fingerprint(path, stat)
+        existing = self._contents.get(fingerprint)
+        if existing and existing != path and self._unchanged(existing, fingerprint):
+            # 指紋只比對部分內容：完整比對相同才把新檔案換成硬連結，否則只登記
+            if (not _same_file(existing, path) and _same_content(existing, path)
+                    and self._replace_with_link(existing, path)):
+                stat = os.stat(path)
+        else:
+            self._contents[fingerprint] = path
+
+        self._files[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "fingerprint": fingerprint}
+        if media_id:
+            self._media[media_id] = path
+        return path
+
+    def _unchanged(self, path: str, fingerprint: str) -> bool:
+        """索引中的檔案仍存在，且大小與修改時間和登記時相同（內容仍是這個指紋）"""
+        cached = self._files.get(path)
+        if not cached or cached["fingerprint"] != fingerprint:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns
+
+    @staticmethod
+    def _replace_with_link(source: str, target: str) -> bool:
+        tmp_path = f"{target}.link.tmp"
+        try:
+            os.link(source, tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def link_into(self, existing: Union[str, Path], directory: Union[str, Path],
+                  media_id: Optional[str] = None) -> Path:
+        """
+        讓既有檔案出現在指定的下載目錄（硬連結，同檔名；已在目錄內則直接返回）
+
+        無法建立硬連結時改為複製，確保目錄內一定有這個檔案。
+
+        Returns:
+            目錄內的檔案路徑
+        """
+        existing = Path(existing)
+        directory = Path(directory)
+        target = directory / existing.name
+        if target.exists():
+            if _same_file(existing, target):
+                return target
+            target = directory / f"{existing.stem}_{existing.stat().st_size:x}{existing.suffix}"
+            if target.exists():
+                # 同名的其他檔案：不覆蓋，直接使用原本位置的檔案
+                return target if _same_file(existing, target) else existing
+
+        directory.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(existing, target)
+        except OSError:
+            shutil.copy2(existing, target)
+        return self.record(target, media_id)
+
+    def reconcile(self, directory: Union[str, Path], extensions=None) -> int:
+        """
+        登記資料夾內尚未登記或已變更的檔案（例如瀏覽器下載的檔案，下載完成的時間點無法得知）
+
+        Args:
+            directory: 資料夾
+            extensions: 只處理這些副檔名（小寫、含點），None 表示全部
+
+        Returns:
+            新登記的檔案數
+        """
+        count = 0
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return 0
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            path = os.path.abspath(entry.path)
+            stat = entry.stat()
+            with self._lock:
+                cached = self._files.get(path)
+                if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+                self._record(path, None)
+            count += 1
+        if count:
+            with self._lock:
+                self._save()
+        return count
+
+    def get_status(self) -> Dict[str, int]:
+        with self._lock:
+            return {"media": len(self._media), "contents": len(self._contents), "files": len(self._files)}
+
+
+def reuse_existing(media_id: Optional[str], directory: Union[str, Path]) -> Optional[Path]:
+    """
+    同一支影片已經下載過時，把既有檔案連結到 directory（同步，於執行緒池中呼叫）
+
+    Returns:
+        directory 內的檔案路徑；沒下載過時為 None（需要實際下載）
+    """
+    index = get_download_index()
+    existing = index.find(media_id)
+    if existing is None:
+        return None
+    return index.link_into(existing, directory, media_id)
+
+
+_download_index: Optional[DownloadIndex] = None
+_download_index_lock = threading.Lock()
+
+
+def get_download_index() -> DownloadIndex:
+    """取得共用的下載索引（寫入 cache/download_index.json）"""
+    global _download_index
+    with _download_index_lock:
+        if _download_index is None:
+            _download_index = DownloadIndex()
+        return _download_index
@@ -3,17 +3,28 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 import asyncio
 import os
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any
 import threading
+import time
 
-from models import Download, Setting, SessionLocal
+from models import Download, Setting, SessionLocal, claim_next_download
 from api.websocket import manager
+from services.executor import run_blocking
+from services.scheduler import SessionPool, scheduler
+from services.browser_pool import get_browser_pool, get_pools_status
+from services.dedup import get_download_index, media_id_from_url, reuse_existing
+from services.events import DOWNLOAD_COMPLETED, event_bus
+from utils.fs_scan import VIDEO_EXTENSIONS
+
+# 開啟下載連結後，最多等待幾秒讓檔案出現在下載目錄
+DOWNLOAD_START_TIMEOUT = 10.0
+
+# 佇列數量以記憶體計數器維護，每隔這麼久（秒）用 COUNT 查詢校正一次
+QUEUE_RECONCILE_INTERVAL = 30.0
 
 
 class ServiceStatus(str, Enum):
@@ -24,18 +35,42 @@ class ServiceStatus(str, Enum):
 
 
 class DownloadService:
+    """
+    saveclip.app 下載佇列（資料庫中的 pending 項目）
+
+    本身不執行迴圈，而是註冊為排程器的工作來源：
+    開始下載後由排程器的工作者透過 claim() 原子地領取項目、run() 執行，
+    同時進行的數量受 saveclip.app 的主機上限限制，每個下載從共用瀏覽器池借用一個瀏覽器。
+    """
+
+    host = "saveclip.app"
+    kind = "saveclip"
+
     def __init__(self):
-        self.driver: Optional[webdriver.Chrome] = None
         self.status: ServiceStatus = ServiceStatus.IDLE
         self._stop_requested = False
+        self._accepting = False
         self._lock = threading.Lock()
-        self.current_task: Optional[Dict[str, Any]] = None
+        self._browsers: Optional[SessionPool] = None
+        self._download_path: Optional[str] = None
+        self._in_flight = 0
+        self._finished: Optional[asyncio.Event] = None
+        # 進行中的下載 {download_id: 進度}
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._queue_depth: Optional[int] = None
+        self._queue_checked_at = 0.0
+        self._depth_lock = threading.Lock()
         self.stats = {
             "completed_count": 0,
             "failed_count": 0,
             "queue_count": 0
         }
 
+    @property
+    def current_task(self) -> Optional[Dict[str, Any]]:
+        """最近開始的下載（相容單一任務的前端）"""
+        return next(reversed(self.tasks.values()), None)
+
     def _get_settings(self) -> Dict[str, Any]:
         """取得設定"""
         db = SessionLocal()
@@ -48,53 +83,12 @@ class DownloadService:
         finally:
             db.close()
 
-    def _init_driver(self, headless: bool = False):
-        """初始化 WebDriver"""
-        # 先確保舊的 driver 已關閉
-        self._cleanup_driver()
-
-        options = webdriver.ChromeOptions()
-
-        if headless:
-            options.add_argument("--headless=new")
-
-        options.add_argument("--start-maximized")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-
-        # 設定下載路徑
-        settings = self._get_settings()
-        download_path = os.path.abspath(settings["download_path"])
-        os.makedirs(download_path, exist_ok=True)
-
-        prefs = {
-            "download.default_directory": download_path,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True
-        }
-        options.add_experimental_option("prefs", prefs)
-
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
-
-    def _cleanup_driver(self):
-        """清理 WebDriver"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except Exception:
-                pass
-            finally:
-                self.driver = None
-
-    async def _update_status(self, download: Download, status: str,
-                             progress: str = None, progress_percent: int = None,
-                             filename: str = None, error_message: str = None):
-        """更新下載狀態並推播"""
+    def _save_status(self, download_id: str, status: str,
+                     filename: str = None, error_message: str = None):
+        """寫入下載狀態（同步，於執行緒池中呼叫）"""
         db = SessionLocal()
         try:
-            db_download = db.query(Download).filter(Download.id == download.id).first()
+            db_download = db.query(Download).filter(Download.id == download_id).first()
             if db_download:
                 db_download.status = status
                 if filename:
@@ -107,16 +101,22 @@ class DownloadService:
         finally:
             db.close()
 
-        # 更新當前任務資訊
+    async def _update_status(self, download: Download, status: str,
+                             progress: str = None, progress_percent: int = None,
+                             filename: str = None, error_message: str = None):
+        """更新下載狀態並推播"""
+        await run_blocking(self._save_status, download.id, status, filename, error_message)
+
+        # 更新進行中的任務資訊
         if status == "processing":
-            self.current_task = {
+            self.tasks[download.id] = {
                 "id": download.id,
                 "url": download.url,
                 "progress": progress_percent or 0,
                 "step": progress
             }
         elif status in ["completed", "failed"]:
-            self.current_task = None
+            self.tasks.pop(download.id, None)
 
         # WebSocket 推播
         await manager.send_status_update(
@@ -129,55 +129,109 @@ class DownloadService:
             error_message=error_message
         )
 
-    async def _process_download(self, download: Download) -> bool:
-        """處理單一下載，返回是否成功"""
+    # 以下 _page_* 為 Selenium 的阻塞操作，一律透過 run_blocking 在執行緒池中執行
+
+    def _page_fill_url(self, driver: webdriver.Chrome, url: str):
+        """等待輸入框出現並輸入網址"""
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "#s_input"))
+        )
+
+        input_box = driver.find_element(By.CSS_SELECTOR, "#s_input")
+        input_box.click()
+        input_box.clear()
+        input_box.send_keys(url)
+
+    def _page_resolve(self, driver: webdriver.Chrome) -> str:
+        """送出查詢並等待結果，返回下載連結"""
+        search_button = driver.find_element(
+            By.CSS_SELECTOR, "#search-form > div > div > button"
+        )
+        search_button.click()
+
+        # 等待結果
+        target_link = WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located(
+                (By.CSS_SELECTOR, "#search-result > ul > li > div > div:nth-child(3) > a")
+            )
+        )
+        return target_link.get_attribute("href")
+
+    def _list_download_dir(self) -> set:
+        try:
+            return set(os.listdir(self._download_path))
+        except OSError:
+            return set()
+
+    def _wait_download_started(self, before: set, timeout: float = DOWNLOAD_START_TIMEOUT) -> Optional[str]:
+        """
+        等待下載目錄出現新檔案（Chrome 下載中為 .crdownload）
+
+        Returns:
+            下載的檔名（去掉 .crdownload），逾時或無法判斷時為 None
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            new_files = self._list_download_dir() - before
+            if new_files:
+                name = sorted(new_files)[0]
+                if name.endswith(".crdownload"):
+                    name = name[:-len(".crdownload")]
+                    # 尚未確定檔名的暫存檔（Unconfirmed 12345）
+                    if name.startswith("Unconfirmed") or not os.path.splitext(name)[1]:
+                        return None
+                return name
+            time.sleep(0.2)
+        return None
+
+    async def _process_download(self, download: Download, driver: webdriver.Chrome) -> bool:
+        """
+        用指定的瀏覽器處理單一下載
+
+        Returns:
+            是否成功；瀏覽器異常時拋出 WebDriverException（狀態已更新），由呼叫端丟棄該瀏覽器
+        """
         try:
             # 20% - 開啟頁面
             await self._update_status(download, "processing", "正在開啟下載頁面...", 20)
-            self.driver.get("https://saveclip.app/tw")
+            await run_blocking(driver.get, "https://saveclip.app/tw")
 
             # 40% - 輸入網址
             await self._update_status(download, "processing", "正在輸入網址...", 40)
-            await asyncio.sleep(0.5)
-
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "#s_input"))
-            )
-
-            input_box = self.driver.find_element(By.CSS_SELECTOR, "#s_input")
-            input_box.click()
-            input_box.clear()
-            input_box.send_keys(download.url)
+            await run_blocking(self._page_fill_url, driver, download.url)
 
             # 60% - 解析影片
             await self._update_status(download, "processing", "正在解析影片...", 60)
-            search_button = self.driver.find_element(
-                By.CSS_SELECTOR, "#search-form > div > div > button"
-            )
-            search_button.click()
-
-            # 等待結果
-            target_link = WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "#search-result > ul > li > div > div:nth-child(3) > a")
-                )
-            )
+            target_url = await run_blocking(self._page_resolve, driver)
 
             # 80% - 下載中
             await self._update_status(download, "processing", "正在下載影片...", 80)
-            target_url = target_link.get_attribute("href")
-            self.driver.get(target_url)
+            before = await run_blocking(self._list_download_dir)
+            await run_blocking(driver.get, target_url)
 
-            await asyncio.sleep(2)  # 等待下載開始
+            # 等待下載開始（檔案出現在下載目錄）
+            started_name = await run_blocking(self._wait_download_started, before)
 
             # 100% - 完成
-            filename = f"reel_{download.id[:8]}.mp4"
+            filename = started_name or f"reel_{download.id[:8]}.mp4"
+            if started_name:
+                # 檔案下載完成後 find() 才會返回它；內容指紋在下次開始下載時由 reconcile 補上
+                await run_blocking(
+                    get_download_index().remember,
+                    media_id_from_url(download.url), os.path.join(self._download_path, started_name)
+                )
             await self._update_status(
                 download, "completed",
                 progress="下載完成", progress_percent=100,
                 filename=filename
             )
             self.stats["completed_count"] += 1
+            if started_name:
+                # 瀏覽器可能仍在下載，後製管線會等檔案完成再處理
+                event_bus.publish(DOWNLOAD_COMPLETED, {
+                    "source": "instagram", "path": os.path.join(self._download_path, started_name),
+                    "url": download.url, "duplicate": False
+                })
             return True
 
         except TimeoutException:
@@ -195,8 +249,7 @@ class DownloadService:
             )
             self.stats["failed_count"] += 1
             # 瀏覽器異常需要重啟
-            self._cleanup_driver()
-            return False
+            raise
 
         except Exception as e:
             await self._update_status(
@@ -207,15 +260,152 @@ class DownloadService:
             return False
 
     def _get_queue_count(self) -> int:
-        """取得佇列數量"""
+        """取得佇列數量（COUNT 查詢，走 status 索引）"""
         db = SessionLocal()
         try:
             return db.query(Download).filter(Download.status == "pending").count()
         finally:
             db.close()
 
+    def queue_depth(self) -> int:
+        """
+        待處理項目數量
+
+        平時只讀記憶體計數器，計數器過期（QUEUE_RECONCILE_INTERVAL）或尚未初始化時才查詢資料庫校正，
+        因此前端頻繁輪詢狀態不會每次都執行 COUNT。
+        """
+        now = time.monotonic()
+        with self._depth_lock:
+            if self._queue_depth is not None and now - self._queue_checked_at < QUEUE_RECONCILE_INTERVAL:
+                return self._queue_depth
+
+        count = self._get_queue_count()
+        with self._depth_lock:
+            self._queue_depth = count
+            self._queue_checked_at = now
+        return count
+
+    def adjust_queue_depth(self, delta: int):
+        """佇列新增（正數）或移除（負數）待處理項目時更新計數器"""
+        with self._depth_lock:
+            if self._queue_depth is not None:
+                self._queue_depth = max(0, self._queue_depth + delta)
+
+    def _claim_next(self) -> Optional[Download]:
+        """
+        原子地領取下一個待處理項目（pending → processing）
+
+        Returns:
+            脫離 session 的副本，沒有待處理項目時為 None
+        """
+        db = SessionLocal()
+        try:
+            download = claim_next_download(db)
+        finally:
+            db.close()
+
+        if download is None:
+            with self._depth_lock:
+                self._queue_depth = 0
+                self._queue_checked_at = time.monotonic()
+        else:
+            self.adjust_queue_depth(-1)
+        self.stats["queue_count"] = self.queue_depth()
+        return download
+
+    def _requeue_stale(self):
+        """上次中斷時留在 processing 的項目放回佇列"""
+        db = SessionLocal()
+        try:
+            requeued = db.query(Download).filter(Download.status == "processing").update(
+                {Download.status: "pending"}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.adjust_queue_depth(requeued)
+
+    # ===== 排程器工作來源介面 =====
+
+    def is_active(self) -> bool:
+        return self._accepting and not self._stop_requested
+
+    def _check_finished(self):
+        if self._in_flight == 0 and self._finished is not None:
+            self._finished.set()
+
+    async def claim(self) -> Optional[Download]:
+        # 領取中也算在進行中，避免佇列剛好領完時被誤判為全部結束
+        self._in_flight += 1
+        try:
+            download = await run_blocking(self._claim_next)
+        except Exception:
+            download = None
+        if download is None:
+            self._in_flight -= 1
+            self._check_finished()
+        return download
+
+    async def _complete_duplicate(self, download: Download) -> bool:
+        """
+        同一支 reel 已下載過時直接沿用既有檔案（不開瀏覽器、不連網）
+
+        Returns:
+            是否已處理
+        """
+        existing = await run_blocking(reuse_existing, media_id_from_url(download.url), self._download_path)
+        if existing is None:
+            return False
+        await self._update_status(
+            download, "completed",
+            progress="已下載過，沿用既有檔案", progress_percent=100,
+            filename=existing.name
+        )
+        self.stats["completed_count"] += 1
+        event_bus.publish(DOWNLOAD_COMPLETED, {
+            "source": "instagram", "path": str(existing), "url": download.url, "duplicate": True
+        })
+        return True
+
+    async def run(self, download: Download) -> bool:
+        try:
+            try:
+                if await self._complete_duplicate(download):
+                    return True
+            except Exception:
+                pass
+
+            try:
+                driver = await run_blocking(self._browsers.acquire)
+            except Exception as e:
+                # 無法啟動瀏覽器：放回佇列並停止服務
+                await run_blocking(self._save_status, download.id, "pending")
+                self.adjust_queue_depth(1)
+                self.status = ServiceStatus.ERROR
+                self._stop_requested = True
+                await manager.broadcast({
+                    "type": "error",
+                    "data": {"message": f"無法啟動瀏覽器：{str(e)[:50]}"}
+                })
+                return False
+
+            broken = False
+            try:
+                return await self._process_download(download, driver)
+            except WebDriverException:
+                broken = True
+                return False
+            finally:
+                await run_blocking(self._browsers.release, driver, broken)
+        finally:
+            self._in_flight -= 1
+            if self._stop_requested:
+                self._check_finished()
+
+    # ===== 控制 =====
+
     async def start_downloads(self) -> Dict[str, Any]:
-        """開始處理佇列"""
+        """開始處理佇列，直到佇列清空或被停止才返回"""
         # 使用鎖防止重複啟動
         with self._lock:
             if self.status == ServiceStatus.RUNNING:
@@ -225,11 +415,21 @@ class DownloadService:
             self._stop_requested = False
             self.stats = {"completed_count": 0, "failed_count": 0, "queue_count": 0}
 
-        settings = self._get_settings()
+        self._finished = asyncio.Event()
+        self._in_flight = 0
 
         try:
-            # 初始化瀏覽器
-            self._init_driver(headless=settings["headless_mode"])
+            await run_blocking(self._requeue_stale)
+            settings = await run_blocking(self._get_settings)
+            self._download_path = os.path.abspath(settings["download_path"])
+            # 登記上次瀏覽器下載完成的檔案（內容指紋），重複的內容改為硬連結
+            await run_blocking(get_download_index().reconcile, self._download_path, VIDEO_EXTENSIONS)
+            self._browsers = get_browser_pool(
+                headless=settings["headless_mode"], download_path=self._download_path
+            )
+
+            # 先準備好一個瀏覽器（池中已有就直接重用），無法啟動時立即回報
+            await run_blocking(self._browsers.warm, 1)
 
             # 廣播開始下載
             await manager.broadcast({
@@ -237,44 +437,11 @@ class DownloadService:
                 "data": {"status": "running"}
             })
 
-            while not self._stop_requested:
-                # 檢查瀏覽器是否還活著
-                if not self.driver:
-                    try:
-                        self._init_driver(headless=settings["headless_mode"])
-                    except Exception as e:
-                        self.status = ServiceStatus.ERROR
-                        await manager.broadcast({
-                            "type": "error",
-                            "data": {"message": f"無法啟動瀏覽器：{str(e)[:50]}"}
-                        })
-                        break
-
-                # 取得下一個待處理項目
-                db = SessionLocal()
-                try:
-                    download = db.query(Download).filter(
-                        Download.status == "pending"
-                    ).order_by(Download.created_at.asc()).first()
-
-                    self.stats["queue_count"] = db.query(Download).filter(
-                        Download.status == "pending"
-                    ).count()
-
-                    if not download:
-                        break
-
-                    # 複製資料避免 session 問題
-                    download_copy = Download(
-                        id=download.id,
-                        url=download.url,
-                        status=download.status
-                    )
-                finally:
-                    db.close()
-
-                await self._process_download(download_copy)
-                await asyncio.sleep(1)
+            self._accepting = True
+            scheduler.add_source(self)
+            scheduler.start()
+            scheduler.wake()
+            await self._finished.wait()
 
         except Exception as e:
             self.status = ServiceStatus.ERROR
@@ -284,8 +451,9 @@ class DownloadService:
             })
 
         finally:
-            self._cleanup_driver()
-            self.current_task = None
+            # 瀏覽器留在池中，閒置逾時後自動關閉
+            self._accepting = False
+            self.tasks.clear()
 
             # 廣播完成
             final_status = "completed" if not self._stop_requested else "stopped"
@@ -307,12 +475,13 @@ class DownloadService:
         }
 
     async def stop_downloads(self) -> Dict[str, Any]:
-        """停止下載"""
+        """停止下載（進行中的項目會做完）"""
         if self.status != ServiceStatus.RUNNING:
             return {"success": False, "message": "Not running"}
 
         self.status = ServiceStatus.STOPPING
         self._stop_requested = True
+        self._check_finished()
 
         await manager.broadcast({
             "type": "download_stopping",
@@ -321,15 +490,25 @@ class DownloadService:
 
         return {"success": True, "message": "Stop requested"}
 
-    def get_status(self) -> Dict[str, Any]:
-        """取得詳細狀態"""
-        return {
+    async def get_status(self) -> Dict[str, Any]:
+        """
+        取得詳細狀態
+
+        tasks 與排程器的佇列只在事件迴圈中修改，必須在事件迴圈中取得快照；
+        只有佇列數量（可能查詢資料庫）交給執行緒池。
+        """
+        tasks = [dict(task) for task in self.tasks.values()]
+        snapshot = {
             "status": self.status.value,
             "is_running": self.status == ServiceStatus.RUNNING,
-            "current_task": self.current_task,
-            "stats": self.stats,
-            "queue_count": self._get_queue_count()
+            "current_task": tasks[-1] if tasks else None,
+            "tasks": tasks,
+            "stats": dict(self.stats),
+            "scheduler": scheduler.get_status(),
+            "browsers": get_pools_status()
         }
+        snapshot["queue_count"] = await run_blocking(self.queue_depth)
+        return snapshot
 
 
 # 全域下載服務實例
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+事件匯流排 - 下載服務發布完成事件，其他服務訂閱（例如自動後製管線）
+
+下載服務不需要知道有誰在等檔案，訂閱者也不需要掃描下載資料夾。
+
+使用方式：
+    event_bus.subscribe(DOWNLOAD_COMPLETED, handler)
+    event_bus.publish(DOWNLOAD_COMPLETED, {"source": "youtube", "path": "...", "url": "..."})
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+# 下載完成：{"source": "youtube" | "instagram", "path": 檔案絕對路徑, "url": 網址, "duplicate": bool}
+# instagram 的 saveclip 下載在發布時檔案可能仍在下載中（瀏覽器下載），訂閱者需自行等待檔案完成
+DOWNLOAD_COMPLETED = "download_completed"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class EventBus:
+    """同步的發布 / 訂閱（處理函數應立即返回，耗時的工作請自行排入佇列）"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event: str, handler: Handler):
+        with self._lock:
+            if handler not in self._handlers[event]:
+                self._handlers[event].append(handler)
+
+    def unsubscribe(self, event: str, handler: Handler):
+        with self._lock:
+            if handler in self._handlers[event]:
+                self._handlers[event].remove(handler)
+
+    def publish(self, event: str, payload: Dict[str, Any]):
+        """通知所有訂閱者（單一訂閱者出錯不影響其他訂閱者與發布端）"""
+        with self._lock:
+            handlers = list(self._handlers[event])
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"[事件] {event} 處理失敗: {e}")
+
+
+# 全域事件匯流排
+event_bus = EventBus()
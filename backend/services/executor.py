@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+阻塞工作執行器 - yt-dlp、Selenium 等同步呼叫一律丟到這裡執行，不佔用事件迴圈
+
+    - run_blocking: 在共用執行緒池中執行同步函數並 await 結果
+    - LoopBridge: 從工作執行緒安全地把協程（例如 WebSocket 推播）排回事件迴圈
+
+使用方式：
+    bridge = LoopBridge()            # 在事件迴圈中建立
+    hook = lambda d: bridge.broadcast({"type": "yt_progress", "data": d})
+    info = await run_blocking(ydl.extract_info, url, download=True)
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from api.websocket import manager
+
+# 同時執行的阻塞工作上限（下載、瀏覽器操作、影片資訊查詢）
+MAX_BLOCKING_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_BLOCKING_WORKERS, thread_name_prefix="blocking")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在執行緒池中執行同步函數，事件迴圈可繼續處理其他請求"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    """關閉執行緒池（應用程式結束時呼叫）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class LoopBridge:
+    """從工作執行緒回到事件迴圈的橋接（必須在事件迴圈中建立）"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+
+    def submit(self, coro_factory: Callable[[], Awaitable[Any]]):
+        """排程一個協程到事件迴圈（不等待結果，可在任何執行緒呼叫）"""
+        def create():
+            asyncio.ensure_future(coro_factory())
+
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(create)
+
+    def broadcast(self, message: dict):
+        """從工作執行緒推播 WebSocket 訊息"""
+        self.submit(lambda: manager.broadcast(message))
@@ -11,6 +11,11 @@ from typing import Optional, Dict, Any
 import yt_dlp
 
 from api.websocket import manager
+from services.dedup import get_download_index, media_id_from_info, media_id_from_url, reuse_existing
+from services.events import DOWNLOAD_COMPLETED, event_bus
+from services.executor import LoopBridge, run_blocking
+from services.scheduler import scheduler
+from services.youtube_downloader import download_with_info, downloaded_path, extract_info
 
 
 class InstagramYtdlpService:
@@ -19,18 +24,37 @@ class InstagramYtdlpService:
     def __init__(self):
         self.download_path = Path("./downloads/instagram")
         self.download_path.mkdir(parents=True, exist_ok=True)
-        self.is_running = False
-        self.current_task: Optional[Dict[str, Any]] = None
+        # 進行中的下載 {task_id: 進度}
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.tasks)
+
+    @property
+    def current_task(self) -> Optional[Dict[str, Any]]:
+        return next(reversed(self.tasks.values()), None)
 
     def get_status(self) -> Dict[str, Any]:
+        queued = [job for job in scheduler.get_status()["queued"] if job["kind"] == "ig_ytdlp"]
         return {
             "is_running": self.is_running,
             "current_task": self.current_task,
+            "tasks": list(self.tasks.values()),
+            "queue_count": len(queued),
             "method": "yt-dlp"
         }
 
-    def _progress_hook(self, d: Dict[str, Any]):
-        """下載進度回調"""
+    def enqueue(self, url: str) -> Dict[str, Any]:
+        """把下載加入排程器（立即返回）"""
+        return scheduler.submit(
+            url,
+            lambda job: self.download_reel(url, task_id=job["id"]),
+            kind="ig_ytdlp",
+        )
+
+    def _progress_hook(self, d: Dict[str, Any], task_id: str, bridge: LoopBridge):
+        """下載進度回調（在下載執行緒中被呼叫，推播交回事件迴圈）"""
         if d['status'] == 'downloading':
             percent_str = d.get('_percent_str', '0%').strip()
             try:
@@ -38,70 +62,89 @@ class InstagramYtdlpService:
             except:
                 percent = 0
 
-            self.current_task = {
+            self.tasks[task_id] = {
+                "task_id": task_id,
                 "status": "downloading",
                 "progress": percent,
                 "speed": d.get('_speed_str', 'N/A'),
                 "filename": d.get('filename', ''),
             }
 
-            asyncio.create_task(manager.broadcast({
+            bridge.broadcast({
                 "type": "ig_ytdlp_progress",
-                "data": self.current_task
-            }))
+                "data": dict(self.tasks[task_id])
+            })
 
         elif d['status'] == 'finished':
-            self.current_task = {
+            self.tasks[task_id] = {
+                "task_id": task_id,
                 "status": "processing",
                 "progress": 100,
                 "message": "正在處理...",
             }
 
-    async def download_reel(self, url: str) -> Dict[str, Any]:
+    async def download_reel(self, url: str, task_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        使用 yt-dlp 下載 Instagram Reel
+        使用 yt-dlp 下載 Instagram Reel（一般由排程器呼叫，請使用 enqueue 提交）
 
         Args:
             url: Instagram Reel 網址
+            task_id: 任務 ID（推播訊息會帶上）
 
         Returns:
             下載結果
         """
-        if self.is_running:
-            return {"success": False, "error": "已有下載任務進行中"}
-
-        self.is_running = True
+        task_id = task_id or url
+        self.tasks[task_id] = {"task_id": task_id, "status": "parsing", "progress": 0}
 
         try:
+            bridge = LoopBridge()
             ydl_opts = {
                 'outtmpl': str(self.download_path / '%(id)s.%(ext)s'),
-                'progress_hooks': [self._progress_hook],
+                'progress_hooks': [lambda d: self._progress_hook(d, task_id, bridge)],
                 'quiet': True,
                 'no_warnings': True,
                 'format': 'best',
             }
 
-            await manager.broadcast({
-                "type": "ig_ytdlp_started",
-                "data": {"url": url}
-            })
+            # 同一支 reel 已下載過（包含 saveclip 下載的）：直接沿用既有檔案，不連網
+            existing = await run_blocking(reuse_existing, media_id_from_url(url), self.download_path)
+            duplicate = existing is not None
+
+            if duplicate:
+                filename = str(existing)
+            else:
+                await manager.broadcast({
+                    "type": "ig_ytdlp_started",
+                    "data": {"url": url, "task_id": task_id}
+                })
+
+                def download():
+                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        info = download_with_info(ydl, url)
+                        return str(get_download_index().record(downloaded_path(ydl, info), media_id_from_info(info)))
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                filename = ydl.prepare_filename(info)
+                filename = await run_blocking(download)
+
+            event_bus.publish(DOWNLOAD_COMPLETED, {
+                "source": "instagram", "path": filename, "url": url, "duplicate": duplicate
+            })
 
             await manager.broadcast({
                 "type": "ig_ytdlp_completed",
                 "data": {
+                    "task_id": task_id,
                     "url": url,
                     "filename": os.path.basename(filename),
+                    "duplicate": duplicate,
                 }
             })
 
             return {
                 "success": True,
                 "filename": os.path.basename(filename),
-                "method": "yt-dlp"
+                "method": "yt-dlp",
+                "duplicate": duplicate,
             }
 
         except Exception as e:
@@ -109,7 +152,7 @@ class InstagramYtdlpService:
 
             await manager.broadcast({
                 "type": "ig_ytdlp_error",
-                "data": {"url": url, "error": error_msg}
+                "data": {"task_id": task_id, "url": url, "error": error_msg}
             })
 
             return {
@@ -119,27 +162,19 @@ class InstagramYtdlpService:
             }
 
         finally:
-            self.is_running = False
-            self.current_task = None
+            self.tasks.pop(task_id, None)
 
     async def get_info(self, url: str) -> Dict[str, Any]:
         """獲取 Instagram 內容資訊"""
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
+            info = await run_blocking(extract_info, url)
+            return {
+                "id": info.get('id'),
+                "title": info.get('title'),
+                "duration": info.get('duration'),
+                "thumbnail": info.get('thumbnail'),
+                "uploader": info.get('uploader'),
             }
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    "id": info.get('id'),
-                    "title": info.get('title'),
-                    "duration": info.get('duration'),
-                    "thumbnail": info.get('thumbnail'),
-                    "uploader": info.get('uploader'),
-                }
         except Exception as e:
             return {"error": str(e)}
 
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+自動後製管線 - 下載完成後，對「那一個檔案」執行設定好的後製步驟
+
+    - 訂閱 DOWNLOAD_COMPLETED 事件（YouTube、IG yt-dlp、saveclip 下載完成時發布），不再掃描資料夾
+    - 每個來源的步驟由設定決定：pipeline_youtube / pipeline_instagram（逗號分隔，空字串表示停用）
+      可用步驟：translate（語音識別 + 翻譯 + 剪映草稿）、face_template（面相專案模板）、shopee（蝦皮專案）
+    - 固定數量的工作者（REELPULL_PIPELINE_WORKERS，預設 1）在專用執行緒池中執行，不佔用下載的執行緒
+    - 每個步驟的處理器只建立一次，Whisper 模型等載入後持續重用
+    - 進度透過 WebSocket 推播：pipeline_progress（合併為最新一則）、pipeline_completed、pipeline_error
+
+使用方式：
+    pipeline_runner.start()        # 應用程式啟動時（事件迴圈中）
+    await pipeline_runner.stop()   # 應用程式結束時
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from models import Setting, SessionLocal
+from api.websocket import manager
+from services.events import DOWNLOAD_COMPLETED, event_bus
+from services.executor import run_blocking
+
+PIPELINE_WORKERS = int(os.environ.get("REELPULL_PIPELINE_WORKERS", "1"))
+
+# 來源 → 設定鍵
+SOURCE_SETTINGS = {
+    "youtube": "pipeline_youtube",
+    "instagram": "pipeline_instagram",
+}
+
+# 等待瀏覽器下載完成的上限（秒）與檢查間隔
+FILE_READY_TIMEOUT = 600.0
+FILE_READY_POLL = 1.0
+
+# 狀態中保留的最近工作數
+RECENT_JOBS = 50
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _ensure_project_root():
+    """後製腳本位於專案根目錄（main.py 已加入，單獨使用本模組時補上）"""
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.append(str(PROJECT_ROOT))
+
+
+class PipelineStep:
+    """後製步驟：處理器延遲到第一次使用才建立，之後重用（模型保持載入）"""
+
+    name = ""
+    label = ""
+    # 處理器不保證執行緒安全時，同一步驟一次只處理一個檔案
+    serialize = True
+
+    def __init__(self):
+        self._processor = None
+        self._init_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def _create(self):
+        raise NotImplementedError
+
+    def _process(self, processor, video_path: Path) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @property
+    def warm(self) -> bool:
+        return self._processor is not None
+
+    def run(self, video_path: Path) -> Dict[str, Any]:
+        """處理單一檔案（同步，於管線執行緒池中呼叫）；失敗時拋出例外"""
+        with self._init_lock:
+            if self._processor is None:
+                _ensure_project_root()
+                self._processor = self._create()
+        if not self.serialize:
+            return self._process(self._processor, video_path)
+        with self._run_lock:
+            return self._process(self._processor, video_path)
+
+
+class TranslateStep(PipelineStep):
+    """translate_video.py：語音識別 → 翻譯 → SRT → 剪映草稿"""
+
+    name = "translate"
+    label = "翻譯"
+    # Whisper 模型本身有鎖，翻譯可與其他檔案的語音識別同時進行
+    serialize = False
+
+    def _create(self):
+        from translate_video import TranslationWorkflow
+        return TranslationWorkflow()
+
+    def _process(self, workflow, video_path: Path) -> Dict[str, Any]:
+        result = workflow.process_video(video_path)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error") or "翻譯失敗")
+        return {key: result[key] for key in ("srt", "draft", "skipped") if key in result}
+
+
+class FaceTemplateStep(PipelineStep):
+    """template_video_replacer.py：套用面相專案模板"""
+
+    name = "face_template"
+    label = "面相模板"
+    template_name = "面相專案"
+
+    def _create(self):
+        from template_video_replacer import TemplateVideoReplacer
+
+        class Replacer(TemplateVideoReplacer):
+            def load_config(self):
+                # 原本從目前工作目錄讀取 config.json，後端的工作目錄是 backend/
+                try:
+                    with open(PROJECT_ROOT / "config.json", "r", encoding="utf-8") as f:
+                        return json.load(f)
+                except (OSError, ValueError):
+                    return super().load_config()
+
+        replacer = Replacer()
+        template_path = replacer.find_template_draft(self.template_name)
+        if not template_path:
+            raise RuntimeError(f"找不到模板：{self.template_name}")
+        return replacer, template_path
+
+    def _process(self, processor, video_path: Path) -> Dict[str, Any]:
+        replacer, template_path = processor
+        output_name = f"{self.template_name}_{video_path.stem}"
+        if os.path.exists(os.path.join(replacer.draft_folder_path, output_name)):
+            return {"draft": output_name, "skipped": True}
+
+        # 每個影片重新分析模板（create_video_replaced_draft 會修改模板資料）
+        template_info = replacer.analyze_template_structure(template_path)
+        if not template_info:
+            raise RuntimeError("模板分析失敗")
+        if not replacer.create_video_replaced_draft(template_info, str(video_path), output_name):
+            raise RuntimeError("建立草稿失敗")
+        return {"draft": output_name}
+
+
+class ShopeeStep(PipelineStep):
+    """shopee_video.py：套用蝦皮專案模板"""
+
+    name = "shopee"
+    label = "蝦皮模板"
+
+    def _create(self):
+        from shopee_video import ShopeeVideoProcessor
+        return ShopeeVideoProcessor()
+
+    def _process(self, processor, video_path: Path) -> Dict[str, Any]:
+        output_name = processor.process_video(str(video_path))
+        if not output_name:
+            raise RuntimeError("建立草稿失敗")
+        return {"draft": output_name}
+
+
+STEP_TYPES = {step.name: step for step in (TranslateStep, FaceTemplateStep, ShopeeStep)}
+
+
+def parse_steps(value: Optional[str]) -> List[str]:
+    """
+    解析設定中的步驟列表
+
+    Raises:
+        ValueError: 有不認得的步驟名稱
+    """
+    steps = [name.strip() for name in (value or "").split(",") if name.strip()]
+    unknown = [name for name in steps if name not in STEP_TYPES]
+    if unknown:
+        raise ValueError(f"不支援的後製步驟：{', '.join(unknown)}（可用：{', '.join(STEP_TYPES)}）")
+    return steps
+
+
+def wait_for_file(path: Path, timeout: float = FILE_READY_TIMEOUT) -> bool:
+    """
+    等待檔案下載完成：檔案存在、沒有 .crdownload 暫存檔，且大小在兩次檢查之間沒有變化
+
+    Returns:
+        是否在時間內完成
+    """
+    partial = path.with_name(path.name + ".crdownload")
+    deadline = time.monotonic() + timeout
+    last_size = -1
+    while time.monotonic() < deadline:
+        if path.is_file() and not partial.exists():
+            size = path.stat().st_size
+            if size > 0 and size == last_size:
+                return True
+            last_size = size
+        time.sleep(FILE_READY_POLL)
+    return False
+
+
+class PipelineRunner:
+    """下載完成 → 後製步驟的工作佇列"""
+
+    def __init__(self, workers: int = PIPELINE_WORKERS):
+        self.workers = max(1, workers)
+        self._steps: Dict[str, PipelineStep] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 排隊中或處理中的檔案（同一檔案重複的完成事件只處理一次）
+        self._active_paths = set()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._recent: deque = deque(maxlen=RECENT_JOBS)
+        self.stats = {"completed": 0, "failed": 0}
+
+    def start(self):
+        """開始接收下載完成事件（必須在事件迴圈中呼叫）"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        event_bus.subscribe(DOWNLOAD_COMPLETED, self.on_download_completed)
+
+    async def stop(self):
+        event_bus.unsubscribe(DOWNLOAD_COMPLETED, self.on_download_completed)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def on_download_completed(self, payload: Dict[str, Any]):
+        """事件處理：只排入佇列（可在任何執行緒呼叫）"""
+        if self._loop is None or self._loop.is_closed() or payload.get("source") not in SOURCE_SETTINGS:
+            return
+        self._loop.call_soon_threadsafe(self._enqueue, dict(payload))
+
+    def _enqueue(self, payload: Dict[str, Any]):
+        path = os.path.abspath(payload["path"])
+        if path in self._active_paths:
+            return
+        self._active_paths.add(path)
+        self._queue.put_nowait({**payload, "path": path})
+
+    def _steps_for(self, source: str) -> List[str]:
+        """讀取來源對應的步驟設定（同步，於執行緒池中呼叫）"""
+        db = SessionLocal()
+        try:
+            setting = db.query(Setting).filter(Setting.key == SOURCE_SETTINGS[source]).first()
+        finally:
+            db.close()
+        return parse_steps(setting.value if setting else "")
+
+    def _get_step(self, name: str) -> PipelineStep:
+        step = self._steps.get(name)
+        if step is None:
+            step = self._steps[name] = STEP_TYPES[name]()
+        return step
+
+    async def _broadcast(self, msg_type: str, job: Dict[str, Any], **extra):
+        await manager.broadcast({
+            "type": msg_type,
+            "data": {
+                "task_id": job["id"],
+                "filename": job["filename"],
+                "source": job["source"],
+                "steps": job["steps"],
+                **extra,
+            }
+        })
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            payload = await self._queue.get()
+            try:
+                steps = await run_blocking(self._steps_for, payload["source"])
+                if steps:
+                    await self._run_job(loop, payload, steps)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 設定錯誤、資料庫被鎖定（下載工作者同時寫入）等：這個檔案記為失敗，工作者繼續處理下一個
+                print(f"[後製] {Path(payload['path']).name} 處理失敗: {e}")
+                job = self._new_job(payload, [])
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self.stats["failed"] += 1
+                self._recent.appendleft(job)
+                await self._broadcast("pipeline_error", job, step=None, error=str(e))
+            finally:
+                self._active_paths.discard(payload["path"])
+
+    @staticmethod
+    def _new_job(payload: Dict[str, Any], steps: List[str]) -> Dict[str, Any]:
+        path = Path(payload["path"])
+        return {
+            "id": uuid.uuid4().hex[:8],
+            "filename": path.name,
+            "path": str(path),
+            "source": payload["source"],
+            "url": payload.get("url"),
+            "steps": steps,
+            "status": "waiting",
+            "step": None,
+            "results": {},
+        }
+
+    async def _run_job(self, loop: asyncio.AbstractEventLoop, payload: Dict[str, Any], steps: List[str]):
+        path = Path(payload["path"])
+        job = self._new_job(payload, steps)
+        self.jobs[job["id"]] = job
+        current = None
+        try:
+            await self._broadcast("pipeline_progress", job, status="waiting", step=None)
+            if not await loop.run_in_executor(self._executor, wait_for_file, path):
+                raise RuntimeError("等待下載完成逾時")
+
+            job["status"] = "running"
+            for index, name in enumerate(steps):
+                current = name
+                step = self._get_step(name)
+                job["step"] = name
+                await self._broadcast(
+                    "pipeline_progress", job, status="running", step=name,
+                    step_index=index, warm=step.warm,
+                )
+                job["results"][name] = await loop.run_in_executor(self._executor, step.run, path)
+
+            job["status"] = "completed"
+            self.stats["completed"] += 1
+            await self._broadcast("pipeline_completed", job, results=job["results"])
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            self.stats["failed"] += 1
+            await self._broadcast("pipeline_error", job, step=current, error=str(e))
+
+        finally:
+            self.jobs.pop(job["id"], None)
+            self._recent.appendleft(job)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": list(self.jobs.values()),
+            "recent": list(self._recent),
+            "warm_steps": [name for name, step in self._steps.items() if step.warm],
+            "stats": dict(self.stats),
+        }
+
+
+# 全域後製管線
+pipeline_runner = PipelineRunner()
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+下載排程器 - 所有下載（saveclip 佇列、YouTube、IG yt-dlp）共用一組工作者
+
+    - DownloadScheduler: N 個工作者，依主機限制同時下載數（例如 saveclip.app 最多 2 個）
+        * submit(): 記憶體中的工作（YouTube / IG yt-dlp），依提交順序執行
+        * add_source(): 外部工作來源（例如資料庫佇列），有空位時才向來源領取工作
+    - SessionPool: 可重複使用的連線（Selenium 瀏覽器、yt-dlp 實例），用完歸還，壞掉就丟棄
+
+工作者都在事件迴圈中執行，挑選工作與計算主機名額都是同步的，不會有兩個工作者拿到同一個工作；
+實際的阻塞下載由各服務透過 run_blocking 丟到執行緒池。
+
+使用方式：
+    job = scheduler.submit("https://www.youtube.com/watch?v=...", handler, kind="youtube")
+    scheduler.add_source(download_service)   # 來源需提供 host、async claim()、async run(item)
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# 預設工作者數量與每個主機的同時下載上限
+DEFAULT_WORKERS = int(os.environ.get("REELPULL_DOWNLOAD_WORKERS", "3"))
+DEFAULT_HOST_LIMIT = 2
+HOST_LIMITS = {
+    "saveclip.app": 2,
+    "instagram.com": 2,
+    "youtube.com": 3,
+}
+
+# 沒有工作時，多久重新檢查一次外部來源（秒）
+IDLE_POLL_INTERVAL = 1.0
+
+
+def host_of(url: str) -> str:
+    """取得網址的主機名稱（去掉 www. 與 m.，youtu.be 視為 youtube.com）"""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == "youtu.be":
+        host = "youtube.com"
+    return host
+
+
+class SessionPool:
+    """
+    可重複使用的連線池（執行緒安全，acquire / release 在工作執行緒中呼叫）
+
+    Args:
+        factory: 建立新連線的函數
+        max_size: 最多同時存在幾個連線
+        close: 關閉連線的函數（丟棄或關閉連線池時呼叫）
+        max_uses: 每個連線最多使用幾次就回收重建（None 表示不限）
+        idle_timeout: 閒置超過幾秒就關閉（None 表示不關閉）；會啟動背景執行緒定期清理
+        health_check: 借出前檢查連線是否可用的函數，返回 False 或拋出例外時丟棄並改用其他連線
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_size: int,
+                 close: Optional[Callable[[Any], None]] = None,
+                 max_uses: Optional[int] = None,
+                 idle_timeout: Optional[float] = None,
+                 health_check: Optional[Callable[[Any], bool]] = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self._close = close
+        self._health_check = health_check
+        self._idle: List[Tuple[Any, float]] = []  # (連線, 歸還時間)，最後歸還的在最後面
+        self._uses: Dict[int, int] = {}
+        self._created = 0
+        self._cond = threading.Condition()
+        self._closed = threading.Event()
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0, "expired": 0}
+
+        if idle_timeout:
+            threading.Thread(target=self._reaper, daemon=True, name="session-pool-reaper").start()
+
+    def _take_expired_locked(self) -> List[Any]:
+        """取出閒置過久的連線（呼叫端需持有鎖，並在鎖外關閉）"""
+        if not self.idle_timeout or not self._idle:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [session for session, released_at in self._idle if released_at < cutoff]
+        if expired:
+            self._idle = [(session, released_at) for session, released_at in self._idle if released_at >= cutoff]
+            for session in expired:
+                self._forget_locked(session)
+            self.stats["expired"] += len(expired)
+        return expired
+
+    def _forget_locked(self, session: Any):
+        self._created -= 1
+        self._uses.pop(id(session), None)
+        self._cond.notify()
+
+    def _close_all(self, sessions: List[Any]):
+        if not self._close:
+            return
+        for session in sessions:
+            try:
+                self._close(session)
+            except Exception:
+                pass
+
+    def _create(self) -> Any:
+        try:
+            session = self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._uses[id(session)] = 0
+            self.stats["created"] += 1
+        return session
+
+    def _is_healthy(self, session: Any) -> bool:
+        if self._health_check is None:
+            return True
+        try:
+            return bool(self._health_check(session))
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """
+        取得連線；優先使用最近歸還的閒置連線（通過健康檢查），否則在上限內建立新的，都沒有就等待歸還
+
+        Raises:
+            TimeoutError: 等待超過 timeout 秒
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                expired = self._take_expired_locked()
+                session, create = None, False
+                if self._idle:
+                    session, _ = self._idle.pop()
+                elif self._created < self.max_size:
+                    self._created += 1
+                    create = True
+                elif not expired:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("等待可用連線逾時")
+                    self._cond.wait(remaining)
+                    continue
+            self._close_all(expired)
+
+            if create:
+                return self._create()
+            if session is None:
+                continue
+            if self._is_healthy(session):
+                with self._cond:
+                    self.stats["reused"] += 1
+                return session
+
+            # 健康檢查失敗：丟棄後重試
+            with self._cond:
+                self.stats["unhealthy"] += 1
+                self._forget_locked(session)
+            self._close_all([session])
+
+    def release(self, session: Any, broken: bool = False):
+        """歸還連線；broken=True 表示連線已損壞，達到 max_uses 的連線也會關閉並釋放名額"""
+        with self._cond:
+            uses = self._uses.get(id(session), 0) + 1
+            recycle = broken or (self.max_uses is not None and uses >= self.max_uses)
+            if recycle:
+                if not broken:
+                    self.stats["recycled"] += 1
+                self._forget_locked(session)
+            else:
+                self._uses[id(session)] = uses
+                self._idle.append((session, time.monotonic()))
+                self._cond.notify()
+        if recycle:
+            self._close_all([session])
+
+    def warm(self, count: int = 1):
+        """預先建立連線，讓閒置連線至少有 count 個（不超過 max_size）"""
+        while True:
+            with self._cond:
+                if len(self._idle) >= count or self._created >= self.max_size:
+                    return
+                self._created += 1
+            session = self._create()
+            with self._cond:
+                self._idle.insert(0, (session, time.monotonic()))
+                self._cond.notify()
+
+    def reap_idle(self):
+        """關閉閒置過久的連線"""
+        with self._cond:
+            expired = self._take_expired_locked()
+        self._close_all(expired)
+
+    def _reaper(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._closed.wait(interval):
+            self.reap_idle()
+
+    def close(self):
+        """關閉所有閒置連線（使用中的連線歸還時仍會放回池中）"""
+        with self._cond:
+            idle = [session for session, _ in self._idle]
+            self._idle = []
+            for session in idle:
+                self._forget_locked(session)
+        self._close_all(idle)
+
+    @property
+    def size(self) -> int:
+        return self._created
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "size": self._created,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                **self.stats,
+            }
+
+
+class DownloadScheduler:
+    """共用的下載排程器"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 default_host_limit: int = DEFAULT_HOST_LIMIT):
+        """
+        Args:
+            workers: 工作者數量（同時下載上限）
+            host_limits: 各主機的同時下載上限
+            default_host_limit: 未列出的主機的同時下載上限
+        """
+        self.workers = workers
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_host_limit = default_host_limit
+
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._sources: List[Any] = []
+        self._active_hosts: Dict[str, int] = {}
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ids = itertools.count(1)
+        self.stats = {"completed_count": 0, "failed_count": 0}
+
+    # ===== 工作者 =====
+
+    def start(self):
+        """啟動工作者（必須在事件迴圈中呼叫，重複呼叫無作用）"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"download-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """停止所有工作者（進行中的下載會被取消）"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def wake(self):
+        """通知閒置的工作者重新檢查工作（新增工作或名額釋放時呼叫）"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _host_available(self, host: str) -> bool:
+        limit = self.host_limits.get(host, self.default_host_limit)
+        return self._active_hosts.get(host, 0) < limit
+
+    def _take_host(self, host: str):
+        self._active_hosts[host] = self._active_hosts.get(host, 0) + 1
+
+    def _release_host(self, host: str):
+        self._active_hosts[host] -= 1
+        if self._active_hosts[host] <= 0:
+            del self._active_hosts[host]
+
+    def _next_pending(self) -> Optional[Dict[str, Any]]:
+        """取出第一個主機還有名額的記憶體工作（主機已滿的工作保留原順序）"""
+        for job in self._pending:
+            if self._host_available(job["host"]):
+                self._pending.remove(job)
+                self._take_host(job["host"])
+                return job
+        return None
+
+    async def _claim_from_sources(self) -> Optional[Dict[str, Any]]:
+        """向外部來源領取工作，領取前先佔用主機名額，避免超過上限"""
+        for source in self._sources:
+            if not source.is_active() or not self._host_available(source.host):
+                continue
+            self._take_host(source.host)
+            try:
+                item = await source.claim()
+            except Exception:
+                item = None
+            if item is not None:
+                return {
+                    "id": f"{source.host}:{getattr(item, 'id', next(self._ids))}",
+                    "host": source.host,
+                    "kind": getattr(source, "kind", "queue"),
+                    "url": getattr(item, "url", ""),
+                    "handler": source.run,
+                    "payload": item,
+                }
+            self._release_host(source.host)
+        return None
+
+    async def _worker(self, index: int):
+        while True:
+            job = self._next_pending() or await self._claim_from_sources()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job["status"] = "running"
+            self._running[job["id"]] = job
+            try:
+                result = await job["handler"](job["payload"])
+                # handler 以返回 False 或 {"success": False} 表示失敗
+                failed = result is False or (isinstance(result, dict) and result.get("success") is False)
+                self.stats["failed_count" if failed else "completed_count"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["failed_count"] += 1
+            finally:
+                self._running.pop(job["id"], None)
+                self._release_host(job["host"])
+                if job.get("done") is not None and not job["done"].done():
+                    job["done"].set_result(None)
+                # 名額釋放後讓其他工作者接手同主機的工作
+                self.wake()
+
+    # ===== 工作提交 =====
+
+    def submit(self, url: str, handler: Callable[[Any], Awaitable[Any]],
+               payload: Any = None, kind: str = "download") -> Dict[str, Any]:
+        """
+        提交記憶體工作
+
+        Args:
+            url: 下載網址（用於判斷主機）
+            handler: 下載協程函數，會以 payload 呼叫
+            payload: 傳給 handler 的參數（None 表示傳入工作本身）
+            kind: 工作種類（僅供狀態顯示）
+
+        Returns:
+            工作資訊 {"id", "url", "host", "kind", "status", "position"}
+        """
+        job = {
+            "id": f"{kind}-{next(self._ids)}",
+            "url": url,
+            "host": host_of(url),
+            "kind": kind,
+            "status": "queued",
+            "handler": handler,
+            "done": asyncio.get_running_loop().create_future(),
+        }
+        job["payload"] = job if payload is None else payload
+        self._pending.append(job)
+        self.wake()
+        return {**self._public(job), "position": len(self._pending)}
+
+    def add_source(self, source: Any):
+        """
+        註冊外部工作來源
+
+        來源需提供：
+            host: 主機名稱（決定同時下載上限）
+            is_active() -> bool: 目前是否要領取工作
+            async claim() -> item | None: 原子地領取下一個工作
+            async run(item): 執行工作
+        """
+        if source not in self._sources:
+            self._sources.append(source)
+
+    # ===== 狀態 =====
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: job.get(key) for key in ("id", "url", "host", "kind", "status")}
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": [self._public(job) for job in self._running.values()],
+            "queued": [self._public(job) for job in self._pending],
+            "active_hosts": dict(self._active_hosts),
+            "host_limits": dict(self.host_limits),
+            "stats": dict(self.stats),
+        }
+
+
+# 全域排程器
+scheduler = DownloadScheduler()
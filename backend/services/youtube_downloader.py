@@ -4,12 +4,144 @@ YouTube 下載服務 - 使用 yt-dlp
 """
 
 import asyncio
+import copy
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any, Iterable
 import yt_dlp
 
 from api.websocket import manager
+from services.dedup import get_download_index, media_id_from_info, media_id_from_url, reuse_existing
+from services.events import DOWNLOAD_COMPLETED, event_bus
+from services.executor import LoopBridge, run_blocking
+from services.scheduler import SessionPool, scheduler
+
+# 查詢影片資訊用的 yt-dlp 實例（選項固定，可重複使用）
+# 播放清單只列出項目（不逐一解析每支影片），單一影片仍會完整解析
+YTDLP_INFO_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+}
+
+# 同時查詢影片資訊的數量（批次查詢的工作者數，也是共用 yt-dlp 實例的上限）
+INFO_WORKERS = 4
+
+# 影片資訊快取：查詢後這段時間內下載會直接使用，不再重新解析
+# （影片的串流網址數小時後才會過期，10 分鐘內下載是安全的）
+INFO_CACHE_TTL = 600.0
+INFO_CACHE_SIZE = 256
+
+ytdlp_info_pool = SessionPool(
+    lambda: yt_dlp.YoutubeDL(dict(YTDLP_INFO_OPTIONS)),
+    max_size=INFO_WORKERS,
+    close=lambda ydl: ydl.close(),
+)
+
+
+class InfoCache:
+    """yt-dlp 影片資訊的 TTL 快取（執行緒安全，超過容量時移除最久沒用到的）"""
+
+    def __init__(self, ttl: float = INFO_CACHE_TTL, max_size: int = INFO_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(url: str) -> str:
+        """同一支影片的不同網址寫法（youtu.be、shorts、watch?v=）共用快取"""
+        return media_id_from_url(url) or url.strip()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key = self.key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, url: str, info: Dict[str, Any]):
+        key = self.key(url)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+info_cache = InfoCache()
+
+
+def extract_info(url: str) -> Dict[str, Any]:
+    """
+    以共用的 yt-dlp 實例查詢影片資訊（同步，於執行緒池中呼叫）
+
+    結果會放進 info_cache，TTL 內再次查詢或下載同一支影片不會重新解析。
+    返回的 dict 與快取共用，呼叫端不可修改。
+    """
+    cached = info_cache.get(url)
+    if cached is not None:
+        return cached
+
+    ydl = ytdlp_info_pool.acquire()
+    try:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    except Exception:
+        ytdlp_info_pool.release(ydl, broken=True)
+        raise
+    ytdlp_info_pool.release(ydl)
+    info_cache.put(url, info)
+    return info
+
+
+# 查詢時格式選擇與下載的結果（依查詢用實例的預設格式 bestvideo*+bestaudio 產生）
+# process_ie_result 重新選擇單一格式（例如只下載音訊）時不會覆蓋這些鍵，必須先移除
+_SELECTION_KEYS = (
+    'requested_downloads', 'requested_formats', 'requested_subtitles', 'requested_entries',
+    'filepath', '_filename', 'filename',
+)
+
+
+def _clear_format_selection(info: Dict[str, Any]) -> Dict[str, Any]:
+    """移除 info（含播放清單項目）中上一次的格式選擇結果（就地修改）"""
+    for key in _SELECTION_KEYS:
+        info.pop(key, None)
+    for entry in info.get('entries') or []:
+        if isinstance(entry, dict):
+            _clear_format_selection(entry)
+    return info
+
+
+def download_with_info(ydl: yt_dlp.YoutubeDL, url: str) -> Dict[str, Any]:
+    """
+    下載影片；快取中有這個網址的資訊時直接下載，不再重新解析
+
+    先移除查詢時的格式選擇結果（yt-dlp 寫入 info json 時同樣會移除，--load-info-json 因此能重新選擇），
+    再由下載用的 ydl 依自己的格式選項重新選擇格式。
+    """
+    cached = info_cache.get(url)
+    if cached is None:
+        return ydl.extract_info(url, download=True)
+    return ydl.process_ie_result(_clear_format_selection(copy.deepcopy(cached)), download=True)
+
+
+def downloaded_path(ydl: yt_dlp.YoutubeDL, info: Dict[str, Any]) -> str:
+    """下載（含合併 / 轉檔）完成後的實際檔案路徑"""
+    requested = info.get('requested_downloads') or [{}]
+    return requested[-1].get('filepath') or ydl.prepare_filename(info)
 
 
 class YouTubeDownloadService:
@@ -18,21 +150,45 @@ class YouTubeDownloadService:
     def __init__(self):
         self.download_path = Path("./downloads/youtube")
         self.download_path.mkdir(parents=True, exist_ok=True)
-        self.is_running = False
-        self.current_task: Optional[Dict[str, Any]] = None
-        self.queue = []
+        # 進行中的下載 {task_id: 進度}，可同時有多個（由排程器限制數量）
+        self.tasks: Dict[str, Dict[str, Any]] = {}
         self.history = []
 
+    @property
+    def is_running(self) -> bool:
+        return bool(self.tasks)
+
+    @property
+    def current_task(self) -> Optional[Dict[str, Any]]:
+        """最近開始的下載（相容單一任務的前端）"""
+        return next(reversed(self.tasks.values()), None)
+
     def get_status(self) -> Dict[str, Any]:
+        queued = [job for job in scheduler.get_status()["queued"] if job["kind"] == "youtube"]
         return {
             "is_running": self.is_running,
             "current_task": self.current_task,
-            "queue_count": len(self.queue),
+            "tasks": list(self.tasks.values()),
+            "queue_count": len(queued),
             "history_count": len(self.history),
+            "info_cache": dict(info_cache.stats),
         }
 
-    def _progress_hook(self, d: Dict[str, Any]):
-        """下載進度回調"""
+    def enqueue(self, url: str, format_option: str = "best", extract_audio: bool = False) -> Dict[str, Any]:
+        """
+        把下載加入排程器（立即返回，不會因為已有下載進行中而拒絕）
+
+        Returns:
+            排程器的工作資訊 {"id", "position", ...}
+        """
+        return scheduler.submit(
+            url,
+            lambda job: self.download_video(url, format_option, extract_audio, task_id=job["id"]),
+            kind="youtube",
+        )
+
+    def _progress_hook(self, d: Dict[str, Any], task_id: str, bridge: LoopBridge):
+        """下載進度回調（在下載執行緒中被呼叫，推播交回事件迴圈）"""
         if d['status'] == 'downloading':
             percent_str = d.get('_percent_str', '0%').strip()
             try:
@@ -43,7 +199,8 @@ class YouTubeDownloadService:
             speed = d.get('_speed_str', 'N/A')
             eta = d.get('_eta_str', 'N/A')
 
-            self.current_task = {
+            self.tasks[task_id] = {
+                "task_id": task_id,
                 "status": "downloading",
                 "progress": percent,
                 "speed": speed,
@@ -52,74 +209,133 @@ class YouTubeDownloadService:
             }
 
             # 發送 WebSocket 更新
-            asyncio.create_task(manager.broadcast({
+            bridge.broadcast({
                 "type": "yt_progress",
-                "data": self.current_task
-            }))
+                "data": dict(self.tasks[task_id])
+            })
 
         elif d['status'] == 'finished':
-            self.current_task = {
+            self.tasks[task_id] = {
+                "task_id": task_id,
                 "status": "processing",
                 "progress": 100,
                 "message": "正在處理...",
                 "filename": d.get('filename', ''),
             }
-            asyncio.create_task(manager.broadcast({
+            bridge.broadcast({
                 "type": "yt_progress",
-                "data": self.current_task
-            }))
+                "data": dict(self.tasks[task_id])
+            })
 
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
-        """獲取影片資訊"""
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
+    @staticmethod
+    def _summarize_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """把 yt-dlp 的 info dict 整理成 API 回傳的格式（播放清單只列出項目）"""
+        if info.get('_type') == 'playlist':
+            entries = [entry for entry in info.get('entries') or [] if entry]
+            return {
+                "type": "playlist",
+                "id": info.get('id'),
+                "title": info.get('title'),
+                "channel": info.get('channel') or info.get('uploader'),
+                "count": len(entries),
+                "entries": [
+                    {
+                        "id": entry.get('id'),
+                        "title": entry.get('title'),
+                        "url": entry.get('webpage_url') or entry.get('url'),
+                        "duration": entry.get('duration'),
+                    }
+                    for entry in entries
+                ],
+            }
+
+        return {
+            "type": "video",
+            "id": info.get('id'),
+            "title": info.get('title'),
+            "duration": info.get('duration'),
+            "thumbnail": info.get('thumbnail'),
+            "channel": info.get('channel') or info.get('uploader'),
+            "view_count": info.get('view_count'),
+            "formats": [
+                {
+                    "format_id": f.get('format_id'),
+                    "ext": f.get('ext'),
+                    "resolution": f.get('resolution') or f"{f.get('width', '?')}x{f.get('height', '?')}",
+                    "filesize": f.get('filesize') or f.get('filesize_approx'),
+                    "vcodec": f.get('vcodec'),
+                    "acodec": f.get('acodec'),
+                }
+                for f in info.get('formats') or []
+                if f.get('vcodec') != 'none' or f.get('acodec') != 'none'
+            ],
         }
 
+    async def get_video_info(self, url: str) -> Dict[str, Any]:
+        """獲取影片資訊"""
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return {
-                    "id": info.get('id'),
-                    "title": info.get('title'),
-                    "duration": info.get('duration'),
-                    "thumbnail": info.get('thumbnail'),
-                    "channel": info.get('channel') or info.get('uploader'),
-                    "view_count": info.get('view_count'),
-                    "formats": [
-                        {
-                            "format_id": f.get('format_id'),
-                            "ext": f.get('ext'),
-                            "resolution": f.get('resolution') or f"{f.get('width', '?')}x{f.get('height', '?')}",
-                            "filesize": f.get('filesize') or f.get('filesize_approx'),
-                            "vcodec": f.get('vcodec'),
-                            "acodec": f.get('acodec'),
-                        }
-                        for f in info.get('formats', [])
-                        if f.get('vcodec') != 'none' or f.get('acodec') != 'none'
-                    ][-10:],  # 只返回最後 10 個格式
-                }
+            info = await run_blocking(extract_info, url)
+            return self._summarize_info(info)
         except Exception as e:
             return {"error": str(e)}
 
+    async def iter_video_info(self, urls: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        同時查詢多個網址的影片資訊，每個網址查完就立即產出（順序依完成先後）
+
+        同時進行的數量受 INFO_WORKERS 限制；結果會放進 info_cache，之後下載不再重新解析。
+
+        Yields:
+            {"index": 輸入順序, "url": 網址, "info": {...}} 或 {"index", "url", "error"}
+        """
+        semaphore = asyncio.Semaphore(INFO_WORKERS)
+
+        async def fetch(index: int, url: str) -> Dict[str, Any]:
+            async with semaphore:
+                info = await self.get_video_info(url)
+            if "error" in info:
+                return {"index": index, "url": url, "error": info["error"]}
+            return {"index": index, "url": url, "info": info}
+
+        # 重複的網址只查一次（index 為第一次出現的位置）
+        first_index: Dict[str, int] = {}
+        for i, url in enumerate(urls):
+            if url and url.strip():
+                first_index.setdefault(url.strip(), i)
+        tasks = [asyncio.ensure_future(fetch(i, url)) for url, i in first_index.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 用戶端中途斷線：取消還沒開始的查詢
+            for task in tasks:
+                task.cancel()
+
     async def download_video(
         self,
         url: str,
         format_option: str = "best",
         extract_audio: bool = False,
+        task_id: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """下載影片"""
-        if self.is_running:
-            return {"success": False, "message": "已有下載任務進行中"}
-
-        self.is_running = True
+        """
+        下載影片（一般由排程器呼叫，請使用 enqueue 提交）
+
+        Args:
+            url: 影片網址
+            format_option: best, 1080p, 720p, 480p 或 yt-dlp 格式字串
+            extract_audio: 只下載音訊（mp3）
+            task_id: 任務 ID（推播訊息會帶上，讓前端區分同時進行的下載）
+        """
+        task_id = task_id or url
+        self.tasks[task_id] = {"task_id": task_id, "status": "parsing", "progress": 0}
 
         try:
             # 設定下載選項
+            bridge = LoopBridge()
             ydl_opts = {
                 'outtmpl': str(self.download_path / '%(title)s.%(ext)s'),
-                'progress_hooks': [self._progress_hook],
+                'progress_hooks': [lambda d: self._progress_hook(d, task_id, bridge)],
                 'quiet': True,
                 'no_warnings': True,
             }
@@ -148,30 +364,44 @@ class YouTubeDownloadService:
                 # 合併為 mp4
                 ydl_opts['merge_output_format'] = 'mp4'
 
+            # 同一支影片已下載過：直接沿用既有檔案，不連網
+            variant = "audio" if extract_audio else None
+            existing = await run_blocking(reuse_existing, media_id_from_url(url, variant), self.download_path)
+            if existing is not None:
+                return await self._complete_duplicate(url, task_id, existing)
+
             # 廣播開始下載
             await manager.broadcast({
                 "type": "yt_started",
-                "data": {"url": url}
+                "data": {"url": url, "task_id": task_id}
             })
 
-            # 執行下載
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                filename = ydl.prepare_filename(info)
+            # 執行下載（在執行緒池中，不阻塞事件迴圈），完成後登記到下載索引
+            def download():
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = download_with_info(ydl, url)
+                    path = get_download_index().record(downloaded_path(ydl, info), media_id_from_info(info, variant))
+                    return info, str(path)
 
-                # 記錄歷史
-                self.history.insert(0, {
-                    "id": info.get('id'),
-                    "title": info.get('title'),
-                    "filename": os.path.basename(filename),
-                    "url": url,
-                    "status": "completed",
-                })
+            info, filename = await run_blocking(download)
+
+            # 記錄歷史
+            self.history.insert(0, {
+                "id": info.get('id'),
+                "title": info.get('title'),
+                "filename": os.path.basename(filename),
+                "url": url,
+                "status": "completed",
+            })
+
+            # 通知後製管線（只處理這個檔案）
+            event_bus.publish(DOWNLOAD_COMPLETED, {"source": "youtube", "path": filename, "url": url, "duplicate": False})
 
             # 廣播完成
             await manager.broadcast({
                 "type": "yt_completed",
                 "data": {
+                    "task_id": task_id,
                     "title": info.get('title'),
                     "filename": os.path.basename(filename),
                 }
@@ -196,14 +426,28 @@ class YouTubeDownloadService:
             # 廣播錯誤
             await manager.broadcast({
                 "type": "yt_error",
-                "data": {"error": error_msg}
+                "data": {"task_id": task_id, "error": error_msg}
             })
 
             return {"success": False, "error": error_msg}
 
         finally:
-            self.is_running = False
-            self.current_task = None
+            self.tasks.pop(task_id, None)
+
+    async def _complete_duplicate(self, url: str, task_id: str, path: Path) -> Dict[str, Any]:
+        """已下載過的影片：記錄並廣播完成（duplicate 標記為 True）"""
+        self.history.insert(0, {
+            "filename": path.name,
+            "url": url,
+            "status": "completed",
+            "duplicate": True,
+        })
+        event_bus.publish(DOWNLOAD_COMPLETED, {"source": "youtube", "path": str(path), "url": url, "duplicate": True})
+        await manager.broadcast({
+            "type": "yt_completed",
+            "data": {"task_id": task_id, "title": path.stem, "filename": path.name, "duplicate": True}
+        })
+        return {"success": True, "title": path.stem, "filename": path.name, "duplicate": True}
 
     def get_history(self):
         return self.history[:50]
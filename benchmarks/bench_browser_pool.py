@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瀏覽器池效能測試 - 本機靜態頁面模擬 Reels 格狀頁面（benchmarks/fixtures/reels_grid.html）
+
+量測：
+    - 冷啟動：建立 Chrome + 載入頁面
+    - 熱啟動：從瀏覽器池借用已啟動的 Chrome + 載入頁面
+    - 每頁收集時間：條件等待（連結數量變化 / 網路閒置）與舊版固定 sleep（5 秒 + 每次捲動 2 秒）的比較
+
+需要本機安裝 Chrome。
+
+使用方式：
+    python benchmarks/bench_browser_pool.py
+    python benchmarks/bench_browser_pool.py --total 120 --delay 500 --pages 5 --legacy
+"""
+
+import sys
+import time
+import argparse
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from selenium.webdriver.common.by import By
+
+from services.browser_pool import create_chrome, get_browser_pool, wait_for_page_ready
+from services.scraper import InstagramScraper, REEL_LINK_SELECTOR
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(FIXTURES)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_collect(driver, max_reels: int) -> int:
+    """舊版流程：載入後固定等 5 秒，每次捲動固定等 2 秒，連續 3 次沒有新連結才停止"""
+    time.sleep(5)
+    urls, last_count, no_new = set(), 0, 0
+    for _ in range(20):
+        urls.update(a.get_attribute("href") for a in driver.find_elements(By.CSS_SELECTOR, REEL_LINK_SELECTOR))
+        if len(urls) == last_count:
+            no_new += 1
+            if no_new >= 3:
+                break
+        else:
+            no_new, last_count = 0, len(urls)
+        if len(urls) >= max_reels:
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(2)
+    return len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="瀏覽器池效能測試")
+    parser.add_argument("--total", type=int, default=60, help="頁面上的 reel 總數")
+    parser.add_argument("--delay", type=int, default=300, help="每批載入延遲（毫秒）")
+    parser.add_argument("--pages", type=int, default=3, help="熱啟動重複次數")
+    parser.add_argument("--legacy", action="store_true", help="同時量測舊版固定 sleep 流程")
+    args = parser.parse_args()
+
+    server = start_fixture_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/reels_grid.html?total={args.total}&delay={args.delay}"
+    scraper = InstagramScraper()
+
+    def load_and_collect(driver):
+        driver.get(url)
+        wait_for_page_ready(driver, timeout=10, condition=lambda d: d.find_elements(By.CSS_SELECTOR, REEL_LINK_SELECTOR))
+        return len(scraper.collect_reel_urls(driver, max_reels=args.total))
+
+    # 冷啟動
+    start = time.perf_counter()
+    driver = create_chrome(headless=True)
+    launch = time.perf_counter() - start
+    count = load_and_collect(driver)
+    cold = time.perf_counter() - start
+    driver.quit()
+    print(f"冷啟動: 啟動 Chrome {launch:.2f} s，含收集 {cold:.2f} s（{count} 個連結）")
+
+    # 熱啟動
+    pool = get_browser_pool(headless=True)
+    pool.warm(1)
+    timings = []
+    for _ in range(args.pages):
+        start = time.perf_counter()
+        driver = pool.acquire()
+        acquired = time.perf_counter() - start
+        count = load_and_collect(driver)
+        timings.append((acquired, time.perf_counter() - start))
+        pool.release(driver)
+    best = min(t for _, t in timings)
+    print(f"熱啟動: 借用 {min(a for a, _ in timings) * 1000:.1f} ms，每頁最佳 {best:.2f} s，"
+          f"平均 {sum(t for _, t in timings) / len(timings):.2f} s（{count} 個連結）")
+
+    if args.legacy:
+        driver = pool.acquire()
+        start = time.perf_counter()
+        driver.get(url)
+        count = legacy_collect(driver, args.total)
+        print(f"舊版固定 sleep: 每頁 {time.perf_counter() - start:.2f} s（{count} 個連結）")
+        pool.release(driver)
+
+    print(f"瀏覽器池: {pool.get_status()}")
+    pool.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
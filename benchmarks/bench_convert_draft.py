@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+convert_draft 效能測試 - 合成草稿（5000 個文字素材 + 1000 個文字模板）
+
+使用方式：
+    python benchmarks/bench_convert_draft.py
+    python benchmarks/bench_convert_draft.py --texts 20000 --templates 4000
+"""
+
+import sys
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from JYpymaker.converter import convert_draft, get_converter
+
+
+def build_synthetic_script(text_count: int, template_count: int, refs_per_template: int = 3):
+    """建立只含 imported_materials 的合成草稿（convert_draft 只用到這部分）"""
+    texts = []
+    for i in range(text_count):
+        content = {
+            "text": f"这是第{i}条简体字幕，用于测试转换速度",
+            "styles": [{"fill": {"content": {"solid": {"color": [1, 1, 1]}}}, "range": [0, 20], "size": 8}],
+        }
+        texts.append({"id": str(uuid.uuid4()), "content": json.dumps(content, ensure_ascii=False)})
+
+    templates = []
+    for i in range(template_count):
+        resources = [
+            {"text_material_id": texts[(i * refs_per_template + j) % text_count]["id"]}
+            for j in range(refs_per_template)
+        ]
+        templates.append({"id": str(uuid.uuid4()), "text_info_resources": resources})
+
+    return SimpleNamespace(imported_materials={"texts": texts, "text_templates": templates})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="convert_draft 效能測試")
+    parser.add_argument("--texts", type=int, default=5000, help="文字素材數量")
+    parser.add_argument("--templates", type=int, default=1000, help="文字模板數量")
+    parser.add_argument("--mode", default="s2tw", help="轉換模式")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數（取最佳）")
+    args = parser.parse_args()
+
+    # 先建立轉換器，避免把字典載入時間算進去
+    get_converter(args.mode)
+
+    timings = []
+    for _ in range(args.repeat):
+        script = build_synthetic_script(args.texts, args.templates)
+        start = time.perf_counter()
+        count = convert_draft(script, mode=args.mode)
+        timings.append(time.perf_counter() - start)
+
+    print(f"文字素材: {args.texts}, 文字模板: {args.templates}, 轉換: {count} 個")
+    print(f"convert_draft 最佳: {min(timings) * 1000:.1f} ms, 平均: {sum(timings) / len(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下載排程器吞吐量測試 - 本機 HTTP 伺服器提供固定大小的檔案
+
+伺服器每個請求先等待 --latency 秒（模擬解析與連線延遲）再回傳 --size 位元組，
+同時以 127.0.0.1 與 localhost 兩個主機名稱提交工作，用來觀察每個主機的同時下載上限。
+
+使用方式：
+    python benchmarks/bench_download_scheduler.py
+    python benchmarks/bench_download_scheduler.py --jobs 60 --workers 1 4 8 --host-limit 3
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.scheduler import DownloadScheduler
+
+
+def start_stub_server(size: int, latency: float) -> ThreadingHTTPServer:
+    payload = b"\0" * size
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(url: str) -> int:
+    with urllib.request.urlopen(url) as response:
+        return len(response.read())
+
+
+async def run_once(port: int, jobs: int, workers: int, host_limit: int):
+    """返回 (秒數, 下載位元組數, 每個主機觀察到的最大同時下載數, 失敗數)"""
+    scheduler = DownloadScheduler(workers=workers, host_limits={}, default_host_limit=host_limit)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+
+    total_bytes = 0
+    active = {}
+    peak = {}
+
+    async def handler(job):
+        nonlocal total_bytes
+        host = job["host"]
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        try:
+            size = await loop.run_in_executor(pool, fetch, job["url"])
+            total_bytes += size
+        finally:
+            active[host] -= 1
+
+    hosts = ["127.0.0.1", "localhost"]
+    start = time.perf_counter()
+    scheduler.start()
+    submitted = [
+        scheduler.submit(f"http://{hosts[i % len(hosts)]}:{port}/file/{i}", handler)
+        for i in range(jobs)
+    ]
+    while scheduler.stats["completed_count"] + scheduler.stats["failed_count"] < len(submitted):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    await scheduler.stop()
+    pool.shutdown()
+    return elapsed, total_bytes, peak, scheduler.stats["failed_count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下載排程器吞吐量測試")
+    parser.add_argument("--jobs", type=int, default=40, help="下載數量")
+    parser.add_argument("--size", type=int, default=2 * 1024 * 1024, help="每個檔案大小（位元組）")
+    parser.add_argument("--latency", type=float, default=0.2, help="每個請求的模擬延遲（秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="要測試的工作者數量")
+    parser.add_argument("--host-limit", type=int, default=3, help="每個主機的同時下載上限")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.size, args.latency)
+    port = server.server_address[1]
+
+    print(f"下載: {args.jobs} 個 x {args.size / 1024 / 1024:.1f} MB，延遲 {args.latency}s，"
+          f"每個主機上限 {args.host_limit}")
+    for workers in args.workers:
+        elapsed, total_bytes, peak, failed = asyncio.run(run_once(port, args.jobs, workers, args.host_limit))
+        print(f"workers={workers:<3} {elapsed:6.2f} s  {args.jobs / elapsed:6.1f} 個/s  "
+              f"{total_bytes / elapsed / 1024 / 1024:7.1f} MB/s  最大同時: {peak}  失敗: {failed}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket 廣播測試 - 模擬快、慢、卡住的連線
+
+模擬 yt-dlp 進度回調：--tasks 個任務各自高頻率推播進度，穿插一般訊息（開始 / 完成），
+觀察：
+    - 廣播呼叫端是否被慢的連線拖住（broadcast 平均耗時）
+    - 快的連線是否即時收到最新進度、每個任務最後一則進度是否正確
+    - 慢的連線收到的進度是否被合併（訊息數遠少於送出數，但一般訊息一則不漏）
+    - 卡住的連線是否在積壓過多後被中斷
+
+使用方式：
+    python benchmarks/bench_ws_broadcast.py
+    python benchmarks/bench_ws_broadcast.py --other-every 20   # 一般訊息更多，慢連線也會積壓過多而被中斷
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from api.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """模擬連線：每次送出等待 delay 秒；delay 為 None 表示永遠卡住"""
+
+    def __init__(self, name: str, delay):
+        self.name = name
+        self.delay = delay
+        self.received = []
+        self.closed_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.delay is None:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(json.loads(payload))
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+
+def summarize(ws: FakeWebSocket, tasks: int):
+    progress = [m for m in ws.received if m["type"] == "yt_progress"]
+    others = [m for m in ws.received if m["type"] != "yt_progress"]
+    last = {}
+    for m in progress:
+        last[m["data"]["task_id"]] = m["data"]["progress"]
+    return len(progress), len(others), last
+
+
+async def run(args):
+    manager = ConnectionManager()
+    clients = [FakeWebSocket("fast", 0), FakeWebSocket("slow", args.slow_delay), FakeWebSocket("stuck", None)]
+    for ws in clients:
+        await manager.connect(ws)
+
+    sent_other = 0
+    start = time.perf_counter()
+    for i in range(args.messages):
+        task_id = f"youtube-{i % args.tasks}"
+        await manager.broadcast({
+            "type": "yt_progress",
+            "data": {"task_id": task_id, "progress": i // args.tasks},
+        })
+        if i % args.other_every == 0:
+            await manager.broadcast({"type": "yt_started", "data": {"task_id": task_id, "n": i}})
+            sent_other += 1
+        # 模擬進度回調的間隔，讓送出工作有機會執行
+        if i % 10 == 0:
+            await asyncio.sleep(0)
+    broadcast_time = time.perf_counter() - start
+
+    # 等待快、慢連線送完
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        channels = [manager._channels.get(ws) for ws in clients[:2]]
+        if all(c is None or not c.pending for c in channels):
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(args.slow_delay * 2)
+
+    expected_last = {f"youtube-{t}": (args.messages - 1 - ((args.messages - 1 - t) % args.tasks)) // args.tasks
+                     for t in range(args.tasks)}
+
+    print(f"廣播 {args.messages} 則進度 + {sent_other} 則一般訊息，共 {broadcast_time * 1000:.1f} ms "
+          f"（平均 {broadcast_time / (args.messages + sent_other) * 1e6:.1f} µs / 則）")
+    for ws in clients:
+        progress_count, other_count, last = summarize(ws, args.tasks)
+        status = "已中斷" if ws.closed_code else "連線中"
+        correct = "正確" if last == expected_last else "不完整"
+        print(f"  {ws.name:<6} 進度 {progress_count:>6} 則  一般訊息 {other_count:>4}/{sent_other}  "
+              f"最後進度{correct}  {status}{f' (code {ws.closed_code})' if ws.closed_code else ''}")
+    print(f"  合併: {manager.stats['coalesced']} 則，中斷連線: {manager.stats['dropped_clients']} 個")
+
+    for ws in list(manager.active_connections):
+        manager.disconnect(ws)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 廣播測試")
+    parser.add_argument("--messages", type=int, default=20000, help="進度訊息數量")
+    parser.add_argument("--tasks", type=int, default=4, help="同時進行的任務數")
+    parser.add_argument("--other-every", type=int, default=100, help="每幾則進度穿插一則一般訊息")
+    parser.add_argument("--slow-delay", type=float, default=0.02, help="慢連線每則訊息的送出時間（秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
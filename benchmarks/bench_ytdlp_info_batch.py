@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+影片資訊批次查詢測試 - 本機 HTTP 伺服器 + yt-dlp 通用擷取器（generic）
+
+伺服器提供 --videos 個 mp4 檔案（每個請求先等待 --latency 秒模擬網路延遲），
+以及一個內含所有影片的 HTML 頁面（通用擷取器會視為播放清單），比較：
+    - 逐一查詢 vs 批次查詢（同時 INFO_WORKERS 個，結果依完成先後串流產出）
+    - 快取命中時的查詢時間
+    - 查詢後下載是否重新解析（比較伺服器收到的請求數）
+
+使用方式：
+    python benchmarks/bench_ytdlp_info_batch.py
+    python benchmarks/bench_ytdlp_info_batch.py --videos 24 --latency 0.3
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import yt_dlp
+
+from services.youtube_downloader import (
+    INFO_WORKERS, download_with_info, info_cache, youtube_service, ytdlp_info_pool
+)
+
+
+def start_stub_server(videos: int, latency: float, size: int):
+    payload = b"\0" * size
+    counter = {"requests": 0}
+    lock = threading.Lock()
+    page = "<html><head><title>stub playlist</title></head><body>" + "".join(
+        f'<video src="/video{i}.mp4"></video>' for i in range(videos)
+    ) + "</body></html>"
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, send_body: bool):
+            with lock:
+                counter["requests"] += 1
+            time.sleep(latency)
+            if self.path.startswith("/playlist"):
+                body, content_type = page.encode("utf-8"), "text/html; charset=utf-8"
+            elif self.path.startswith("/video"):
+                body, content_type = payload, "video/mp4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(True)
+
+        def do_HEAD(self):
+            self._respond(False)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+
+async def run(args):
+    server, counter = start_stub_server(args.videos, args.latency, args.size)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/video{i}.mp4" for i in range(args.videos)]
+
+    # 先建立好 yt-dlp 實例（每個約 0.2 秒，實際執行時只在第一次查詢時建立）
+    start = time.perf_counter()
+    await asyncio.to_thread(ytdlp_info_pool.warm, INFO_WORKERS)
+    warmup = time.perf_counter() - start
+
+    # 逐一查詢（原本前端的用法）
+    info_cache.clear()
+    start = time.perf_counter()
+    for url in urls:
+        info = await youtube_service.get_video_info(url)
+        assert "error" not in info, info
+    serial = time.perf_counter() - start
+
+    # 批次查詢，記錄第一筆結果的時間
+    info_cache.clear()
+    start = time.perf_counter()
+    first = None
+    results = []
+    async for result in youtube_service.iter_video_info(urls + [f"{base}/playlist.html"]):
+        first = first or time.perf_counter() - start
+        results.append(result)
+    batch = time.perf_counter() - start
+    errors = [r for r in results if "error" in r]
+    playlist = next(r for r in results if r["url"].endswith("playlist.html"))
+
+    # 快取命中
+    start = time.perf_counter()
+    async for _ in youtube_service.iter_video_info(urls):
+        pass
+    cached = time.perf_counter() - start
+
+    print(f"{args.videos} 個網址（延遲 {args.latency}s，同時 {INFO_WORKERS} 個，建立 yt-dlp 實例 {warmup:.2f} s）")
+    print(f"  逐一查詢   {serial:6.2f} s")
+    print(f"  批次查詢   {batch:6.2f} s（含播放清單，第一筆 {first:.2f} s 送出，失敗 {len(errors)}）")
+    print(f"  快取命中   {cached * 1000:6.1f} ms  命中 {info_cache.stats['hits']} 次")
+    print(f"  播放清單   {playlist.get('info', {}).get('type')}，{playlist.get('info', {}).get('count')} 個項目（未逐一解析）")
+
+    # 查詢後下載：比較伺服器收到的請求數
+    with tempfile.TemporaryDirectory() as tmp:
+        opts = {
+            "quiet": True, "no_warnings": True, "noprogress": True,
+            "outtmpl": str(Path(tmp) / "%(id)s_%(autonumber)s.%(ext)s"),
+        }
+
+        def download(url):
+            before = counter["requests"]
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                download_with_info(ydl, url)
+            return counter["requests"] - before
+
+        info_cache.clear()
+        cold = await asyncio.to_thread(download, urls[0])
+        await youtube_service.get_video_info(urls[1])
+        warm = await asyncio.to_thread(download, urls[1])
+        print(f"  下載請求數 沒有快取 {cold} 次，查詢後下載 {warm} 次")
+
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="影片資訊批次查詢測試")
+    parser.add_argument("--videos", type=int, default=12, help="影片數量")
+    parser.add_argument("--latency", type=float, default=0.2, help="每個請求的延遲（秒）")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="每個影片的大小（位元組）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,6 @@ import os
 import json
 import shutil
 import getpass
-import glob
 from typing import Dict, List, Tuple
 import pyJianYingDraft as draft
 from pyJianYingDraft import trange
@@ -17,6 +16,7 @@ import copy  # 添加deepcopy支援
 from datetime import datetime  # 添加時間戳支援
 import uuid  # 添加UUID支援用於生成唯一ID
 from pathlib import Path
+from utils.fs_scan import scan_dir
 
 # 禁用所有debug日誌用於生產環境
 DEBUG_MODE = False
@@ -815,25 +815,12 @@ class TemplateVideoReplacer:
                 if os.path.isdir(item_path):
                     existing_drafts.add(item)
 
-        # 尋找影片文件 - 修復重複掃描問題
-        video_extensions = ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.wmv', '*.flv']
-        all_video_files = []
+        # 尋找影片文件：單次 os.scandir 依副檔名過濾（不分大小寫，不會重複）
+        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'}
+        _, entries = scan_dir(video_folder, extensions=video_extensions)
+        all_video_files = [entry["path"] for entry in entries]
 
-        # 🔧 修復：使用 set 去重，避免在 Windows 上重複掃描相同文件
-        found_files = set()
-        
-        for ext in video_extensions:
-            # 只掃描小寫擴展名，因為 glob 在 Windows 上會自動匹配大小寫
-            pattern_files = glob.glob(os.path.join(video_folder, ext))
-            
-            for file_path in pattern_files:
-                # 使用標準化路徑作為唯一標識符
-                normalized_path = os.path.normpath(file_path)
-                if normalized_path not in found_files:
-                    found_files.add(normalized_path)
-                    all_video_files.append(file_path)
-        
-        print(f"✅ [修復] 掃描完成，去重後找到 {len(all_video_files)} 個影片文件")
+        print(f"✅ 掃描完成，找到 {len(all_video_files)} 個影片文件")
 
         # 過濾掉模板占位影片和非影片文件（如圖片）
         skipped_template_files = []
@@ -0,0 +1,15 @@
+"""
+測試共用設定
+
+專案沒有安裝成套件：根目錄（JYpymaker、utils、translate_video）與 backend/（後端以此為工作目錄）
+都需要加入 sys.path。
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+for path in (PROJECT_ROOT, PROJECT_ROOT / "backend"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,68 @@
+"""
+草稿批次轉換任務（JYpymaker/convert_jobs.py）
+
+子進程異常結束（BrokenProcessPool）後，之後的任務改用新的進程池，而不是全部失敗。
+"""
+
+import os
+import multiprocessing
+import threading
+
+import pytest
+
+from JYpymaker import convert_jobs
+from JYpymaker.convert_jobs import ConvertJobManager
+
+pytestmark = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="子進程需繼承測試中替換的 _convert_worker（fork）",
+)
+
+
+def crashing_worker(path, mode, last_hash):
+    os._exit(1)
+
+
+def wait_results(job):
+    for event, data in job.iter_events(keepalive=0.5):
+        if event == "done":
+            return job.to_dict()["results"]
+
+
+def test_replaces_broken_process_pool(tmp_path, monkeypatch):
+    manager = ConvertJobManager(max_workers=1, state_file=tmp_path / "state.json")
+    missing = str(tmp_path / "missing" / "draft_content.json")
+
+    monkeypatch.setattr(convert_jobs, "_convert_worker", crashing_worker)
+    results = wait_results(manager.submit([missing], "s2tw"))
+    assert results[0]["success"] is False
+    broken = manager._executor
+    assert broken is None or broken._broken
+
+    monkeypatch.undo()
+    results = wait_results(manager.submit([missing], "s2tw"))
+    # 新的進程池正常執行 _convert_worker：找不到檔案的一般錯誤，而不是 BrokenProcessPool
+    assert results[0]["success"] is False
+    assert "No such file" in results[0]["error"]
+
+
+def test_concurrent_submits_share_one_pool(tmp_path):
+    manager = ConvertJobManager(max_workers=1, state_file=tmp_path / "state.json")
+    missing = str(tmp_path / "missing" / "draft_content.json")
+    executors = []
+    barrier = threading.Barrier(8)
+
+    def submit():
+        barrier.wait()
+        job = manager.submit([missing], "s2tw")
+        executors.append(manager._executor)
+        wait_results(job)
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(executor) for executor in executors}) == 1
+    manager._executor.shutdown()
@@ -0,0 +1,88 @@
+"""
+重複下載偵測（backend/services/dedup.py）
+
+媒體 ID 由網址判斷（不連網）；內容指紋相同的檔案只有在完整內容也相同、
+且索引中的既有檔案沒有變更時，才會換成硬連結。
+"""
+
+import os
+
+import pytest
+
+from services import dedup
+from services.dedup import DownloadIndex, media_id_from_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.instagram.com/reel/Cabc123/", "instagram:Cabc123"),
+    ("https://www.instagram.com/reels/Cabc123/?igsh=abc", "instagram:Cabc123"),
+    ("https://instagram.com/p/Cabc123/", "instagram:Cabc123"),
+    ("https://youtu.be/dQw4w9WgXcQ?t=3", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ"),
+    ("https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=10s", "youtube:dQw4w9WgXcQ"),
+    ("https://www.instagram.com/someuser/", None),
+    ("https://example.com/video.mp4", None),
+])
+def test_media_id_from_url(url, expected):
+    assert media_id_from_url(url) == expected
+
+
+def test_media_id_variant():
+    assert media_id_from_url("https://youtu.be/dQw4w9WgXcQ", "audio") == "youtube:dQw4w9WgXcQ#audio"
+
+
+def write(path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_identical_download_becomes_hard_link(tmp_path):
+    index = DownloadIndex(index_file=None)
+    data = os.urandom(300 * 1024)
+    first = index.record(write(tmp_path / "a" / "first.mp4", data), "youtube:one")
+    second = index.record(write(tmp_path / "b" / "second.mp4", data), "youtube:two")
+
+    assert second == tmp_path / "b" / "second.mp4"
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == data
+    assert index.find("youtube:two") == second
+
+
+def test_link_into_reuses_existing_file(tmp_path):
+    index = DownloadIndex(index_file=None)
+    source = index.record(write(tmp_path / "a" / "reel.mp4", b"reel" * 1000), "instagram:Cabc123")
+
+    linked = index.link_into(index.find("instagram:Cabc123"), tmp_path / "b")
+    assert linked == tmp_path / "b" / "reel.mp4"
+    assert os.path.samefile(source, linked)
+
+
+def test_fingerprint_collision_keeps_new_download(tmp_path, monkeypatch):
+    # 部分雜湊相同但內容不同（例如只有中間沒取樣的部分不同）
+    monkeypatch.setattr(dedup, "content_fingerprint", lambda path, size=None: "same")
+    index = DownloadIndex(index_file=None)
+    first = index.record(write(tmp_path / "a" / "first.mp4", b"x" * 4096))
+    second = index.record(write(tmp_path / "b" / "second.mp4", b"y" * 4096))
+
+    assert not os.path.samefile(first, second)
+    assert second.read_bytes() == b"y" * 4096
+
+
+def test_changed_indexed_file_is_not_linked(tmp_path):
+    index = DownloadIndex(index_file=None)
+    data = b"original" * 1000
+    first = index.record(write(tmp_path / "a" / "first.mp4", data))
+
+    # 登記之後既有檔案被改寫（大小相同），索引中的指紋已經過期
+    first.write_bytes(b"modified" * 1000)
+    stat = first.stat()
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    second = index.record(write(tmp_path / "b" / "second.mp4", data))
+    assert not os.path.samefile(first, second)
+    assert second.read_bytes() == data
+    # 之後內容相同的下載改為連結到這個新檔案
+    third = index.record(write(tmp_path / "c" / "third.mp4", data))
+    assert os.path.samefile(second, third)
@@ -0,0 +1,109 @@
+"""
+下載進行中時，/api/download/status 仍需即時回應
+
+模擬一個 30 秒的下載（Selenium 的 driver.get 阻塞 30 秒），下載期間反覆查詢狀態，
+每次都必須在 50 ms 內回應：阻塞的瀏覽器操作都在執行緒池中執行，事件迴圈不會被卡住。
+"""
+
+import json
+import time
+import asyncio
+import threading
+
+import pytest
+
+DOWNLOAD_SECONDS = 30.0
+MAX_LATENCY = 0.05
+POLLS = 40
+
+
+async def asgi_get(app, path: str):
+    """直接呼叫 ASGI 應用程式（不經過網路），返回 (狀態碼, JSON)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 12345), "server": ("127.0.0.1", 8000),
+    }
+    received = False
+    messages = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return status, json.loads(body)
+
+
+class SlowDriver:
+    """打開下載連結時阻塞，模擬瀏覽器下載一個大檔案"""
+
+    def __init__(self, release: threading.Event):
+        self.release = release
+        self.downloading = threading.Event()
+
+    def get(self, url: str):
+        if url.startswith("https://cdn.example.com/"):
+            self.downloading.set()
+            self.release.wait(DOWNLOAD_SECONDS)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    # 資料庫（sqlite:///./reelpull.db）建立在暫存目錄
+    monkeypatch.chdir(tmp_path)
+    import main
+    from models import init_db
+
+    init_db()
+    return main
+
+
+def test_status_stays_responsive_during_download(backend, monkeypatch):
+    from models import Download
+    from services.downloader import download_service
+
+    release = threading.Event()
+    driver = SlowDriver(release)
+    monkeypatch.setattr(download_service, "_download_path", ".")
+    monkeypatch.setattr(download_service, "_page_fill_url", lambda driver, url: time.sleep(0.2))
+    monkeypatch.setattr(download_service, "_page_resolve", lambda driver: "https://cdn.example.com/reel.mp4")
+    monkeypatch.setattr(download_service, "_wait_download_started", lambda before: None)
+
+    async def scenario():
+        # 先查一次（第一次請求包含建立資料庫連線等一次性開銷）
+        await asgi_get(backend.app, "/api/download/status")
+
+        download = Download(id="status-test", url="https://www.instagram.com/reel/Cabc123/")
+        task = asyncio.create_task(download_service._process_download(download, driver))
+
+        latencies = []
+        try:
+            # 下載期間（driver.get 阻塞中）反覆查詢狀態
+            while not driver.downloading.is_set():
+                await asyncio.sleep(0.01)
+            for _ in range(POLLS):
+                start = time.perf_counter()
+                status, data = await asgi_get(backend.app, "/api/download/status")
+                latencies.append(time.perf_counter() - start)
+                assert status == 200
+                assert data["current_task"]["id"] == "status-test"
+                assert data["current_task"]["progress"] == 80
+                await asyncio.sleep(0.02)
+            assert not task.done()
+        finally:
+            release.set()
+        assert await task
+        return latencies
+
+    latencies = asyncio.run(scenario())
+    assert max(latencies) < MAX_LATENCY, f"最慢 {max(latencies) * 1000:.1f} ms"
@@ -0,0 +1,102 @@
+"""
+自動後製管線（backend/services/pipeline.py）
+
+發布 DOWNLOAD_COMPLETED 後，設定的步驟對該檔案只執行一次；
+讀取設定失敗（例如資料庫被鎖定）時記為失敗，工作者繼續處理之後的檔案。
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+
+class RecordingStep:
+    """替代真正的後製步驟：只記錄處理過的檔案"""
+
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.warm = True
+
+    def run(self, video_path):
+        with self.lock:
+            self.calls.append(str(video_path))
+        return {"draft": video_path.stem}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from services import pipeline as pipeline_module
+
+    RecordingStep.calls = []
+    monkeypatch.setattr(pipeline_module, "FILE_READY_POLL", 0.01)
+    monkeypatch.setitem(pipeline_module.STEP_TYPES, "record", RecordingStep)
+    return pipeline_module
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "等待逾時"
+        await asyncio.sleep(0.01)
+
+
+def test_runs_step_once_per_completed_download(pipeline, tmp_path, monkeypatch):
+    from services.events import DOWNLOAD_COMPLETED, event_bus
+
+    video = tmp_path / "reel.mp4"
+    video.write_bytes(b"\0" * 1024)
+    runner = pipeline.PipelineRunner(workers=1)
+    monkeypatch.setattr(runner, "_steps_for", lambda source: ["record"])
+
+    async def scenario():
+        runner.start()
+        try:
+            payload = {"source": "instagram", "path": str(video), "url": "https://www.instagram.com/reel/Cabc/"}
+            # 同一檔案的重複完成事件只處理一次
+            event_bus.publish(DOWNLOAD_COMPLETED, payload)
+            event_bus.publish(DOWNLOAD_COMPLETED, payload)
+            await wait_until(lambda: runner.stats["completed"] == 1)
+            await asyncio.sleep(0.1)
+        finally:
+            await runner.stop()
+
+    asyncio.run(scenario())
+    assert RecordingStep.calls == [str(video)]
+    assert runner.stats == {"completed": 1, "failed": 0}
+
+
+def test_worker_survives_settings_error(pipeline, tmp_path, monkeypatch):
+    import sqlite3
+    from services.events import DOWNLOAD_COMPLETED, event_bus
+
+    locked, video = tmp_path / "locked.mp4", tmp_path / "ok.mp4"
+    for path in (locked, video):
+        path.write_bytes(b"\0" * 1024)
+    runner = pipeline.PipelineRunner(workers=1)
+    errors = iter([sqlite3.OperationalError("database is locked")])
+
+    def steps_for(source):
+        error = next(errors, None)
+        if error is not None:
+            raise error
+        return ["record"]
+
+    monkeypatch.setattr(runner, "_steps_for", steps_for)
+
+    async def scenario():
+        runner.start()
+        try:
+            event_bus.publish(DOWNLOAD_COMPLETED, {"source": "youtube", "path": str(locked)})
+            event_bus.publish(DOWNLOAD_COMPLETED, {"source": "youtube", "path": str(video)})
+            await wait_until(lambda: runner.stats["completed"] == 1)
+        finally:
+            await runner.stop()
+
+    asyncio.run(scenario())
+    assert RecordingStep.calls == [str(video)]
+    assert runner.stats == {"completed": 1, "failed": 1}
+    assert runner.get_status()["recent"][-1]["error"] == "database is locked"
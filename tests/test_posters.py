@@ -0,0 +1,68 @@
+"""
+影片封面縮圖快取（utils/posters.py）
+
+同一支影片同時被請求時只執行一次 ffmpeg；擷取失敗會被記住，影片變更後才重試。
+"""
+
+import os
+import threading
+import time
+
+from utils import posters
+from utils.posters import PosterCache
+
+
+def counting_extractor(calls, succeed=True, delay=0.0):
+    def extract(video_path, output_path, seek, width):
+        calls.append((str(output_path), seek))
+        time.sleep(delay)
+        if succeed:
+            output_path.write_bytes(b"jpeg")
+        return succeed
+    return extract
+
+
+def test_concurrent_requests_extract_once(tmp_path, monkeypatch):
+    video = tmp_path / "talk.mp4"
+    video.write_bytes(b"\0")
+    calls = []
+    monkeypatch.setattr(posters, "_extract_frame", counting_extractor(calls, delay=0.05))
+    cache = PosterCache(tmp_path / "posters")
+    results = []
+    barrier = threading.Barrier(8)
+
+    def request():
+        barrier.wait()
+        results.append(cache.get(video))
+
+    # 分兩波：第一波產生完成後第二波才開始，仍應命中快取
+    for _ in range(2):
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(calls) == 1
+    assert len(set(results)) == 1 and results[0].read_bytes() == b"jpeg"
+    assert [p.name for p in (tmp_path / "posters").iterdir()] == [results[0].name]
+
+
+def test_failure_is_cached_until_video_changes(tmp_path, monkeypatch):
+    video = tmp_path / "broken.mp4"
+    video.write_bytes(b"\0")
+    calls = []
+    monkeypatch.setattr(posters, "_extract_frame", counting_extractor(calls, succeed=False))
+    cache = PosterCache(tmp_path / "posters")
+
+    assert cache.get(video) is None
+    assert [seek for _, seek in calls] == [posters.POSTER_SEEK, 0]
+    assert cache.get(video) is None
+    assert len(calls) == 2
+
+    # 影片被替換（修改時間改變）後重新嘗試
+    stat = video.stat()
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(video) is None
+    assert len(calls) == 4
+
@@ -0,0 +1,121 @@
+"""
+翻譯後重新計時（JYpymaker/retimer.py）
+
+原文使用 fixtures/word_timings/ 的字級時間戳，譯文由假翻譯產生（不連網）：
+每個英文字換成長度相近的中文字，標點換成全形標點。
+"""
+
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from JYpymaker.retimer import retime_translated
+from JYpymaker.segmenter import segment_transcript
+from JYpymaker.transcript_cache import _unpack_segments
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "word_timings"
+
+MAX_CHARS = 12
+MAX_CPS = 9.0
+MIN_DURATION = 0.8
+
+_PUNCTUATION = {".": "。", ",": "，", "?": "？", "!": "！"}
+
+
+def stub_translate(text: str) -> str:
+    """假翻譯：英文字 → 約 1/3 長度的中文字，保留句讀位置"""
+    output = []
+    for word in text.split():
+        core = word.rstrip(".,?!")
+        output.append("詞" * max(1, math.ceil(len(core) / 3)))
+        output.append(_PUNCTUATION.get(word[len(core):len(core) + 1], ""))
+    return "".join(output)
+
+
+def translated_cues(name: str, source_max_chars: int = 60):
+    with open(FIXTURE_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+        segments = _unpack_segments(json.load(f)["segments"])
+    cues = segment_transcript(segments, max_chars=source_max_chars)
+    return [{**cue, "original": cue["text"], "text": stub_translate(cue["text"])} for cue in cues]
+
+
+def retime(cues):
+    return retime_translated(cues, max_chars=MAX_CHARS, max_cps=MAX_CPS, min_duration=MIN_DURATION)
+
+
+def word_edges(cue):
+    """原文可切的字邊界：相鄰兩字之間停頓的中點"""
+    words = cue["words"]
+    return [(a["end"] + b["start"]) / 2 for a, b in zip(words, words[1:])]
+
+
+def group_by_original(source, retimed):
+    """依原文把重新計時後的字幕分組（每條原文切出的字幕相鄰）"""
+    groups, position = [], 0
+    for cue in source:
+        group = []
+        while position < len(retimed) and retimed[position]["original"] == cue["original"] \
+                and "".join(c["text"] for c in group) != cue["text"]:
+            group.append(retimed[position])
+            position += 1
+        groups.append(group)
+    assert position == len(retimed)
+    return groups
+
+
+def test_keeps_text_and_respects_max_chars():
+    source = translated_cues("en_talk")
+    retimed = retime(source)
+
+    assert len(retimed) > len(source)
+    for cue, group in zip(source, group_by_original(source, retimed)):
+        assert "".join(c["text"] for c in group) == cue["text"]
+        assert all(len(c["text"]) <= MAX_CHARS for c in group)
+
+
+def test_boundaries_snap_to_source_word_edges():
+    source = translated_cues("en_talk")
+    retimed = retime(source)
+
+    split_count = 0
+    for cue, group in zip(source, group_by_original(source, retimed)):
+        assert group[0]["start"] == cue["start"]
+        edges = word_edges(cue)
+        for left, right in zip(group, group[1:]):
+            assert left["end"] == right["start"]
+            assert any(abs(right["start"] - edge) < 1e-9 for edge in edges), right["text"]
+            split_count += 1
+    assert split_count > 0
+
+
+def test_reading_speed_and_min_duration():
+    source = translated_cues("en_talk")
+    retimed = retime(source)
+
+    for cue, following in zip(retimed, retimed[1:] + [None]):
+        need = max(len(cue["text"]) / MAX_CPS, MIN_DURATION)
+        # 顯示時間足夠，或已延長到下一條字幕開始
+        assert cue["end"] - cue["start"] >= need - 1e-9 or (following and cue["end"] == following["start"])
+        if following:
+            assert cue["end"] <= following["start"] + 1e-9
+
+
+def test_prefers_punctuation_over_even_split():
+    cue = {
+        "start": 0.0, "end": 4.0, "original": "…",
+        "text": "今天天氣很好，我們一起出去走走吧",
+        "words": [{"word": f" w{i}", "start": i * 0.25, "end": i * 0.25 + 0.2} for i in range(16)],
+    }
+    assert [c["text"] for c in retime([cue])] == ["今天天氣很好，", "我們一起出去走走吧"]
+
+
+@pytest.mark.parametrize("name", ["no_words", "zh_en_mixed"])
+def test_other_fixtures(name):
+    source = translated_cues(name)
+    retimed = retime(source)
+
+    assert "".join(c["text"] for c in retimed) == "".join(c["text"] for c in source)
+    assert all(c["start"] < c["end"] for c in retimed)
+    assert all(a["end"] <= b["start"] + 1e-9 for a, b in zip(retimed, retimed[1:]))
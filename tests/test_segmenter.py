@@ -0,0 +1,87 @@
+"""
+字幕分段引擎（JYpymaker/segmenter.py）黃金測試
+
+fixtures/word_timings/ 為語音辨識快取格式的逐字稿（cache/transcripts/*.json.gz 解壓縮後即可放入），
+golden/segmenter/ 為對應的預期分段 [開始秒, 結束秒, 文字]。
+
+調整分段參數後重新產生預期結果：
+    UPDATE_GOLDEN=1 python -m pytest tests/test_segmenter.py
+"""
+
+import os
+import json
+from pathlib import Path
+
+import pytest
+
+from JYpymaker.segmenter import STRONG_PUNCTUATION, segment_transcript, words_from_segments
+from JYpymaker.transcript_cache import _unpack_segments
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "word_timings"
+GOLDEN_DIR = Path(__file__).parent / "golden" / "segmenter"
+FIXTURES = sorted(path.stem for path in FIXTURE_DIR.glob("*.json"))
+
+MAX_CHARS = 25
+
+
+def load_segments(name: str):
+    with open(FIXTURE_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+        return _unpack_segments(json.load(f)["segments"])
+
+
+def summarize(cues):
+    return [[round(cue["start"], 3), round(cue["end"], 3), cue["text"]] for cue in cues]
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_matches_golden(name):
+    cues = summarize(segment_transcript(load_segments(name), max_chars=MAX_CHARS))
+    golden_path = GOLDEN_DIR / f"{name}.json"
+
+    if os.environ.get("UPDATE_GOLDEN"):
+        golden_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ",\n  ".join(json.dumps(cue, ensure_ascii=False) for cue in cues)
+        golden_path.write_text(f"[\n  {lines}\n]\n", encoding="utf-8")
+
+    with open(golden_path, "r", encoding="utf-8") as f:
+        assert cues == json.load(f)
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_keeps_every_word_in_order(name):
+    segments = load_segments(name)
+    words = words_from_segments(segments)
+    cues = segment_transcript(segments, max_chars=MAX_CHARS)
+
+    assert [w["word"] for cue in cues for w in cue["words"]] == [w["word"] for w in words]
+    for cue in cues:
+        assert len(cue["words"]) == 1 or len(cue["text"]) <= MAX_CHARS
+        assert cue["start"] < cue["end"]
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_breaks_after_sentence_final_segments(name):
+    segments = load_segments(name)
+    cues = segment_transcript(segments, max_chars=MAX_CHARS)
+    cue_ends = {cue["words"][-1]["end"] for cue in cues}
+
+    for seg in segments:
+        if seg["text"][-1:] in STRONG_PUNCTUATION:
+            assert words_from_segments([seg])[-1]["end"] in cue_ends, seg["text"]
+
+
+def test_does_not_merge_across_sentence_boundary():
+    segments = [
+        {"start": 0.0, "end": 1.1, "text": "and goes on.", "words": [
+            {"word": " and", "start": 0.0, "end": 0.3},
+            {"word": " goes", "start": 0.35, "end": 0.7},
+            {"word": " on.", "start": 0.75, "end": 1.1},
+        ]},
+        {"start": 1.3, "end": 2.3, "text": "你好世界。", "words": [
+            {"word": "你", "start": 1.3, "end": 1.5},
+            {"word": "好", "start": 1.5, "end": 1.7},
+            {"word": "世", "start": 1.75, "end": 2.0},
+            {"word": "界。", "start": 2.0, "end": 2.3},
+        ]},
+    ]
+    assert [cue["text"] for cue in segment_transcript(segments)] == ["and goes on.", "你好世界。"]
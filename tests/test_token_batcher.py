@@ -0,0 +1,128 @@
+"""
+依 token 數分批（utils/token_batcher.py）
+
+token 估算、批次裝箱（含 prompt 固定開銷）、過長句子切分，以及編號譯文的對齊。
+"""
+
+import pytest
+
+from utils.token_batcher import (
+    _line_cost, estimate_tokens, pack_batches, parse_numbered_lines, split_oversized,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", 0),
+    ("hello world", 4),             # 每個英文單字約 4 字元一個 token
+    ("internationalization", 5),
+    ("I", 1),
+    ("2024 123456", 4),             # 數字約 3 位一個 token
+    ("你好世界", 4),                 # 中日韓一字一個 token
+    ("こんにちは", 5),
+    ("안녕", 2),
+    ("Hi, 你好!", 5),               # 標點一個一個
+])
+def test_estimate_tokens(text, expected):
+    assert estimate_tokens(text) == expected
+
+
+def test_cjk_costs_more_than_latin_of_same_length():
+    assert estimate_tokens("這是一個相當長的中文句子") > estimate_tokens("this is a fairly long")
+
+
+def batch_cost(batch, output_ratio=1.0, line_overhead=3):
+    return sum(_line_cost(text, output_ratio, line_overhead) for _, text in batch)
+
+
+def test_pack_batches_respects_budget_and_prompt_overhead():
+    texts = [f"sentence number {i} is about this long" for i in range(40)]
+    budget, overhead = 200, 80
+
+    batches = pack_batches(texts, token_budget=budget, prompt_overhead=overhead)
+
+    assert len(batches) > 1
+    for batch in batches:
+        assert overhead + batch_cost(batch) <= budget
+    # 依原順序、每句恰好一次
+    assert [index for batch in batches for index, _ in batch] == list(range(len(texts)))
+    assert [text for batch in batches for _, text in batch] == texts
+
+
+def test_prompt_overhead_reduces_batch_capacity():
+    texts = ["a short line of subtitles"] * 30
+    without = pack_batches(texts, token_budget=300)
+    with_overhead = pack_batches(texts, token_budget=300, prompt_overhead=150)
+
+    assert len(with_overhead) > len(without)
+    assert max(map(len, with_overhead)) < max(map(len, without))
+
+
+def test_pack_batches_max_items():
+    batches = pack_batches(["ok"] * 10, token_budget=10_000, max_items=4)
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_short_lines_share_one_batch():
+    assert len(pack_batches(["嗯", "對", "好"] * 10, token_budget=2000, prompt_overhead=100)) == 1
+
+
+def test_split_oversized_single_segment():
+    text = " ".join(f"This is sentence {i} of a very long lecture." for i in range(30))
+    max_tokens = 40
+
+    pieces = split_oversized(text, max_tokens)
+
+    assert len(pieces) > 1
+    assert all(estimate_tokens(piece) <= max_tokens for piece in pieces)
+    assert " ".join(pieces).split() == text.split()
+    # 優先在句末標點後切
+    assert all(piece.endswith(".") for piece in pieces)
+
+
+def test_split_oversized_without_spaces():
+    text = "這是一段沒有空白也沒有標點的很長很長的中文" * 5
+    pieces = split_oversized(text, 16)
+
+    assert "".join(pieces) == text
+    assert all(estimate_tokens(piece) <= 16 for piece in pieces)
+
+
+def test_oversized_segment_spans_batches_with_same_index():
+    long_text = " ".join(f"Part {i} of the explanation goes here." for i in range(40))
+    texts = ["Intro.", long_text, "Outro."]
+    budget, overhead = 120, 20
+
+    batches = pack_batches(texts, token_budget=budget, prompt_overhead=overhead)
+    pieces = [(index, text) for batch in batches for index, text in batch]
+
+    assert [index for index, _ in pieces].count(1) > 1
+    assert [index for index, _ in pieces] == sorted(index for index, _ in pieces)
+    assert " ".join(text for index, text in pieces if index == 1).split() == long_text.split()
+    for batch in batches:
+        assert overhead + batch_cost(batch) <= budget
+
+
+@pytest.mark.parametrize("result, expected", [
+    # 正常
+    ("1. 甲\n2. 乙\n3. 丙", ["甲", "乙", "丙"]),
+    # 模型把兩行合併成一行：被合併的編號為缺漏
+    ("1. 甲乙\n3. 丙", ["甲乙", None, "丙"]),
+    # 漏掉最後一行
+    ("1. 甲\n2. 乙", ["甲", "乙", None]),
+    # 漏掉中間一行
+    ("1. 甲\n3. 丙", ["甲", None, "丙"]),
+    # 自行換行：沒有編號的行接到上一行
+    ("1. 甲\n續\n2. 乙\n3. 丙", ["甲續", "乙", "丙"]),
+    # 順序錯亂、重複編號（保留第一次）、超出範圍
+    ("2. 乙\n1. 甲\n2. 重複\n3. 丙\n4. 多出來的", ["甲", "乙", "丙"]),
+    # 各種編號格式
+    ("（1）甲\n2、乙\n3) 丙", ["甲", "乙", "丙"]),
+    # 重新編號：從 0 開始、接續上一批
+    ("0. 甲\n1. 乙\n2. 丙", ["甲", "乙", "丙"]),
+    ("51. 甲\n52. 乙\n53. 丙", ["甲", "乙", "丙"]),
+    # 完全沒有編號：依序對應
+    ("甲\n乙", ["甲", "乙", None]),
+    ("", [None, None, None]),
+])
+def test_parse_numbered_lines(result, expected):
+    assert parse_numbered_lines(result, 3) == expected
@@ -0,0 +1,75 @@
+"""
+語音辨識輸出字幕（JYpymaker/transcribe.py transcribe_to_srt）
+
+辨識產生器每吐出一個原始片段，對應的字幕就已寫入檔案（不等全部辨識完成），
+結果與整份一起分段相同；中途失敗時不留下字幕檔。
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from JYpymaker import transcribe
+from JYpymaker.segmenter import segment_transcript
+from JYpymaker.subtitle_io import iter_srt_file, write_subtitles
+from JYpymaker.transcript_cache import _unpack_segments
+
+FIXTURE = Path(__file__).parent / "fixtures" / "word_timings" / "en_talk.json"
+
+
+def load_segments():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return _unpack_segments(json.load(f)["segments"])
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "talk.mp4"
+    path.write_bytes(b"\0")
+    return path
+
+
+def test_writes_cues_while_recognizing(media, tmp_path, monkeypatch):
+    segments = load_segments()
+    output = tmp_path / "talk.srt"
+    part = Path(f"{output}.part")
+    written_before = []
+
+    def fake_whisper(media_path, on_segment=None, **options):
+        for segment in segments:
+            # 交出下一個片段之前，前面片段的字幕都已寫入
+            written_before.append(len(list(iter_srt_file(part))) if part.exists() else 0)
+            yield segment
+
+    monkeypatch.setattr(transcribe, "_transcribe_with_whisper", fake_whisper)
+    path, count = transcribe.transcribe_to_srt(
+        str(media), str(output), language="en", traditional=False, use_cache=False, return_count=True,
+    )
+
+    expected = segment_transcript(segments, max_chars=25)
+    expected_path = tmp_path / "expected.srt"
+    write_subtitles(expected, expected_path)
+
+    assert path == str(output)
+    assert count == len(expected)
+    assert output.read_text(encoding="utf-8") == expected_path.read_text(encoding="utf-8")
+    assert not part.exists()
+    assert written_before[0] == 0
+    assert written_before == sorted(written_before)
+    assert written_before[-1] > 0
+
+
+def test_failure_leaves_no_subtitle_file(media, tmp_path, monkeypatch):
+    segments = load_segments()
+    output = tmp_path / "talk.srt"
+
+    def failing_whisper(media_path, on_segment=None, **options):
+        yield from segments[:3]
+        raise RuntimeError("decoder crashed")
+
+    monkeypatch.setattr(transcribe, "_transcribe_with_whisper", failing_whisper)
+    with pytest.raises(RuntimeError):
+        transcribe.transcribe_to_srt(str(media), str(output), language="en", traditional=False, use_cache=False)
+
+    assert list(tmp_path.iterdir()) == [media]
@@ -0,0 +1,174 @@
+"""
+翻譯批次排程器（utils/translation_scheduler.py）
+
+以本機的 OpenAI 相容 stub 伺服器（/v1/chat/completions）測試：
+    - 第一次請求某個批次回傳 429（含 Retry-After），重試後成功
+    - 後面的批次回應較快（完成順序與送出順序相反），結果仍依批次順序回傳
+    - 送出請求的速率不超過限制（Token Bucket 與 429 後的全體暫停）
+"""
+
+import re
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.token_batcher import parse_numbered_lines
+from utils.translation_scheduler import RateLimiter, TranslationScheduler, is_retryable
+
+REQUESTS_PER_MINUTE = 600
+CAPACITY = 2
+RETRY_AFTER = 0.3
+
+
+class StubChatServer(ThreadingHTTPServer):
+    """模擬 chat completions：把每行編號文字翻成「譯:原文」"""
+
+    daemon_threads = True
+
+    def __init__(self, batches: int, throttle_batch: int):
+        super().__init__(("127.0.0.1", 0), StubChatHandler)
+        self.batches = batches
+        self.throttle_batch = throttle_batch
+        self.throttled = False
+        self.arrivals = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        lines = re.findall(r"^\d+\. (.*)$", request["messages"][-1]["content"], re.M)
+        batch = int(lines[0].split("-")[0])
+
+        with server.lock:
+            server.arrivals.append(time.monotonic())
+            throttle = batch == server.throttle_batch and not server.throttled
+            server.throttled = server.throttled or throttle
+        if throttle:
+            self._reply(429, {"error": {"message": "rate limited", "type": "rate_limit"}},
+                        {"Retry-After": str(RETRY_AFTER)})
+            return
+
+        # 越後面的批次回應越快：完成順序與送出順序相反
+        time.sleep(0.05 * (server.batches - batch))
+        content = "\n".join(f"{i + 1}. 譯:{line}" for i, line in enumerate(lines))
+        self._reply(200, {
+            "id": f"chatcmpl-{batch}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+
+@pytest.fixture
+def stub_server():
+    server = StubChatServer(batches=6, throttle_batch=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_results_in_order_despite_429_and_out_of_order_replies(stub_server):
+    openai = pytest.importorskip("openai")
+    batches = [[f"{b}-{i} line" for i in range(3)] for b in range(stub_server.batches)]
+    sent = []
+
+    async def scenario():
+        async with openai.AsyncOpenAI(api_key="test", base_url=stub_server.base_url, max_retries=0) as client:
+
+            async def translate_once(texts):
+                sent.append(time.monotonic())
+                response = await client.chat.completions.create(
+                    model="stub",
+                    messages=[{"role": "user", "content": "\n".join(f"{i + 1}. {t}" for i, t in enumerate(texts))}],
+                )
+                return parse_numbered_lines(response.choices[0].message.content, len(texts))
+
+            scheduler = TranslationScheduler(
+                translate_once, max_in_flight=4,
+                limiter=RateLimiter(REQUESTS_PER_MINUTE, capacity=CAPACITY),
+            )
+            completed = []
+            results = await scheduler.run(batches, lambda index, result: completed.append(index))
+            return scheduler, completed, results
+
+    scheduler, completed, results = asyncio.run(scenario())
+
+    assert results == [[f"譯:{text}" for text in texts] for texts in batches]
+    assert completed != sorted(completed)
+    assert scheduler.stats["throttled"] == 1
+    assert scheduler.stats["requests"] == stub_server.batches + 1
+
+    # Token Bucket：第 n 個請求最早在 (n - 容量) / 速率 秒後送出
+    assert len(stub_server.arrivals) == len(sent)
+    rate = REQUESTS_PER_MINUTE / 60.0
+    for n, at in enumerate(sent):
+        assert at - sent[0] >= (n - CAPACITY + 1) / rate - 0.02
+    # 429 之後全體暫停 Retry-After 秒
+    assert sent[-1] - sent[0] >= RETRY_AFTER
+
+
+def test_programming_errors_are_not_retried():
+    calls = []
+
+    async def broken(texts):
+        calls.append(texts)
+        return {}["choices"]
+
+    scheduler = TranslationScheduler(broken, requests_per_minute=6000, base_delay=0.01)
+    results = asyncio.run(scheduler.run([["a"]]))
+
+    assert isinstance(results[0], KeyError)
+    assert len(calls) == 1
+    assert scheduler.stats["retries"] == 0
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (StatusError(429), True),
+    (StatusError(503), True),
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (ConnectionResetError(), True),
+    (asyncio.TimeoutError(), True),
+    (KeyError("choices"), False),
+    (TypeError("NoneType"), False),
+    (json.JSONDecodeError("Expecting value", "", 0), False),
+])
+def test_is_retryable(exc, expected):
+    assert is_retryable(exc) is expected
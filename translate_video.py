@@ -6,21 +6,27 @@ YouTube 影片翻譯工作流程
 """
 
 import os
-import re
 import sys
 import json
 import shutil
-import time
+import asyncio
+import threading
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 設置路徑
 sys.path.insert(0, str(Path(__file__).parent))
 
 from faster_whisper import WhisperModel
-from openai import OpenAI
+from openai import AsyncOpenAI
 from utils.color_utils import hex_to_rgb
+from utils.translation_scheduler import TranslationScheduler, shared_rate_limiter
+from utils.translation_memory import TranslationMemory
+from utils.stage_pipeline import Stage, StagePipeline
+from utils.token_batcher import estimate_tokens, pack_batches, parse_numbered_lines
+from JYpymaker.transcript_cache import transcript_cache
+from JYpymaker.subtitle_io import write_srt
+from JYpymaker.retimer import retime_translated
 
 # 載入設定
 CONFIG_FILE = Path(__file__).parent / "translation_config.json"
@@ -30,15 +36,20 @@ def load_config():
     with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
-# 預編譯正則表達式
-TEXT_NUMBER_PATTERN = re.compile(r'^\d+\.\s*(.+)$')
+# 翻譯 prompt 版本（修改 _build_messages 的 prompt 後請更新，翻譯記憶才不會沿用舊譯文）
+PROMPT_VERSION = "v1"
 
 class TranslationWorkflow:
     def __init__(self):
         self.config = load_config()
         self.whisper_model = None
+        self.whisper_model_name = None
         self.whisper_engine = None
-        self.deepseek_client = None
+        # 實際使用的運算裝置與精度（語音識別快取鍵的一部分）
+        self.whisper_device = None
+        self.whisper_compute_type = None
+        # 多執行緒共用同一個 Whisper 模型，載入與辨識都需互斥
+        self._whisper_lock = threading.Lock()
 
         # 路徑設定
         self.project_root = Path(__file__).parent
@@ -49,6 +60,24 @@ class TranslationWorkflow:
         # 確保輸出資料夾存在
         self.output_folder.mkdir(parents=True, exist_ok=True)
 
+        self.translation_memory = self._init_translation_memory()
+
+    def _init_translation_memory(self):
+        """初始化翻譯記憶（設定 translation_memory.enabled = false 可停用）"""
+        memory_config = self.config.get("translation_memory", {})
+        if not memory_config.get("enabled", True):
+            return None
+
+        translation_config = self.config["translation"]
+        return TranslationMemory(
+            str(self.project_root / memory_config.get("db_path", "cache/translation_memory.db")),
+            source_lang=translation_config.get("source_language", "en"),
+            target_lang=translation_config.get("target_language", "zh-TW"),
+            model=translation_config["model"],
+            prompt_version=PROMPT_VERSION,
+            fuzzy_threshold=memory_config.get("fuzzy_threshold", 0)
+        )
+
     def init_whisper(self):
         """初始化 Whisper 模型（自動降級：CUDA 失敗時使用 CPU）"""
         if self.whisper_model is None:
@@ -60,6 +89,7 @@ class TranslationWorkflow:
                 from pywhispercpp.model import Model as WhisperCppModel
                 print(f"[Whisper] 載入模型: {model_name} (whisper-cpp)")
                 self.whisper_model = WhisperCppModel(model_name)
+                self.whisper_model_name = model_name
                 self.whisper_engine = "whisper-cpp"
                 print("[Whisper] whisper-cpp 引擎已啟用")
                 return self.whisper_model
@@ -69,7 +99,9 @@ class TranslationWorkflow:
             try:
                 print(f"[Whisper] 載入模型: {model_name} (GPU)")
                 self.whisper_model = WhisperModel(model_name, device="cuda", compute_type="float16")
+                self.whisper_model_name = model_name
                 self.whisper_engine = "faster-whisper"
+                self.whisper_device, self.whisper_compute_type = "cuda", "float16"
                 print("[Whisper] GPU 加速已啟用")
             except Exception as e:
                 print(f"[Whisper] GPU 初始化失敗: {e}")
@@ -90,35 +122,84 @@ class TranslationWorkflow:
                     cpu_threads=cpu_threads,
                     num_workers=2
                 )
+                self.whisper_model_name = cpu_model
                 self.whisper_engine = "faster-whisper"
+                self.whisper_device, self.whisper_compute_type = "cpu", "int8"
                 print(f"[Whisper] CPU 模式已啟用（模型: {cpu_model}, {cpu_threads} 線程）")
 
         return self.whisper_model
 
-    def init_deepseek(self):
-        """初始化 DeepSeek API 客戶端"""
-        if self.deepseek_client is None:
-            # 優先從 config 讀取，其次環境變數
-            api_key = self.config["translation"].get("api_key") or os.environ.get("DEEPSEEK_API_KEY")
-            if not api_key:
-                raise ValueError("請在 translation_config.json 的 translation.api_key 填入 DeepSeek API Key")
-
-            self.deepseek_client = OpenAI(
-                api_key=api_key,
-                base_url=self.config["translation"]["base_url"]
-            )
-        return self.deepseek_client
+    def _get_api_key(self) -> str:
+        """取得 DeepSeek API Key（優先從 config 讀取，其次環境變數）"""
+        api_key = self.config["translation"].get("api_key") or os.environ.get("DEEPSEEK_API_KEY")
+        if not api_key:
+            raise ValueError("請在 translation_config.json 的 translation.api_key 填入 DeepSeek API Key")
+        return api_key
+
+    def _transcript_cache_key(self, video_path: Path, model_name: str,
+                              device: str = None, compute_type: str = None) -> str:
+        """組合語音識別快取鍵（音訊內容 + 引擎 + 模型 + 裝置與精度 + 辨識參數）"""
+        whisper_config = self.config["whisper"]
+        engine = whisper_config.get("engine", "faster-whisper")
+        if engine == "whisper-cpp":
+            return transcript_cache.make_key(str(video_path), engine=engine, model=model_name, word_timestamps=False)
+        return transcript_cache.make_key(
+            str(video_path),
+            engine=engine,
+            model=model_name,
+            language=whisper_config["language"],
+            initial_prompt=None,
+            vad_parameters={"vad_filter": True},
+            word_timestamps=whisper_config["word_timestamps"],
+            device=device,
+            compute_type=compute_type,
+            task=whisper_config["task"],
+            temperature=whisper_config["temperature"]
+        )
+
+    def _transcript_cache_candidates(self) -> list:
+        """查快取時要比對的 (模型, 裝置, 精度)：模型已載入時只比對實際使用的那一組"""
+        if self.whisper_model is not None:
+            return [(self.whisper_model_name, self.whisper_device, self.whisper_compute_type)]
+        # GPU 失敗時會改用 cpu_fallback_model（CPU int8），兩種結果分開保存，但都可沿用
+        whisper_config = self.config["whisper"]
+        model_name = whisper_config["model"]
+        if whisper_config.get("engine", "faster-whisper") == "whisper-cpp":
+            return [(model_name, None, None)]
+        cpu_model = whisper_config.get("cpu_fallback_model", model_name)
+        return [(model_name, "cuda", "float16"), (cpu_model, "cpu", "int8")]
 
     def transcribe(self, video_path: Path) -> list:
-        """使用 Whisper 轉錄影片"""
+        """使用 Whisper 轉錄影片（先查語音識別快取），回傳含字級時間戳的片段"""
         print(f"[1/4] 語音識別: {video_path.name}")
 
+        for model_name, device, compute_type in self._transcript_cache_candidates():
+            cached = transcript_cache.get(self._transcript_cache_key(video_path, model_name, device, compute_type))
+            if cached is not None:
+                print(f"    [快取] 使用已存在的識別結果（模型: {model_name}）: {len(cached)} 個片段")
+                return cached
+
+        segments = self._run_whisper(video_path)
+        transcript_cache.put(
+            self._transcript_cache_key(video_path, self.whisper_model_name, self.whisper_device, self.whisper_compute_type),
+            segments
+        )
+
+        # 保留字級時間戳，翻譯後重新計時時使用
+        return segments
+
+    def _run_whisper(self, video_path: Path) -> list:
+        """實際執行語音識別，回傳含字級時間的原始片段"""
+        with self._whisper_lock:
+            return self._run_whisper_locked(video_path)
+
+    def _run_whisper_locked(self, video_path: Path) -> list:
         model = self.init_whisper()
 
         # whisper-cpp 引擎
         if self.whisper_engine == "whisper-cpp":
             segments_list = model.transcribe(str(video_path))
-            segments = [{"start": seg.t0/100, "end": seg.t1/100, "text": seg.text.strip()} for seg in segments_list]
+            segments = [{"start": seg.t0/100, "end": seg.t1/100, "text": seg.text.strip(), "words": []} for seg in segments_list]
             print(f"    識別完成: {len(segments)} 個片段")
             return segments
 
@@ -137,17 +218,18 @@ class TranslationWorkflow:
             segments.append({
                 "start": segment.start,
                 "end": segment.end,
-                "text": segment.text.strip()
+                "text": segment.text.strip(),
+                "words": [
+                    {"word": w.word, "start": w.start, "end": w.end}
+                    for w in (segment.words or [])
+                ]
             })
 
         print(f"    識別完成: {len(segments)} 個片段")
         return segments
 
-    def translate_batch(self, texts: list, max_retries: int = 3) -> list:
-        """批次翻譯多句文字（含重試機制）"""
-        client = self.init_deepseek()
-
-        # 用編號格式組合多句
+    def _build_messages(self, texts: list) -> list:
+        """組合翻譯請求的 messages（編號格式）"""
         numbered_text = "\n".join([f"{i+1}. {t}" for i, t in enumerate(texts)])
 
         prompt = f"""將以下英文字幕翻譯成繁體中文，保持編號格式，每行一句：
@@ -159,108 +241,167 @@ class TranslationWorkflow:
 - 翻譯要簡潔、口語化
 - 每句獨立一行"""
 
-        last_error = None
-        for attempt in range(max_retries):
-            try:
-                response = client.chat.completions.create(
-                    model=self.config["translation"]["model"],
-                    messages=[
-                        {"role": "system", "content": "你是專業的字幕翻譯員，翻譯要簡潔、口語化、符合繁體中文習慣。請保持編號格式輸出。"},
-                        {"role": "user", "content": prompt}
-                    ],
+        return [
+            {"role": "system", "content": "你是專業的字幕翻譯員，翻譯要簡潔、口語化、符合繁體中文習慣。請保持編號格式輸出。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_translations(self, result: str, texts: list, fill_missing: bool = True) -> list:
+        """解析編號格式的翻譯結果（依編號對齊），缺漏的句子用原文填充（fill_missing=False 時為 None）"""
+        translations = parse_numbered_lines(result, len(texts))
+        if not fill_missing:
+            return [t if t else None for t in translations]
+        return [t if t else original for t, original in zip(translations, texts)]
+
+    def _prompt_overhead_tokens(self) -> int:
+        """每個批次 prompt 的固定 token 開銷（不含字幕內容）"""
+        return sum(estimate_tokens(m["content"]) for m in self._build_messages([])) + 8
+
+    async def _translate_batches_async(self, batches: list, on_batch_done=None) -> list:
+        """以排程器並行送出所有批次（重試與限流由排程器處理）"""
+        translation_config = self.config["translation"]
+
+        async with AsyncOpenAI(
+            api_key=self._get_api_key(),
+            base_url=translation_config["base_url"],
+            max_retries=0
+        ) as client:
+
+            async def translate_once(texts: list) -> list:
+                response = await client.chat.completions.create(
+                    model=translation_config["model"],
+                    messages=self._build_messages(texts),
                     temperature=0.3
                 )
-                result = response.choices[0].message.content.strip()
-                break  # 成功則跳出重試迴圈
-            except Exception as e:
-                last_error = e
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # 指數退避: 1s, 2s, 4s
-                    print(f"    API 錯誤，{wait_time} 秒後重試 ({attempt + 1}/{max_retries}): {e}")
-                    time.sleep(wait_time)
-                else:
-                    raise last_error
-
-        # 解析結果
-        translations = []
-        for line in result.split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-            # 移除編號 "1. ", "2. " 等
-            match = TEXT_NUMBER_PATTERN.match(line)
-            if match:
-                translations.append(match.group(1))
-            elif line and not line[0].isdigit():
-                translations.append(line)
+                # 缺漏的句子保留為 None，由呼叫端決定如何處理（不可存入翻譯記憶）
+                return self._parse_translations(
+                    response.choices[0].message.content.strip(), texts, fill_missing=False
+                )
 
-        # 確保數量匹配
-        while len(translations) < len(texts):
-            translations.append(texts[len(translations)])  # 用原文填充
+            # 速率限制整個程序共用：多個翻譯工作者同時執行時，總請求速率仍為 requests_per_minute
+            max_in_flight = translation_config.get("max_concurrency", 4)
+            scheduler = TranslationScheduler(
+                translate_once,
+                max_in_flight=max_in_flight,
+                limiter=shared_rate_limiter(
+                    translation_config["base_url"],
+                    requests_per_minute=translation_config.get("requests_per_minute", 60),
+                    capacity=max_in_flight
+                )
+            )
+            results = await scheduler.run(batches, on_batch_done)
 
-        return translations[:len(texts)]
+        stats = scheduler.stats
+        if stats["retries"] or stats["failed"]:
+            print(f"    請求 {stats['requests']} 次，重試 {stats['retries']} 次，"
+                  f"限流 {stats['throttled']} 次，失敗 {stats['failed']} 批")
+        return results
 
     def translate_segments(self, segments: list) -> list:
-        """批次翻譯所有片段"""
+        """批次翻譯所有片段（先查翻譯記憶，未命中的句子去重後多批次並行翻譯）"""
         print(f"[2/4] 翻譯字幕: {len(segments)} 個片段")
 
-        batch_size = self.config.get("translation", {}).get("batch_size", 20)
-        translated = []
-
-        # 分批處理
-        for batch_start in range(0, len(segments), batch_size):
-            batch_end = min(batch_start + batch_size, len(segments))
-            batch = segments[batch_start:batch_end]
-
-            texts = [seg["text"] for seg in batch]
-
-            try:
-                translated_texts = self.translate_batch(texts)
-
-                for i, seg in enumerate(batch):
-                    translated.append({
-                        "start": seg["start"],
-                        "end": seg["end"],
-                        "original": seg["text"],
-                        "text": translated_texts[i] if i < len(translated_texts) else seg["text"]
-                    })
+        texts = [seg["text"] for seg in segments]
+        memory = self.translation_memory
+        memory_hits = memory.lookup_many(texts) if memory else [None] * len(texts)
+
+        # 未命中的句子（同一原文只送一次）
+        miss_texts = list(dict.fromkeys(
+            text for text, hit in zip(texts, memory_hits) if hit is None
+        ))
+        if memory:
+            print(f"    翻譯記憶命中 {len(texts) - sum(1 for h in memory_hits if h is None)} 句，"
+                  f"需翻譯 {len(miss_texts)} 句")
+
+        # 依估算 token 數分批（batch_size 為每批句數上限），過長的句子會被切段
+        translation_config = self.config.get("translation", {})
+        batches = pack_batches(
+            miss_texts,
+            token_budget=translation_config.get("max_batch_tokens", 4000),
+            prompt_overhead=self._prompt_overhead_tokens(),
+            max_items=translation_config.get("batch_size", 20)
+        )
 
-                print(f"    進度: {batch_end}/{len(segments)}")
+        done_count = 0
+
+        def on_batch_done(index, result):
+            nonlocal done_count
+            done_count += len(batches[index])
+            if isinstance(result, Exception):
+                print(f"    批次翻譯錯誤: {result}")
+            print(f"    進度: {done_count}/{sum(len(b) for b in batches)}")
+
+        results = asyncio.run(self._translate_batches_async(
+            [[piece for _, piece in batch] for batch in batches],
+            on_batch_done
+        )) if batches else []
+
+        # 依原文索引合併切段的譯文；任一段失敗則整句保留原文
+        pieces = {}
+        failed = set()
+        # 模型漏翻、以原文填充的句子（或其中一段）：本次照樣輸出，但不存入翻譯記憶，下次重新翻譯
+        incomplete = set()
+        for batch, translated_texts in zip(batches, results):
+            if isinstance(translated_texts, Exception):
+                failed.update(index for index, _ in batch)
+                continue
+            for (index, piece), translated_text in zip(batch, translated_texts):
+                if translated_text is None:
+                    incomplete.add(index)
+                    translated_text = piece
+                pieces.setdefault(index, []).append(translated_text)
+
+        new_translations = {
+            miss_texts[index]: "".join(parts)
+            for index, parts in pieces.items()
+            if index not in failed
+        }
+
+        if memory:
+            memory.store_many(
+                (miss_texts[index], new_translations[miss_texts[index]])
+                for index in pieces
+                if index not in failed and index not in incomplete
+            )
+        if incomplete:
+            print(f"    {len(incomplete)} 句未完整翻譯（保留原文），不存入翻譯記憶")
 
-            except Exception as e:
-                print(f"    批次翻譯錯誤: {e}")
-                # 失敗時保留原文
-                for seg in batch:
-                    translated.append({
-                        "start": seg["start"],
-                        "end": seg["end"],
-                        "original": seg["text"],
-                        "text": seg["text"]
-                    })
+        translated = []
+        for seg, hit in zip(segments, memory_hits):
+            translated.append({
+                "start": seg["start"],
+                "end": seg["end"],
+                "original": seg["text"],
+                "text": hit if hit is not None else new_translations.get(seg["text"], seg["text"]),
+                "words": seg.get("words", [])
+            })
 
         print(f"    翻譯完成")
         return translated
 
+    def retime_segments(self, segments: list) -> list:
+        """依譯文閱讀長度切分過長的字幕，切點對齊原文字級時間戳"""
+        retime_config = self.config.get("retime", {})
+        if not retime_config.get("enabled", True):
+            return segments
+
+        retimed = retime_translated(
+            segments,
+            max_chars=retime_config.get("max_chars", 16),
+            max_cps=retime_config.get("max_cps", 9.0),
+            min_duration=retime_config.get("min_duration", 0.8),
+            max_extend=retime_config.get("max_extend", 1.5)
+        )
+        print(f"    重新計時: {len(segments)} → {len(retimed)} 條字幕")
+        return retimed
+
     def generate_srt(self, segments: list, output_path: Path) -> Path:
         """生成 SRT 字幕檔"""
         print(f"[3/4] 生成 SRT: {output_path.name}")
 
-        def format_timestamp(seconds: float) -> str:
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            secs = int(seconds % 60)
-            millis = int((seconds % 1) * 1000)
-            return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            for i, seg in enumerate(segments, 1):
-                start_ts = format_timestamp(seg["start"])
-                end_ts = format_timestamp(seg["end"])
-                f.write(f"{i}\n")
-                f.write(f"{start_ts} --> {end_ts}\n")
-                f.write(f"{seg['text']}\n\n")
-
-        print(f"    SRT 已儲存")
+        count = write_srt(segments, output_path)
+
+        print(f"    SRT 已儲存（{count} 條字幕）")
         return output_path
 
     def get_jianying_drafts_path(self) -> Path:
@@ -349,52 +490,74 @@ class TranslationWorkflow:
         print(f"    草稿已儲存: {draft_name}")
         return output_draft
 
-    def process_video(self, video_path: Path) -> dict:
-        """處理單個影片"""
-        print(f"\n{'='*50}")
-        print(f"處理影片: {video_path.name}")
-        print(f"{'='*50}")
-
-        # 檢查是否跳過已存在的草稿
+    def _stage_transcribe(self, video_path: Path) -> dict:
+        """階段 1：檢查快取並語音識別"""
         draft_name = f"翻譯_{video_path.stem}"
         output_draft = self.get_jianying_drafts_path() / draft_name
+        srt_path = self.output_folder / f"{video_path.stem}.srt"
+        job = {"video": video_path, "srt": srt_path, "draft": output_draft, "segments": None, "skipped": False}
 
+        # 檢查是否跳過已存在的草稿
         skip_existing = self.config.get("workflow", {}).get("skip_existing", False)
         if skip_existing and output_draft.exists():
             print(f"[跳過] 草稿已存在: {draft_name}")
+            job["skipped"] = True
+            return job
+
+        # 檢查是否已有 SRT 檔案（跳過語音識別和翻譯）
+        if srt_path.exists():
+            print(f"[快取] 發現已存在的 SRT: {srt_path.name}")
+            print(f"[跳過] 語音識別和翻譯（使用快取）")
+            return job
+
+        job["segments"] = self.transcribe(video_path)
+        return job
+
+    def _stage_translate(self, job: dict) -> dict:
+        """階段 2：翻譯並生成 SRT"""
+        if job["skipped"] or job["segments"] is None:
+            return job
+
+        translated = self.retime_segments(self.translate_segments(job["segments"]))
+        self.generate_srt(translated, job["srt"])
+        job["segments"] = None  # 釋放記憶體
+        return job
+
+    def _stage_draft(self, job: dict) -> dict:
+        """階段 3：生成剪映草稿"""
+        if job["skipped"]:
+            return job
+
+        job["draft"] = self.create_jianying_draft(job["video"], job["srt"])
+        return job
+
+    @staticmethod
+    def _job_result(job: dict) -> dict:
+        if job["skipped"]:
             return {
                 "success": True,
-                "video": video_path.name,
+                "video": job["video"].name,
                 "skipped": True,
-                "draft": str(output_draft)
+                "draft": str(job["draft"])
             }
+        return {
+            "success": True,
+            "video": job["video"].name,
+            "srt": str(job["srt"]),
+            "draft": str(job["draft"])
+        }
 
-        try:
-            # 檢查是否已有 SRT 檔案（跳過語音識別和翻譯）
-            srt_path = self.output_folder / f"{video_path.stem}.srt"
-
-            if srt_path.exists():
-                print(f"[快取] 發現已存在的 SRT: {srt_path.name}")
-                print(f"[跳過] 語音識別和翻譯（使用快取）")
-            else:
-                # 1. 語音識別
-                segments = self.transcribe(video_path)
-
-                # 2. 翻譯
-                translated = self.translate_segments(segments)
-
-                # 3. 生成 SRT
-                self.generate_srt(translated, srt_path)
-
-            # 4. 生成剪映草稿
-            draft_path = self.create_jianying_draft(video_path, srt_path)
+    def process_video(self, video_path: Path) -> dict:
+        """處理單個影片"""
+        print(f"\n{'='*50}")
+        print(f"處理影片: {video_path.name}")
+        print(f"{'='*50}")
 
-            return {
-                "success": True,
-                "video": video_path.name,
-                "srt": str(srt_path),
-                "draft": str(draft_path)
-            }
+        try:
+            job = self._stage_transcribe(video_path)
+            job = self._stage_translate(job)
+            job = self._stage_draft(job)
+            return self._job_result(job)
 
         except Exception as e:
             print(f"[錯誤] {e}")
@@ -404,8 +567,13 @@ class TranslationWorkflow:
                 "error": str(e)
             }
 
-    def batch_process(self, max_workers: int = 2):
-        """批量處理所有影片（並行）"""
+    def batch_process(self):
+        """
+        批量處理所有影片（分階段管線）
+
+        語音識別、翻譯、草稿生成各自有獨立的 worker 與有界佇列，
+        影片 A 翻譯時影片 B 已開始語音識別。worker 數量由 config 的 pipeline 區塊設定。
+        """
         video_exts = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
         videos = [
             f for f in self.source_folder.iterdir()
@@ -416,35 +584,38 @@ class TranslationWorkflow:
             print(f"[警告] 沒有找到影片: {self.source_folder}")
             return []
 
-        print(f"找到 {len(videos)} 個影片待處理（並行數: {max_workers}）")
-
-        results = []
+        pipeline_config = self.config.get("pipeline", {})
+        queue_size = pipeline_config.get("queue_size", 2)
+        pipeline = StagePipeline([
+            Stage("語音識別", self._stage_transcribe,
+                  workers=pipeline_config.get("asr_workers", 1), queue_size=queue_size),
+            Stage("翻譯", self._stage_translate,
+                  workers=pipeline_config.get("translate_workers", 2), queue_size=queue_size),
+            Stage("草稿", self._stage_draft,
+                  workers=pipeline_config.get("draft_workers", 1), queue_size=queue_size),
+        ], report_interval=pipeline_config.get("report_interval", 10))
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任務
-            future_to_video = {
-                executor.submit(self.process_video, video): video
-                for video in videos
-            }
+        print(f"找到 {len(videos)} 個影片待處理（管線: "
+              + ", ".join(f"{stage.name} x{stage.workers}" for stage in pipeline.stages) + "）")
 
-            # 收集結果
-            for future in as_completed(future_to_video):
-                video = future_to_video[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    print(f"[錯誤] {video.name}: {e}")
-                    results.append({
-                        "success": False,
-                        "video": video.name,
-                        "error": str(e)
-                    })
+        results = []
+        for video, outcome in zip(videos, pipeline.run(videos)):
+            if "error" in outcome:
+                print(f"[錯誤] {video.name}（{outcome['stage']}）: {outcome['error']}")
+                results.append({
+                    "success": False,
+                    "video": video.name,
+                    "error": str(outcome["error"])
+                })
+            else:
+                results.append(self._job_result(outcome["result"]))
 
         # 統計結果
         success = sum(1 for r in results if r.get("success"))
         print(f"\n{'='*50}")
         print(f"處理完成: {success}/{len(results)} 成功")
+        if self.translation_memory:
+            print(self.translation_memory.summary())
         print(f"{'='*50}")
 
         return results
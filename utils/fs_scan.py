@@ -0,0 +1,245 @@
+"""
+資料夾掃描 - os.scandir 一次取得檔名與 stat，並可附帶快取的影片資訊
+
+    - scan_dir: 依副檔名一次過濾，沿用 DirEntry 的 stat 結果，支援排序與分頁
+    - MediaProbeIndex: 影片時長與解析度的快取索引（以檔案大小 + 修改時間判斷是否失效），
+      只會探測目前這一頁的檔案
+
+使用方式：
+    total, files = scan_dir(folder, extensions=VIDEO_EXTENSIONS, sort="mtime", reverse=True, limit=50)
+    media_index.enrich(files)   # 每個項目加上 duration / width / height
+"""
+
+import os
+import json
+import threading
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+VIDEO_EXTENSIONS = frozenset({".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm", ".m4v"})
+AUDIO_EXTENSIONS = frozenset({".mp3", ".wav", ".m4a", ".flac", ".aac", ".ogg", ".wma"})
+MEDIA_EXTENSIONS = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+
+DEFAULT_MEDIA_INDEX_FILE = Path(__file__).parent.parent / "cache" / "media_index.json"
+
+
+def _entry_info(entry: os.DirEntry, is_dir: bool) -> Dict[str, Any]:
+    stat = entry.stat()
+    return {
+        "name": entry.name,
+        "path": entry.path,
+        "is_dir": is_dir,
+        "size": 0 if is_dir else stat.st_size,
+        "mtime": stat.st_mtime,
+        "ctime": stat.st_ctime,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def scan_dir(
+    path: Union[str, Path],
+    extensions: Optional[Iterable[str]] = None,
+    include_files: bool = True,
+    include_dirs: bool = False,
+    include_hidden: bool = False,
+    sort: Optional[str] = "name",
+    reverse: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    掃描單一資料夾（不遞迴）
+
+    Args:
+        path: 資料夾路徑
+        extensions: 只保留這些副檔名的檔案（小寫、含點，如 {".mp4"}），None 表示不過濾
+        include_files: 是否包含檔案
+        include_dirs: 是否包含子資料夾
+        include_hidden: 是否包含 . 開頭的項目
+        sort: 排序欄位 "name"（不分大小寫）、"mtime"、"size"，None 表示不排序
+        reverse: 是否反向排序
+        offset: 略過前幾筆
+        limit: 最多回傳幾筆（None 表示全部）
+
+    Returns:
+        (符合條件的總數, 項目列表)，每個項目包含 name, path, is_dir, size, mtime, ctime
+
+    Raises:
+        FileNotFoundError / NotADirectoryError / PermissionError: 與 os.scandir 相同
+    """
+    exts = {e.lower() for e in extensions} if extensions is not None else None
+
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if not include_hidden and entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                if is_dir:
+                    if include_dirs:
+                        entries.append(_entry_info(entry, True))
+                    continue
+                if not include_files or not entry.is_file():
+                    continue
+                if exts is not None and os.path.splitext(entry.name)[1].lower() not in exts:
+                    continue
+                entries.append(_entry_info(entry, False))
+            except OSError:
+                # 掃描途中被刪除或沒有權限的項目略過
+                continue
+
+    if sort == "name":
+        entries.sort(key=lambda e: e["name"].lower(), reverse=reverse)
+    elif sort in ("mtime", "size"):
+        entries.sort(key=lambda e: e[sort], reverse=reverse)
+
+    end = None if limit is None else offset + limit
+    return len(entries), entries[offset:end]
+
+
+def _probe_with_mediainfo(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        import pymediainfo
+    except ImportError:
+        return None
+
+    try:
+        info = pymediainfo.MediaInfo.parse(path, mediainfo_options={"File_TestContinuousFileNames": "0"})
+    except Exception:
+        # 找不到 libmediainfo、檔案損毀等：改用 ffprobe
+        return None
+    duration = width = height = None
+    if info.video_tracks:
+        track = info.video_tracks[0]
+        duration, width, height = track.duration, track.width, track.height
+    elif info.audio_tracks:
+        duration = info.audio_tracks[0].duration
+    if duration is None and info.general_tracks:
+        duration = info.general_tracks[0].duration
+    return {
+        "duration": round(float(duration) / 1000, 3) if duration is not None else None,
+        "width": width,
+        "height": height,
+    }
+
+
+def _probe_with_ffprobe(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-print_format", "json", "-show_format",
+             "-show_streams", "-select_streams", "v:0", path],
+            capture_output=True, timeout=30
+        ).stdout
+        data = json.loads(output or b"{}")
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return None
+
+    streams = data.get("streams") or [{}]
+    duration = data.get("format", {}).get("duration")
+    return {
+        "duration": round(float(duration), 3) if duration else None,
+        "width": streams[0].get("width"),
+        "height": streams[0].get("height"),
+    }
+
+
+class MediaProbeIndex:
+    """影片時長與解析度的快取索引（執行緒安全）"""
+
+    def __init__(self, index_file: Optional[Path] = DEFAULT_MEDIA_INDEX_FILE):
+        """
+        Args:
+            index_file: 索引檔路徑（None 表示只保存在記憶體）
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.index_file:
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        if not self.index_file:
+            return
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        tmp_path.replace(self.index_file)
+
+    def _lookup(self, path: str, size: int, mtime_ns: int) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """返回 (影片資訊, 是否為新探測)"""
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is not None and cached["size"] == size and cached["mtime_ns"] == mtime_ns:
+            return cached["info"], False
+
+        info = _probe_with_mediainfo(path) or _probe_with_ffprobe(path)
+        if info is None:
+            return None, False
+        with self._lock:
+            self._entries[key] = {"size": size, "mtime_ns": mtime_ns, "info": info}
+        return info, True
+
+    def probe(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        取得單一檔案的影片資訊
+
+        Returns:
+            {"duration": 秒, "width": int, "height": int}，無法探測時為 None
+        """
+        stat = os.stat(path)
+        info, is_new = self._lookup(str(path), stat.st_size, stat.st_mtime_ns)
+        if is_new:
+            with self._lock:
+                self._save()
+        return info
+
+    def enrich(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        為 scan_dir 的結果加上 duration / width / height（只探測快取中沒有或已變更的檔案）
+
+        Returns:
+            同一個列表（就地修改）
+        """
+        changed = False
+        for entry in entries:
+            if entry.get("is_dir"):
+                continue
+            info, is_new = self._lookup(entry["path"], entry["size"], entry["mtime_ns"])
+            changed = changed or is_new
+            entry.update(info or {"duration": None, "width": None, "height": None})
+        if changed:
+            with self._lock:
+                self._save()
+        return entries
+
+
+_media_index: Optional[MediaProbeIndex] = None
+_media_index_lock = threading.Lock()
+
+
+def get_media_index() -> MediaProbeIndex:
+    """取得共用的影片資訊索引（寫入 cache/media_index.json）"""
+    global _media_index
+    with _media_index_lock:
+        if _media_index is None:
+            _media_index = MediaProbeIndex()
+        return _media_index
+
+
+def format_size(size: int) -> str:
+    """檔案大小轉為易讀字串"""
+    if size > 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.0f} KB"
@@ -0,0 +1,109 @@
+"""
+影片封面縮圖 - 以 ffmpeg 擷取一張小尺寸 JPEG，產生一次後快取
+
+快取檔名由檔案路徑 + 大小 + 修改時間決定，影片被替換後自動重新產生；
+同一支影片同時被請求時只會執行一次 ffmpeg；無法產生縮圖的影片會記住失敗，
+檔案沒有變更前不再重試（程式重新啟動後才會再試一次）。
+
+使用方式：
+    poster_path = get_poster_cache().get(video_path)   # 無法產生時為 None
+"""
+
+import os
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Set, Union
+
+DEFAULT_POSTER_DIR = Path(__file__).parent.parent / "cache" / "posters"
+POSTER_WIDTH = 320
+# 擷取位置（秒）；影片比這短時改取第一幀
+POSTER_SEEK = 1.0
+
+
+def _extract_frame(video_path: str, output_path: Path, seek: float, width: int) -> bool:
+    try:
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-ss", str(seek), "-i", video_path,
+             "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "5", str(output_path)],
+            capture_output=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return output_path.exists() and output_path.stat().st_size > 0
+
+
+class PosterCache:
+    """影片封面縮圖快取（執行緒安全）"""
+
+    def __init__(self, cache_dir: Path = DEFAULT_POSTER_DIR, width: int = POSTER_WIDTH):
+        """
+        Args:
+            cache_dir: 縮圖存放目錄
+            width: 縮圖寬度（高度依比例）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.width = width
+        # 每個快取鍵一把鎖（保留不刪除：刪除時可能還有執行緒在等待同一把鎖）
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # 擷取失敗的快取鍵（路徑 + 大小 + 修改時間）
+        self._failed: Set[str] = set()
+
+    def _key(self, video_path: str, stat: os.stat_result) -> str:
+        source = f"{os.path.normcase(os.path.abspath(video_path))}|{stat.st_size}|{stat.st_mtime_ns}|{self.width}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, video_path: Union[str, Path]) -> Optional[Path]:
+        """
+        取得影片的封面縮圖（沒有快取時產生）
+
+        Args:
+            video_path: 影片路徑
+
+        Returns:
+            縮圖路徑，ffmpeg 不可用或擷取失敗時為 None
+        """
+        video_path = str(video_path)
+        key = self._key(video_path, os.stat(video_path))
+        poster_path = self.cache_dir / f"{key}.jpg"
+        if poster_path.exists():
+            return poster_path
+        if key in self._failed:
+            return None
+
+        with self._lock_for(key):
+            if poster_path.exists():
+                return poster_path
+            if key in self._failed:
+                return None
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # 暫存檔名每次不同（多個後端程序共用同一個快取目錄時也不會互相覆寫）
+            tmp_path = poster_path.with_name(f"{key}.{os.getpid()}-{threading.get_ident()}.tmp.jpg")
+            try:
+                if not (_extract_frame(video_path, tmp_path, POSTER_SEEK, self.width)
+                        or _extract_frame(video_path, tmp_path, 0, self.width)):
+                    self._failed.add(key)
+                    return None
+                tmp_path.replace(poster_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return poster_path
+
+
+_poster_cache: Optional[PosterCache] = None
+_poster_cache_lock = threading.Lock()
+
+
+def get_poster_cache() -> PosterCache:
+    """取得共用的封面縮圖快取（寫入 cache/posters/）"""
+    global _poster_cache
+    with _poster_cache_lock:
+        if _poster_cache is None:
+            _poster_cache = PosterCache()
+        return _poster_cache
@@ -0,0 +1,170 @@
+"""
+多階段管線 - 每個階段有獨立的工作執行緒與有界佇列
+
+例如影片翻譯：
+    語音識別（CPU 密集，1 個 worker）→ 翻譯（等待網路，多個 worker）→ 寫入草稿
+
+影片 A 在翻譯時，影片 B 已經可以開始語音識別。
+佇列有上限，上游太快時會自動等待下游（backpressure）。
+
+使用方式：
+    pipeline = StagePipeline([
+        Stage("asr", transcribe, workers=1),
+        Stage("translate", translate, workers=3),
+        Stage("draft", write_draft, workers=1),
+    ])
+    results = pipeline.run(videos)
+"""
+
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+_SENTINEL = object()
+
+
+class Stage:
+    """管線中的一個階段"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, queue_size: int = 2):
+        """
+        Args:
+            name: 階段名稱（用於報告）
+            func: 處理函數，接收上一階段的輸出，回傳給下一階段的輸入
+            workers: 工作執行緒數量
+            queue_size: 輸入佇列上限
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.active = 0
+        self._alive_workers = self.workers
+        self._lock = threading.Lock()
+
+
+class StagePipeline:
+    """多階段管線執行器"""
+
+    def __init__(self, stages: List[Stage], report_interval: float = 10.0):
+        """
+        Args:
+            stages: 階段列表（依執行順序）
+            report_interval: 進度報告間隔（秒），0 表示不定期報告
+        """
+        self.stages = stages
+        self.report_interval = report_interval
+        self._started_at = 0.0
+
+    def _worker(self, stage_index: int, results: List[Dict[str, Any]]):
+        stage = self.stages[stage_index]
+        next_stage = self.stages[stage_index + 1] if stage_index + 1 < len(self.stages) else None
+
+        while True:
+            item = stage.queue.get()
+            if item is _SENTINEL:
+                break
+
+            index, value = item
+            with stage._lock:
+                stage.active += 1
+            started = time.monotonic()
+            try:
+                output = stage.func(value)
+                error = None
+            except Exception as e:
+                output, error = None, e
+            elapsed = time.monotonic() - started
+            with stage._lock:
+                stage.active -= 1
+                stage.busy_seconds += elapsed
+                stage.processed += 1
+                if error is not None:
+                    stage.failed += 1
+
+            if error is not None:
+                results[index] = {"error": error, "stage": stage.name}
+            elif next_stage is not None:
+                next_stage.queue.put((index, output))
+            else:
+                results[index] = {"result": output}
+
+        # 最後一個結束的 worker 通知下游結束
+        with stage._lock:
+            stage._alive_workers -= 1
+            is_last = stage._alive_workers == 0
+        if is_last and next_stage is not None:
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(_SENTINEL)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """目前各階段狀態：佇列深度、執行中數量、使用率"""
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        return [
+            {
+                "stage": stage.name,
+                "queue_depth": stage.queue.qsize(),
+                "queue_size": stage.queue.maxsize,
+                "active": stage.active,
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "utilization": min(1.0, stage.busy_seconds / (elapsed * stage.workers)),
+            }
+            for stage in self.stages
+        ]
+
+    def format_report(self) -> str:
+        return " | ".join(
+            f"{s['stage']}: 佇列 {s['queue_depth']}/{s['queue_size']}, "
+            f"執行中 {s['active']}/{s['workers']}, 完成 {s['processed']}, 使用率 {s['utilization']:.0%}"
+            for s in self.snapshot()
+        )
+
+    def run(self, items: List[Any], on_report: Optional[Callable[[str], None]] = print) -> List[Dict[str, Any]]:
+        """
+        執行管線
+
+        Args:
+            items: 輸入項目列表
+            on_report: 定期報告回調（預設 print）
+
+        Returns:
+            與 items 同順序的結果列表，每項為 {"result": ...} 或 {"error": Exception, "stage": 階段名稱}
+        """
+        results: List[Dict[str, Any]] = [{} for _ in items]
+        self._started_at = time.monotonic()
+
+        threads = []
+        for stage_index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(stage_index, results), daemon=True)
+                t.start()
+                threads.append(t)
+
+        stop_reporting = threading.Event()
+        if on_report and self.report_interval > 0:
+            def report_loop():
+                while not stop_reporting.wait(self.report_interval):
+                    on_report(f"[Pipeline] {self.format_report()}")
+            threading.Thread(target=report_loop, daemon=True).start()
+
+        # 餵入第一個階段（佇列滿時會阻塞）
+        first_stage = self.stages[0]
+        for index, item in enumerate(items):
+            first_stage.queue.put((index, item))
+        for _ in range(first_stage.workers):
+            first_stage.queue.put(_SENTINEL)
+
+        for t in threads:
+            t.join()
+        stop_reporting.set()
+
+        if on_report:
+            on_report(f"[Pipeline] 總耗時 {time.monotonic() - self._started_at:.1f} 秒 | {self.format_report()}")
+
+        return results
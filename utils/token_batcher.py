@@ -0,0 +1,182 @@
+"""
+依 token 數分批 - 取代固定句數的翻譯批次
+
+    - estimate_tokens: 不需網路的 token 數估算（英文約 4 字元一個 token，中日韓一字約一個）
+    - pack_batches: 依估算 token 數把句子裝進批次，計入 prompt 固定開銷與輸出預留
+    - parse_numbered_lines: 解析「1. 譯文」格式，模型合併或漏行時仍能對齊原編號
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"  # 中日韓：一字一個 token
+    r"|[A-Za-z]+"                                                       # 英文單字
+    r"|\d+"                                                             # 數字
+    r"|\S"                                                              # 標點與其他符號
+)
+
+_SENTENCE_BREAK = re.compile(r"(?<=[\.\!\?。！？；;,，])\s+")
+
+NUMBERED_LINE_PATTERN = re.compile(r"^\s*[\(（]?(\d+)\s*[\.、\)）:：]\s*(.*)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文字的 token 數
+
+    英文單字約每 4 字元一個 token，數字約每 3 位一個，中日韓文字一字一個，標點一個一個。
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isascii() and piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+def _line_cost(text: str, output_ratio: float, line_overhead: int) -> int:
+    """單行成本：輸入 + 預估輸出 + 編號等固定開銷"""
+    return int(estimate_tokens(text) * (1 + output_ratio)) + line_overhead
+
+
+def split_oversized(text: str, max_tokens: int) -> List[str]:
+    """
+    將過長的句子切成多段，每段估算 token 數不超過 max_tokens
+
+    優先在句末標點後切，其次在空白處切，最後才硬切字元。
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces: List[str] = []
+    current = ""
+    for unit in _split_units(text, max_tokens):
+        candidate = f"{current} {unit}" if current else unit
+        if current and estimate_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = unit
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_units(text: str, max_tokens: int) -> List[str]:
+    """拆成不超過上限的最小單位：句子 → 單字 → 字元"""
+    units = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            units.append(sentence)
+            continue
+        for word in sentence.split():
+            if estimate_tokens(word) <= max_tokens:
+                units.append(word)
+                continue
+            # 沒有空白的長字串（如中文），依字元硬切
+            chunk = ""
+            for char in word:
+                if chunk and estimate_tokens(chunk + char) > max_tokens:
+                    units.append(chunk)
+                    chunk = ""
+                chunk += char
+            if chunk:
+                units.append(chunk)
+    return units
+
+
+def pack_batches(
+    texts: List[str],
+    token_budget: int,
+    prompt_overhead: int = 0,
+    max_items: Optional[int] = None,
+    output_ratio: float = 1.0,
+    line_overhead: int = 3
+) -> List[List[Tuple[int, str]]]:
+    """
+    依估算 token 數把句子裝進批次
+
+    Args:
+        texts: 原文列表
+        token_budget: 每批次 token 上限（含 prompt 與預估輸出）
+        prompt_overhead: prompt 固定開銷（系統訊息、說明文字）
+        max_items: 每批次最多句數（None 表示不限）
+        output_ratio: 預估輸出 token 數相對輸入的比例
+        line_overhead: 每行的編號與換行開銷
+
+    Returns:
+        批次列表，每個批次為 [(原文索引, 文字), ...]；
+        過長的句子會被切成多段，同一索引會出現多次，翻譯後依序合併即可
+    """
+    line_budget = max(1, token_budget - prompt_overhead)
+    # 單行可用的原文 token 上限
+    max_piece_tokens = max(1, int((line_budget - line_overhead) / (1 + output_ratio)))
+
+    batches: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    current_cost = 0
+
+    for index, text in enumerate(texts):
+        for piece in split_oversized(text, max_piece_tokens):
+            cost = _line_cost(piece, output_ratio, line_overhead)
+            is_full = current_cost + cost > line_budget or (max_items is not None and len(current) >= max_items)
+            if current and is_full:
+                batches.append(current)
+                current, current_cost = [], 0
+            current.append((index, piece))
+            current_cost += cost
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_numbered_lines(result: str, count: int) -> List[Optional[str]]:
+    """
+    解析編號格式的翻譯結果
+
+    依行首編號對齊，而非依出現順序：
+        - 漏掉的編號回傳 None
+        - 沒有編號的行視為上一行的延續（模型自行換行）
+        - 重複的編號保留第一次出現的內容
+        - 超出範圍的編號忽略
+        - 整批重新編號（例如從 0 開始，或接續上一批的 51. 52. ...）且恰好連續 count 行時，依順序對齊
+        - 完全沒有編號時，依序對應沒有編號的行
+
+    Args:
+        result: 模型回傳的文字
+        count: 原文句數
+
+    Returns:
+        長度為 count 的譯文列表，缺漏為 None
+    """
+    translations: List[Optional[str]] = [None] * count
+    current: Optional[int] = None
+
+    lines = [line.strip() for line in result.split("\n") if line.strip()]
+    if not any(NUMBERED_LINE_PATTERN.match(line) for line in lines):
+        return (lines + [None] * count)[:count]
+
+    numbers = [int(m.group(1)) for m in map(NUMBERED_LINE_PATTERN.match, lines) if m]
+    offset = 1
+    if len(numbers) == count and numbers == list(range(numbers[0], numbers[0] + count)):
+        offset = numbers[0]
+
+    for line in lines:
+        match = NUMBERED_LINE_PATTERN.match(line)
+        if match:
+            number = int(match.group(1)) - offset
+            if 0 <= number < count and translations[number] is None:
+                translations[number] = match.group(2).strip()
+                current = number
+            else:
+                current = None
+        elif current is not None:
+            translations[current] = f"{translations[current]}{line}"
+
+    return translations
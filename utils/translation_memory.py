@@ -0,0 +1,203 @@
+"""
+翻譯記憶 - 重複出現的句子不再送 API 翻譯
+
+以 SQLite 儲存，鍵為：
+    (正規化原文, 原文語言, 目標語言, 模型, prompt 版本)
+
+查詢順序：
+    1. 精確比對（正規化後完全相同）
+    2. 模糊比對（可選，fuzzy_threshold > 0 時啟用，長度相近的候選中取相似度最高者）
+"""
+
+import re
+import time
+import sqlite3
+import difflib
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .token_batcher import estimate_tokens
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# 模糊比對時，每句最多比較的候選數
+_FUZZY_CANDIDATE_LIMIT = 200
+
+
+def normalize_text(text: str) -> str:
+    """正規化原文：全半形統一、忽略大小寫、合併空白"""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_PATTERN.sub(" ", text).strip().casefold()
+
+
+class TranslationMemory:
+    """SQLite 翻譯記憶（執行緒安全）"""
+
+    def __init__(
+        self,
+        db_path: str,
+        source_lang: str,
+        target_lang: str,
+        model: str,
+        prompt_version: str,
+        fuzzy_threshold: float = 0.0
+    ):
+        """
+        Args:
+            db_path: SQLite 資料庫路徑
+            source_lang: 原文語言
+            target_lang: 目標語言
+            model: 翻譯模型名稱
+            prompt_version: prompt 版本（修改 prompt 後應更新，避免沿用舊翻譯）
+            fuzzy_threshold: 模糊比對門檻 (0-1)，0 表示只做精確比對
+        """
+        self.context = (source_lang, target_lang, model, prompt_version)
+        self.fuzzy_threshold = fuzzy_threshold
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "fuzzy_hits": 0, "misses": 0, "saved_tokens": 0}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source_norm TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (source_norm, source_lang, target_lang, model, prompt_version)
+            )
+        """)
+        self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_translations_length
+            ON translations (source_lang, target_lang, model, prompt_version, length)
+        """)
+        self._conn.commit()
+
+    def _lookup_exact(self, norms: List[str]) -> Dict[str, str]:
+        found = {}
+        # SQLite 參數上限為 999，分批查詢
+        for i in range(0, len(norms), 900):
+            chunk = norms[i:i + 900]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"""SELECT source_norm, translation FROM translations
+                    WHERE source_lang = ? AND target_lang = ? AND model = ? AND prompt_version = ?
+                    AND source_norm IN ({placeholders})""",
+                (*self.context, *chunk)
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def _lookup_fuzzy(self, norm: str) -> Optional[str]:
+        length = len(norm)
+        margin = max(2, int(length * (1 - self.fuzzy_threshold)))
+        rows = self._conn.execute(
+            """SELECT source_norm, translation FROM translations
+               WHERE source_lang = ? AND target_lang = ? AND model = ? AND prompt_version = ?
+               AND length BETWEEN ? AND ?
+               ORDER BY hits DESC LIMIT ?""",
+            (*self.context, length - margin, length + margin, _FUZZY_CANDIDATE_LIMIT)
+        ).fetchall()
+
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(norm)
+        best_ratio, best_translation = 0.0, None
+        for candidate, translation in rows:
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < self.fuzzy_threshold or matcher.quick_ratio() < self.fuzzy_threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.fuzzy_threshold and ratio > best_ratio:
+                best_ratio, best_translation = ratio, translation
+        return best_translation
+
+    def lookup_many(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        批次查詢翻譯記憶
+
+        Args:
+            texts: 原文列表
+
+        Returns:
+            與 texts 同順序的譯文列表，未命中為 None
+        """
+        norms = [normalize_text(t) for t in texts]
+
+        with self._lock:
+            exact = self._lookup_exact(list(set(norms)))
+            results: List[Optional[str]] = []
+            hit_norms = []
+            for text, norm in zip(texts, norms):
+                translation = exact.get(norm)
+                if translation is not None:
+                    self.stats["hits"] += 1
+                    hit_norms.append(norm)
+                elif self.fuzzy_threshold > 0:
+                    translation = self._lookup_fuzzy(norm)
+                    if translation is not None:
+                        self.stats["fuzzy_hits"] += 1
+
+                if translation is None:
+                    self.stats["misses"] += 1
+                    results.append(None)
+                    continue
+                self.stats["saved_tokens"] += estimate_tokens(text) + estimate_tokens(translation)
+                results.append(translation)
+
+            if hit_norms:
+                self._conn.executemany(
+                    """UPDATE translations SET hits = hits + 1
+                       WHERE source_norm = ? AND source_lang = ? AND target_lang = ? AND model = ? AND prompt_version = ?""",
+                    [(norm, *self.context) for norm in hit_norms]
+                )
+                self._conn.commit()
+
+        return results
+
+    def store_many(self, pairs: Iterable[Tuple[str, str]]):
+        """
+        寫入翻譯記憶
+
+        Args:
+            pairs: (原文, 譯文) 列表；譯文與原文相同（翻譯失敗以原文填充）時略過
+        """
+        now = time.time()
+        rows = []
+        for source, translation in pairs:
+            if not translation or translation == source:
+                continue
+            norm = normalize_text(source)
+            rows.append((norm, *self.context, source, translation, len(norm), now))
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO translations
+                   (source_norm, source_lang, target_lang, model, prompt_version,
+                    source_text, translation, length, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            self._conn.commit()
+
+    def summary(self) -> str:
+        """統計摘要"""
+        s = self.stats
+        return (f"翻譯記憶: 命中 {s['hits']} 句（模糊 {s['fuzzy_hits']}），"
+                f"未命中 {s['misses']} 句，估計節省 {s['saved_tokens']} tokens")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
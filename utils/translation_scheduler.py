@@ -0,0 +1,272 @@
+"""
+翻譯批次排程器 - 並行送出翻譯請求，並遵守 API 速率限制
+
+功能：
+    - 限制同時進行中的批次數量（max_in_flight）
+    - Token Bucket 速率限制（每分鐘請求數）
+    - 遇到 429 / 5xx / 連線錯誤與逾時時自適應退避（其他錯誤直接失敗）：
+        * 指數退避 + 抖動，優先採用伺服器回傳的 Retry-After
+        * 429 時全體暫停並降低速率，成功後逐步恢復
+    - 結果依照批次順序回傳
+    - 速率限制器可跨執行緒共用：多個翻譯工作者各自在自己的事件迴圈執行排程器時，
+      透過 shared_rate_limiter 共用同一個限制器，總請求速率才不會隨工作者數倍增
+
+使用方式：
+    scheduler = TranslationScheduler(translate_fn, max_in_flight=4, requests_per_minute=60)
+    results = asyncio.run(scheduler.run(batches))
+
+    # 多個執行緒共用速率限制
+    limiter = shared_rate_limiter("deepseek", requests_per_minute=60)
+    scheduler = TranslationScheduler(translate_fn, max_in_flight=4, limiter=limiter)
+"""
+
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 可重試的 HTTP 狀態碼（5xx 另外判斷）
+RETRYABLE_STATUS = {408, 429}
+
+
+def _transient_errors() -> tuple:
+    """連線錯誤與逾時的例外型別（openai / httpx 未安裝時只用內建型別）"""
+    errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import openai
+        errors.append(openai.APIConnectionError)  # 包含 APITimeoutError
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+TRANSIENT_ERRORS = _transient_errors()
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """取得例外的 HTTP 狀態碼（相容 openai.APIStatusError / httpx）"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """讀取 Retry-After 標頭（秒）"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    判斷錯誤是否值得重試：429、5xx、連線錯誤與逾時
+
+    其餘錯誤（其他 4xx、解析回應時的 KeyError / TypeError / ValueError 等程式錯誤）直接失敗，不重試。
+    """
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS or code >= 500
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+class TokenBucket:
+    """Token Bucket 速率限制器（執行緒安全，可在不同執行緒的事件迴圈中同時使用）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒補充的 token 數
+            capacity: 桶容量（允許的瞬間突發量），預設為 max(1, rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """預扣 token（可預扣成負數），回傳需要等待的秒數（先到先得）"""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        """取得 token，不足時等待"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """
+    自適應速率限制器：Token Bucket + 429 時全體暫停並降速（乘法減少），成功後逐步恢復（加法增加）
+
+    執行緒安全；同一個實例可由多個排程器共用。
+    """
+
+    def __init__(self, requests_per_minute: float = 60, capacity: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: 目標每分鐘請求數
+            capacity: 允許的瞬間突發量
+        """
+        self.target_rate = requests_per_minute / 60.0
+        self.min_rate = self.target_rate / 8
+        self.bucket = TokenBucket(self.target_rate, capacity=capacity)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def on_success(self):
+        """成功後逐步恢復速率"""
+        with self._lock:
+            if self.bucket.rate < self.target_rate:
+                self.bucket.rate = min(self.target_rate, self.bucket.rate + self.target_rate * 0.1)
+
+    def on_throttled(self, delay: float):
+        """被限流時全體暫停，並將速率減半"""
+        with self._lock:
+            self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def acquire(self):
+        """等待暫停結束並取得一個請求額度"""
+        remaining = self._paused_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        await self.bucket.acquire()
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def shared_rate_limiter(name: str, requests_per_minute: float = 60,
+                        capacity: Optional[float] = None) -> RateLimiter:
+    """
+    取得整個程序共用的速率限制器（同一個 API 只建立一個）
+
+    Args:
+        name: 限制器名稱（例如 API 的 base_url）
+        requests_per_minute: 目標每分鐘請求數（設定變更時更新目標速率）
+        capacity: 允許的瞬間突發量（只在建立時使用）
+    """
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(name)
+        if limiter is None:
+            limiter = _shared_limiters[name] = RateLimiter(requests_per_minute, capacity)
+        elif limiter.target_rate != requests_per_minute / 60.0:
+            with limiter._lock:
+                limiter.target_rate = requests_per_minute / 60.0
+                limiter.min_rate = limiter.target_rate / 8
+                limiter.bucket.rate = min(limiter.bucket.rate, limiter.target_rate)
+        return limiter
+
+
+class TranslationScheduler:
+    """
+    翻譯批次排程器
+
+    translate_fn 為單次請求的非同步函數（不需自行重試），
+    接收一個批次的文字列表，回傳翻譯結果列表。
+    """
+
+    def __init__(
+        self,
+        translate_fn: Callable[[List[str]], Awaitable[List[str]]],
+        max_in_flight: int = 4,
+        requests_per_minute: float = 60,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        limiter: Optional[RateLimiter] = None
+    ):
+        """
+        Args:
+            limiter: 共用的速率限制器（None 表示自行建立，依 requests_per_minute 限速）
+        """
+        self.translate_fn = translate_fn
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter or RateLimiter(requests_per_minute, capacity=self.max_in_flight)
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    def _backoff_delay(self, attempt: int, exc: Exception) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run_with_retry(self, texts: List[str]) -> List[str]:
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            self.stats["requests"] += 1
+            try:
+                result = await self.translate_fn(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                if _status_code(e) == 429:
+                    self.stats["throttled"] += 1
+                    self.limiter.on_throttled(delay)
+                self.stats["retries"] += 1
+                print(f"    API 錯誤，{delay:.1f} 秒後重試 ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.on_success()
+            return result
+
+    async def run(
+        self,
+        batches: List[List[str]],
+        on_batch_done: Optional[Callable[[int, Any], None]] = None
+    ) -> List[Any]:
+        """
+        執行所有批次
+
+        Args:
+            batches: 批次列表，每個批次為文字列表
+            on_batch_done: 每個批次完成時的回調 (批次索引, 結果或例外)
+
+        Returns:
+            與 batches 同順序的結果列表；失敗的批次位置為 Exception
+        """
+        results: List[Any] = [None] * len(batches)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def worker(index: int, texts: List[str]):
+            async with semaphore:
+                try:
+                    results[index] = await self._run_with_retry(texts)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    results[index] = e
+            if on_batch_done:
+                on_batch_done(index, results[index])
+
+        await asyncio.gather(*(worker(i, texts) for i, texts in enumerate(batches)))
+        return results